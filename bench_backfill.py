@@ -0,0 +1,79 @@
+# bench_backfill.py
+# 多日补跑：逐日各跑一遍 load_report_views（每天 2 次查询、窗口互相重叠）
+# vs backfill_window 一次拉取并集后逐日 slice_report_views；每天的视图、品牌宽表、运营师文字必须一致
+import argparse
+import contextlib
+import io
+import os
+import tempfile
+import time
+from datetime import datetime
+
+import pandas as pd
+from sqlalchemy import create_engine
+
+from bench_daily_report import STORE_MAP_SQL, build_db, count_queries
+from daily_report_data import backfill_window, load_report_views, load_report_window, slice_report_views
+from daily_report_engine import compute_brand_metrics
+from daily_report_render import render_operator_texts
+
+
+def day_outputs(views, report_date, store_map):
+    with contextlib.redirect_stdout(io.StringIO()):
+        metrics = compute_brand_metrics(views, report_date, store_map)
+        texts, _ = render_operator_texts(metrics)
+    return metrics, texts
+
+
+def main():
+    parser = argparse.ArgumentParser(description="多日补跑：逐日查询 vs 一次拉取并集后逐日切片")
+    parser.add_argument("--brands", type=int, default=300)
+    parser.add_argument("--days", type=int, default=90, help="库里的历史天数")
+    parser.add_argument("--start", default="2025-05-20")
+    parser.add_argument("--end", default="2025-06-16")
+    args = parser.parse_args()
+    first = datetime.strptime(args.start, "%Y-%m-%d")
+    last = datetime.strptime(args.end, "%Y-%m-%d")
+    report_dates = list(pd.date_range(first, last).to_pydatetime())
+
+    with tempfile.TemporaryDirectory() as tmp:
+        engine = create_engine(f"sqlite:///{os.path.join(tmp, 'report.db')}")
+        build_db(engine, args.brands, args.days, last)
+        store_map = pd.read_sql(STORE_MAP_SQL, engine)
+        queries = count_queries(engine)
+
+        t0 = time.perf_counter()
+        per_day = {}
+        for report_date in report_dates:
+            views = load_report_views(engine, store_map, report_date)
+            per_day[report_date] = (views, *day_outputs(views, report_date, store_map))
+        t_per_day = time.perf_counter() - t0
+        q_per_day, queries["n"] = queries["n"], 0
+
+        t0 = time.perf_counter()
+        data = load_report_window(engine, store_map, *backfill_window(first, last))
+        shared = {}
+        for report_date in report_dates:
+            views = slice_report_views(data, report_date)
+            shared[report_date] = (views, *day_outputs(views, report_date, store_map))
+        t_shared = time.perf_counter() - t0
+        q_shared = queries["n"]
+        engine.dispose()
+
+    for report_date in report_dates:
+        (a_views, a_metrics, a_texts), (b_views, b_metrics, b_texts) = per_day[report_date], shared[report_date]
+        for name in a_views:
+            pd.testing.assert_frame_equal(a_views[name].reset_index(drop=True), b_views[name].reset_index(drop=True))
+        pd.testing.assert_frame_equal(a_metrics, b_metrics)
+        assert a_texts == b_texts, report_date
+
+    print(
+        f"📆 {args.brands} 个品牌，补跑 {first.date()} ~ {last.date()} 共 {len(report_dates)} 天"
+        f"（数据范围 {' ~ '.join(map(str, backfill_window(first, last)))}）\n"
+        f"  逐日查询：{q_per_day} 次查询 {t_per_day:.2f}s → 一次拉取 + 逐日切片：{q_shared} 次查询 {t_shared:.2f}s"
+        f"（{t_per_day / t_shared:.1f}×），每天的视图 / 品牌宽表 / 运营师文字一致"
+    )
+
+
+if __name__ == "__main__":
+    main()
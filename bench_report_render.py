@@ -0,0 +1,145 @@
+# bench_report_render.py
+# 日报产物渲染：运营师 TXT + 月度 Excel + 各品牌 最近7天指标表 / 同期对比表 PNG。
+# 旧版图表是逐品牌查库再画；新版由 daily_report_artifacts 从 op_hist 切好每个品牌的数据，
+# 先核对切片与旧版 SQL 查出来的一致，再对比 串行（workers=1）/ 进程池 两种渲染的耗时，产物必须逐字节（Excel 按内容）一致
+import argparse
+import contextlib
+import filecmp
+import io
+import os
+import tempfile
+import time
+import warnings
+from datetime import datetime
+from pathlib import Path
+
+import pandas as pd
+from sqlalchemy import create_engine
+
+from bench_daily_report import STORE_MAP_SQL, build_db, workbook_snapshot
+from daily_report_artifacts import (
+    CHART_METRICS,
+    chart_tasks,
+    comparison_periods,
+    init_worker,
+    plot_comparison_table,
+    plot_vertical_table,
+    render_artifacts,
+    report_tasks,
+    summarize_timings,
+)
+from daily_report_data import load_report_views
+from daily_report_engine import compute_brand_metrics
+from daily_report_excel import monthly_frame
+from daily_report_render import render_operator_texts
+
+
+def legacy_chart_frames(engine, brand, report_date):
+    """旧版 plot_vertical_table / plot_comparison_table 各自查库拿到的数据（SQL 原样）"""
+    start = report_date - pd.Timedelta(days=6)
+    last7 = pd.read_sql(f"""
+        SELECT `日期`, {", ".join(f"`{m}`" for m in CHART_METRICS)}
+        FROM `operation_data`
+        WHERE `美团门店ID` IN (
+            SELECT `美团门店ID` FROM `store_mapping` WHERE `推广门店` = '{brand}'
+        )
+          AND `日期` BETWEEN '{start.date()}' AND '{report_date.date()}'
+        ORDER BY `日期`
+    """, engine)
+    curr_days, prev_days, label_curr, label_prev = comparison_periods(report_date)
+    frames = []
+    for days in (curr_days, prev_days):
+        frames.append(pd.read_sql(
+            f"SELECT {', '.join(f'`{m}`' for m in CHART_METRICS)} FROM `operation_data` "
+            f"WHERE `美团门店ID` IN (SELECT `美团门店ID` FROM `store_mapping` WHERE `推广门店` = '{brand}') "
+            f"AND `日期` IN ({', '.join(f'{chr(39)}{d}{chr(39)}' for d in days)})",
+            engine
+        ))
+    return last7, frames[0], frames[1], label_curr, label_prev
+
+
+def legacy_charts(engine, tasks, report_date, out_dir):
+    """旧版写法：每个品牌查一次库、在主进程里串行画两张图；顺带核对新版切片与 SQL 结果一致"""
+    init_worker()
+    for kind, path, args in tasks:
+        brand = args[0]
+        last7, curr, prev, label_curr, label_prev = legacy_chart_frames(engine, brand, report_date)
+        if kind == "vertical":
+            sliced = args[1].assign(日期=pd.to_datetime(args[1]["日期"]))
+            pd.testing.assert_frame_equal(last7.assign(日期=pd.to_datetime(last7["日期"])), sliced, check_dtype=False)
+            plot_vertical_table(out_dir / Path(path).name, brand, last7)
+        else:
+            pd.testing.assert_series_equal(curr.sum(), args[1].sum(), check_dtype=False)
+            pd.testing.assert_series_equal(prev.sum(), args[2].sum(), check_dtype=False)
+            plot_comparison_table(out_dir / Path(path).name, brand, curr, prev, label_curr, label_prev)
+
+
+def assert_same_outputs(dir_a, dir_b):
+    names = sorted(os.listdir(dir_a))
+    assert names == sorted(os.listdir(dir_b)), "两次渲染的产物文件不一致"
+    for name in names:
+        a, b = os.path.join(dir_a, name), os.path.join(dir_b, name)
+        if name.endswith(".xlsx"):
+            # xlsx 里带生成时间，按内容比
+            assert workbook_snapshot(a) == workbook_snapshot(b), name
+        else:
+            assert filecmp.cmp(a, b, shallow=False), name
+    return names
+
+
+def main():
+    parser = argparse.ArgumentParser(description="日报产物渲染：逐品牌查库串行 vs 切片后串行 / 进程池并行")
+    parser.add_argument("--brands", type=int, default=24)
+    parser.add_argument("--days", type=int, default=30)
+    parser.add_argument("--date", default="2025-06-16")
+    parser.add_argument("--workers", type=int, default=max(2, os.cpu_count() or 1))
+    args = parser.parse_args()
+    report_date = datetime.strptime(args.date, "%Y-%m-%d")
+    # 环境里没有 SimHei 时中文字形缺失的警告刷屏，不影响计时
+    warnings.filterwarnings("ignore", message="Glyph .* missing")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        tmp = Path(tmp)
+        engine = create_engine(f"sqlite:///{tmp / 'report.db'}")
+        build_db(engine, args.brands, args.days, report_date)
+        store_map = pd.read_sql(STORE_MAP_SQL, engine)
+        views = load_report_views(engine, store_map, report_date)
+        with contextlib.redirect_stdout(io.StringIO()):
+            operator_sections, _ = render_operator_texts(compute_brand_metrics(views, report_date, store_map))
+
+        runs = {}
+        for name in ("legacy", "serial", "pool"):
+            (tmp / name).mkdir()
+        with contextlib.redirect_stdout(io.StringIO()):
+            charts = chart_tasks(views, report_date, tmp / "legacy")
+        t0 = time.perf_counter()
+        legacy_charts(engine, charts, report_date, tmp / "legacy")
+        t_legacy = time.perf_counter() - t0
+        engine.dispose()
+
+        for name, workers in (("serial", 1), ("pool", args.workers)):
+            out_dir = tmp / name
+            tasks = report_tasks(operator_sections, monthly_frame(views), report_date, out_dir)
+            with contextlib.redirect_stdout(io.StringIO()):
+                tasks += chart_tasks(views, report_date, out_dir)
+            runs[name] = render_artifacts(tasks, workers)
+            results, _ = runs[name]
+            assert results["error"].isna().all(), results.loc[results["error"].notna(), "error"].iloc[0]
+
+        names = assert_same_outputs(tmp / "serial", tmp / "pool")
+        for name in os.listdir(tmp / "legacy"):
+            assert filecmp.cmp(tmp / "legacy" / name, tmp / "pool" / name, shallow=False), name
+
+    print(f"🖼️ {args.brands} 个品牌 / {len(operator_sections)} 个运营师，报表日 {report_date.date()}，"
+          f"产物 {len(names)} 个（图表与旧版逐字节一致）")
+    print(f"  旧版图表（逐品牌查库 + 串行画图）：{len(charts)} 张 {t_legacy:.2f}s")
+    for name, workers in (("serial", 1), ("pool", args.workers)):
+        results, wall = runs[name]
+        summarize_timings(results, wall, workers)
+    speedup = runs["serial"][1] / runs["pool"][1]
+    print(f"  全部产物：串行 {runs['serial'][1]:.2f}s → {args.workers} 进程 {runs['pool'][1]:.2f}s（{speedup:.1f}×，"
+          f"本机 {os.cpu_count()} 核）")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,243 @@
+# ✅ 日报产物渲染：运营师 TXT、运营师月度 Excel、（开启时）各品牌 最近7天指标表 / 同期对比表 PNG
+# 全部拆成独立任务交给进程池（Agg 后端），每个任务只带自己那份切好的数据；
+# 输出路径在主进程按 运营师 / 品牌 事先定好，与完成顺序无关，结束后按产物类型汇总耗时
+import os
+import time
+import traceback
+from concurrent.futures import ProcessPoolExecutor
+from datetime import timedelta
+from pathlib import Path
+
+import matplotlib
+import matplotlib.pyplot as plt
+import pandas as pd
+
+from daily_report_excel import WEEKDAY_NAMES, write_operator_workbook
+
+FONT_PATH = "./fonts/SimHei.ttf"
+CHART_METRICS = [
+    "曝光人数", "访问人数", "购买人数", "消费金额",
+    "新好评数", "新中差评数", "打卡人数", "扫码人数", "新增收藏人数", "点评星级"
+]
+VERTICAL_DAYS = 7
+KIND_LABELS = {"txt": "运营师 TXT", "excel": "运营师月度 Excel", "vertical": "最近7天指标表", "comparison": "同期对比表"}
+
+
+def init_worker():
+    """子进程：Agg 后端 + 项目内 SimHei，与 daily_auto_report 的绘图设置一致"""
+    plt.switch_backend("Agg")
+    if os.path.exists(FONT_PATH):
+        matplotlib.font_manager.fontManager.addfont(FONT_PATH)
+        plt.rcParams['font.family'] = 'SimHei'
+    plt.rcParams['axes.unicode_minus'] = False
+
+
+# ---------- 各产物的写法（只用传进来的数据，不查库） ----------
+
+def write_txt(path, texts):
+    Path(path).write_text("\n\n".join(texts), encoding="utf-8-sig")
+
+
+def plot_vertical_table(path, brand, df):
+    """品牌最近 7 天逐行指标表（df 为该品牌 d-6 ~ d 的运营明细，按日期排好）"""
+    df = df.rename(columns={'点评星级': '星级'})
+    df['日期'] = pd.to_datetime(df['日期']).dt.strftime('%Y-%m-%d')
+    df['星期'] = pd.to_datetime(df['日期']).dt.weekday.map(WEEKDAY_NAMES)
+
+    # 所有“人数”列和评分列变成整数
+    int_cols = [
+        '曝光人数', '访问人数', '购买人数',
+        '打卡人数', '扫码人数', '新增收藏人数',
+        '新好评数', '新中差评数'
+    ]
+    df[int_cols] = df[int_cols].astype(int)
+    df['曝光-访问转化率'] = (df['访问人数'] / df['曝光人数'] * 100).round(1).astype(str) + '%'
+    df['访问-购买转化率'] = (df['购买人数'] / df['访问人数'] * 100).round(1).astype(str) + '%'
+
+    cols = [
+        '日期', '星期', '消费金额', '曝光人数', '访问人数', '购买人数',
+        '曝光-访问转化率', '访问-购买转化率',
+        '新增收藏人数', '打卡人数',
+        '新好评数', '新中差评数', '扫码人数', '星级'
+    ]
+    df = df[cols].rename(columns={
+        '消费金额': '消费',
+        '曝光人数': '曝光',
+        '访问人数': '访问',
+        '购买人数': '购买',
+        '曝光-访问转化率': '访问转化',
+        '访问-购买转化率': '购买转化',
+        '新增收藏人数': '收藏',
+        '打卡人数': '打卡',
+        '新好评数': '好评',
+        '新中差评数': '差评',
+        '扫码人数': '扫码',
+    })
+
+    col_widths = []
+    for c in df.columns:
+        if c in ['日期', '星期']:
+            col_widths.append(0.08)
+        elif c in ['消费', '曝光', '访问', '购买', '访问转化', '购买转化']:
+            col_widths.append(0.06)
+        else:
+            col_widths.append(0.05)
+
+    fig, ax = plt.subplots(figsize=(16, 0.6 * len(df) + 1))
+    ax.axis('off')
+    tbl = ax.table(
+        cellText=df.values,
+        colLabels=df.columns,
+        colWidths=col_widths,
+        cellLoc='center',
+        loc='center'
+    )
+    tbl.auto_set_font_size(False)
+    tbl.set_fontsize(11)
+    tbl.scale(1, 1.2)
+    ax.set_title(f"{brand} 最近7天关键指标", fontsize=16, pad=12)
+    plt.tight_layout()
+    fig.savefig(path, dpi=150, bbox_inches='tight')
+    plt.close(fig)
+
+
+def plot_comparison_table(path, brand, df_curr, df_prev, label_curr, label_prev):
+    """品牌 本期 vs 上期 汇总对比表（df_curr / df_prev 为该品牌两段日期的运营明细）"""
+    curr_sum = df_curr[CHART_METRICS].sum()
+    prev_sum = df_prev[CHART_METRICS].sum()
+    df_cmp = pd.DataFrame({
+        "指标": CHART_METRICS,
+        label_curr: [curr_sum[m] for m in CHART_METRICS],
+        label_prev: [prev_sum[m] for m in CHART_METRICS],
+    })
+    df_cmp["变化率"] = (
+        (df_cmp[label_curr] - df_cmp[label_prev]) / df_cmp[label_prev] * 100
+    ).round(1).astype(str) + "%"
+
+    fig, ax = plt.subplots(figsize=(len(df_cmp) * 0.8, 2.5))
+    ax.axis("off")
+    tbl = ax.table(
+        cellText=df_cmp.values,
+        colLabels=df_cmp.columns,
+        loc="center"
+    )
+    tbl.auto_set_font_size(False)
+    tbl.set_fontsize(12)
+    tbl.scale(1, 1.5)
+    ax.set_title(brand, fontsize=16, pad=10)
+    plt.tight_layout()
+    fig.savefig(path, dpi=150, bbox_inches="tight")
+    plt.close(fig)
+
+
+WRITERS = {
+    "txt": write_txt,
+    "excel": write_operator_workbook,
+    "vertical": plot_vertical_table,
+    "comparison": plot_comparison_table,
+}
+
+
+# ---------- 任务拆分（主进程） ----------
+
+def comparison_periods(report_date):
+    """同期对比表的 本期 / 上期 日期与标题：周一 周五~周日 vs 上周周五~周日；其余 昨日 vs 上周同期"""
+    if report_date.weekday() == 0:
+        curr = [d.date() for d in pd.date_range(report_date - timedelta(days=3), periods=3)]
+        prev = [d.date() for d in pd.date_range(report_date - timedelta(days=10), periods=3)]
+        return curr, prev, "本期(周五~周日)", "上期(上周周五~周日)"
+    return ([(report_date - timedelta(days=1)).date()], [(report_date - timedelta(days=8)).date()],
+            "昨日", "上周同期")
+
+
+def chart_tasks(views, report_date, out_dir, dated=False):
+    """
+    每个品牌两张 PNG 的任务：从 op_hist（近14天明细）按品牌切出 最近7天 / 本期 / 上期 三份数据。
+    没数据的品牌与旧版一样跳过（打印提示）。dated=True（多日补跑）时文件名带上报表日，各天互不覆盖
+    """
+    tag = f"_{report_date.date()}" if dated else ""
+    day = report_date.date()
+    hist = views["op_hist"]
+    hist = hist.assign(_day=pd.to_datetime(hist["日期"]).dt.date).sort_values("_day", kind="stable")
+    curr_days, prev_days, label_curr, label_prev = comparison_periods(report_date)
+    last7_start = day - timedelta(days=VERTICAL_DAYS - 1)
+
+    tasks = []
+    for brand in sorted(views["op_today"]["推广门店"].dropna().unique()):
+        rows = hist[hist["推广门店"] == brand]
+        last7 = rows[(rows["_day"] >= last7_start) & (rows["_day"] <= day)]
+        if last7.empty:
+            print(f"⚠️ {brand} 最近7天无数据，跳过")
+        else:
+            tasks.append(("vertical", out_dir / f"{brand}{tag}_最近7天指标表.png",
+                          (brand, last7[["日期"] + CHART_METRICS].reset_index(drop=True))))
+        curr, prev = rows[rows["_day"].isin(curr_days)], rows[rows["_day"].isin(prev_days)]
+        if curr.empty or prev.empty:
+            print(f"⚠️ 品牌 {brand} 本期或上期无数据，跳过对比表")
+        else:
+            tasks.append(("comparison", out_dir / f"{brand}{tag}_同期对比表.png",
+                          (brand, curr[CHART_METRICS], prev[CHART_METRICS], label_curr, label_prev)))
+    return tasks
+
+
+def report_tasks(operator_sections, df_month, report_date, out_dir):
+    """运营师 TXT + 月度 Excel 的任务，路径与原来的串行写法一致"""
+    tasks = [("txt", out_dir / f"{op}_{report_date.date()}.txt", (texts,))
+             for op, texts in operator_sections.items()]
+    tasks += [("excel", out_dir / f"{op}_{report_date.date()}_月度数据.xlsx", (grp_op,))
+              for op, grp_op in df_month.groupby('operator')]
+    return tasks
+
+
+# ---------- 执行 & 汇总 ----------
+
+def run_task(task):
+    """子进程入口：写一个产物，返回 (类型, 路径, 秒, 错误)；出错不影响其他产物"""
+    kind, path, args = task
+    t0 = time.perf_counter()
+    try:
+        WRITERS[kind](path, *args)
+        error = None
+    except Exception:
+        error = traceback.format_exc(limit=3)
+    return kind, str(path), time.perf_counter() - t0, error
+
+
+def render_artifacts(tasks, workers=None):
+    """
+    workers 个进程并行写全部产物（workers=1 时在当前进程串行写，便于调试）；
+    返回按路径排序的 DataFrame：kind / path / seconds / error，外加墙钟耗时
+    """
+    workers = workers or os.cpu_count() or 1
+    t0 = time.perf_counter()
+    if workers == 1 or len(tasks) <= 1:
+        init_worker()
+        results = [run_task(t) for t in tasks]
+    else:
+        # 大的任务（月度 Excel）先发出去，避免最后剩一个长任务拖尾
+        order = sorted(tasks, key=lambda t: t[0] != "excel")
+        with ProcessPoolExecutor(max_workers=workers, initializer=init_worker) as pool:
+            results = list(pool.map(run_task, order, chunksize=1))
+    wall = time.perf_counter() - t0
+    df = pd.DataFrame(results, columns=["kind", "path", "seconds", "error"])
+    return df.sort_values("path", ignore_index=True), wall
+
+
+def summarize_timings(results, wall, workers=None):
+    """按产物类型汇总：数量 / 合计 / 平均 / 最慢（及文件名）/ 失败数，并打印失败详情"""
+    if results.empty:
+        print("ℹ️ 没有需要生成的产物")
+        return pd.DataFrame()
+    slowest = results.loc[results.groupby("kind")["seconds"].idxmax()].set_index("kind")
+    table = results.groupby("kind").agg(
+        数量=("path", "size"), 合计=("seconds", "sum"), 平均=("seconds", "mean"),
+        最慢=("seconds", "max"), 失败=("error", "count"),
+    )
+    table["最慢文件"] = slowest["path"].map(lambda p: Path(p).name)
+    table.index = table.index.map(lambda k: KIND_LABELS.get(k, k)).rename("产物")
+    workers = workers or os.cpu_count() or 1
+    print(f"⏱️ 产物渲染：{len(results)} 个，{workers} 个进程，墙钟 {wall:.2f}s（逐个累计 {results['seconds'].sum():.2f}s）")
+    print(table.to_string(formatters={c: "{:.2f}s".format for c in ["合计", "平均", "最慢"]}))
+    for row in results[results["error"].notna()].itertuples():
+        print(f"❌ 生成失败：{row.path}\n{row.error}")
+    return table
@@ -0,0 +1,101 @@
+# ✅ 日报数据加载：operation_data / cpc_hourly_data 各扫一次最宽窗口，store_mapping 只 join 一次，
+# 当日 / 近7天 / 近14天 / 当月 各视图都在内存里切片得到（原来是 5 次互相包含的 read_sql + 5 次 merge）
+from datetime import timedelta
+
+import pandas as pd
+
+# 日报用到的运营指标（当日、近7天、近14天、当月共用）
+OP_METRICS = [
+    "曝光人数", "访问人数", "购买人数", "消费金额", "新好评数", "新中差评数",
+    "打卡人数", "扫码人数", "点评星级", "新增收藏人数",
+]
+CPC_METRICS = ["cost", "impressions", "clicks", "orders"]
+HIST_DAYS = 14   # 环比要回看到上上周五（周一报表）
+LAST7_DAYS = 7
+
+
+def report_window(report_date):
+    """单日日报需要的数据范围：当月月初与 14 天前取更早者 → 报表日"""
+    start = min(report_date.replace(day=1), report_date - timedelta(days=HIST_DAYS))
+    return start.date(), report_date.date()
+
+
+def load_report_window(engine, store_map, start, end):
+    """
+    一次拉取 [start, end] 的运营数据（只取日报用到的列 + rankings_detail）和按门店/日汇总的 CPC 数据，
+    各 join 一次 store_map；日期统一为 datetime.date（与 MySQL DATE 读出来的一致）。
+    返回 {"op": 运营明细, "cpc": 门店日级 CPC}，供 slice_report_views 按报表日切片
+    """
+    cols = ",".join(f"`{c}`" for c in ["美团门店ID", "日期"] + OP_METRICS + ["rankings_detail"])
+    op = pd.read_sql(
+        f"SELECT {cols} FROM `operation_data` WHERE `日期` BETWEEN '{start}' AND '{end}'",
+        engine
+    )
+    op["日期"] = pd.to_datetime(op["日期"]).dt.date
+    op = op.merge(
+        store_map[['美团门店ID', 'brand_name', 'operator', 'store_id']],
+        on='美团门店ID', how='left'
+    )
+
+    sums = ", ".join(f"SUM(`{c}`) AS `{c}`" for c in CPC_METRICS)
+    cpc = pd.read_sql(
+        f"""SELECT `store_id`, `date` AS `日期`, {sums}
+           FROM `cpc_hourly_data`
+           WHERE `date` BETWEEN '{start}' AND '{end}'
+           GROUP BY `store_id`, `date`""",
+        engine
+    )
+    cpc["日期"] = pd.to_datetime(cpc["日期"]).dt.date
+    cpc = cpc.merge(
+        store_map[['store_id', 'brand_name', 'operator']],
+        on='store_id', how='left'
+    )
+    return {"op": op, "cpc": cpc}
+
+
+def _between(df, start, end):
+    days = pd.to_datetime(df["日期"])
+    return df[(days >= pd.Timestamp(start)) & (days <= pd.Timestamp(end))]
+
+
+def slice_report_views(data, report_date):
+    """
+    按报表日从 load_report_window 的结果切出 main 原来分别查询的几份数据：
+      op_today / op_last7 / op_hist：品牌列名为“推广门店”
+      cpc_today：当日各门店 CPC（按门店汇总后的行，summarize 求和结果不变）
+      df_month：当月运营明细（brand_name / operator / store_id）
+      cpc_month：当月按 品牌+运营师+日期 汇总的“推广通花费”
+    """
+    day = report_date.date()
+    month_start = report_date.replace(day=1).date()
+    op, cpc = data["op"], data["cpc"]
+    op_brand = op.rename(columns={'brand_name': '推广门店'})
+
+    views = {
+        "op_today": op_brand[op_brand["日期"] == day].drop(columns=["日期", "store_id"]),
+        "op_last7": _between(op_brand, day - timedelta(days=LAST7_DAYS), day).drop(columns=["rankings_detail", "store_id"]),
+        "op_hist": _between(op_brand, day - timedelta(days=HIST_DAYS), day).drop(columns=["rankings_detail", "store_id"]),
+        "df_month": _between(op, month_start, day).drop(columns=["rankings_detail"]),
+    }
+    views["cpc_today"] = (
+        cpc[cpc["日期"] == day]
+        .drop(columns=["日期"])
+        .rename(columns={'brand_name': '推广门店'})
+    )
+    cpc_month = _between(cpc, month_start, day).rename(columns={"cost": "推广通花费"})
+    # 同一天同品牌可能存在多门店，按品牌+日期汇总
+    views["cpc_month"] = cpc_month.groupby(
+        ['brand_name', 'operator', '日期'], as_index=False
+    )['推广通花费'].sum()
+    return views
+
+
+def backfill_window(first_date, last_date):
+    """多日补跑需要的数据范围：第一天的 report_window 起点 → 最后一天（各天窗口的并集）"""
+    return report_window(first_date)[0], last_date.date()
+
+
+def load_report_views(engine, store_map, report_date):
+    """单日日报：按 report_window 拉一次数据并切出各视图"""
+    start, end = report_window(report_date)
+    return slice_report_views(load_report_window(engine, store_map, start, end), report_date)
@@ -0,0 +1,121 @@
+# ✅ 日报指标引擎：所有品牌的 当日 / 本期 / 上期汇总、环比、近7天对比、推广通花费异常 一次 groupby 算完，
+# 输出每个品牌一行的宽表（index 为品牌），由 daily_report_render 渲染成文字；口径与逐品牌调用 summarize 的旧版一致
+from datetime import timedelta
+
+import numpy as np
+import pandas as pd
+
+from summarize import FORCE_SUM_FIELDS
+
+OP_FIELDS = ["曝光人数", "访问人数", "购买人数", "消费金额",
+             "新好评数", "新中差评数", "打卡人数", "扫码人数", "点评星级", "新增收藏人数"]
+# 文字日报直接取当日第一行门店的这几项
+FIRST_ROW_FIELDS = ["打卡人数", "新好评数", "新中差评数", "消费金额"]
+SUM_KEYWORDS = ['金额', '人数', '次数', '笔数']   # 与 summarize 的求和 / 取均值规则一致
+CPC_ALERT_RATIO = 0.5      # 推广通花费较前一日变化 ≥50%
+CPC_ALERT_AMOUNT = 100     # 且变化金额 ≥100 元才预警
+
+
+def agg_rule(col):
+    return "sum" if col in FORCE_SUM_FIELDS or any(x in col for x in SUM_KEYWORDS) else "mean"
+
+
+def brand_summary(df, brands, fields=OP_FIELDS, key="推广门店"):
+    """
+    summarize 的向量化版本：按品牌一次汇总 fields（求和或均值，金额类保留两位小数）。
+    结果按 brands 对齐；没有数据的品牌求和项为 0、均值项为 NaN（与 summarize 对空表的结果一致）
+    """
+    rules = {c: agg_rule(c) for c in fields}
+    out = df.groupby(key)[fields].agg(rules).reindex(brands)
+    sums = [c for c in fields if rules[c] == "sum"]
+    out[sums] = out[sums].fillna(0)
+    # format_number：整数值原样，其余保留两位小数
+    floats = out.select_dtypes("float").columns
+    out[floats] = out[floats].round(2)
+    return out
+
+
+def pct_change(curr, base):
+    """
+    (本期 - 基期) / 基期 × 100 保留一位小数，格式 "12.3%"；基期为 0 时 "N/A"。
+    逐个值用 Python round（按十进制取整，75.35 → 75.3），与旧版逐品牌 round(x, 1) 一致，
+    不用 DataFrame.round（先乘 10 再取整，会得到 75.4）。基期为 NaN（均值项无数据）时与旧版一样得到 "nan%"
+    """
+    pct = (curr - base) / base.where(base != 0, 1) * 100
+    text = pd.DataFrame(
+        [[f"{round(float(v), 1)}%" for v in row] for row in pct.to_numpy()], index=pct.index, columns=pct.columns
+    )
+    return text.where(base != 0, "N/A")
+
+
+def period_windows(report_date):
+    """
+    本期 / 上期 的日期区间：周一 本期 = 上周五~周日、上期 = 再往前一周的周五~周日；
+    其余日期 本期 = 报表日当天（即当日汇总），上期 = 报表日前 8 天
+    """
+    day = report_date.date()
+    if report_date.weekday() == 0:
+        return (day - timedelta(days=3), day - timedelta(days=1)), (day - timedelta(days=10), day - timedelta(days=8))
+    prev = day - timedelta(days=8)
+    return None, (prev, prev)
+
+
+def _in_range(df, start, end):
+    days = pd.to_datetime(df["日期"])
+    return df[(days >= pd.Timestamp(start)) & (days <= pd.Timestamp(end))]
+
+
+def _first_per_brand(df, col, key="推广门店"):
+    """每个品牌按原顺序第一行的 col（对应旧版的 df.iloc[0]）"""
+    return df.drop_duplicates(key).set_index(key)[col]
+
+
+def compute_brand_metrics(views, report_date, store_map):
+    """
+    views 为 daily_report_data.slice_report_views 的结果。返回按品牌排序的宽表，列：
+      operator；每个指标 m：当日_m / 本期_m / 上期_m / m_环比 / 近7天_m / m_较7天；
+      首行_打卡人数 / 首行_新好评数 / 首行_新中差评数 / 首行_消费金额；
+      推广通花费 / 昨日推广通花费 / 推广通异常；rankings_detail（当日第一条非空）
+    """
+    op_today, op_hist = views["op_today"], views["op_hist"]
+    brands = pd.Index(sorted(op_today["推广门店"].dropna().unique()), name="推广门店")
+
+    today = brand_summary(op_today, brands)
+    curr_range, prev_range = period_windows(report_date)
+    curr = today if curr_range is None else brand_summary(_in_range(op_hist, *curr_range), brands)
+    prev = brand_summary(_in_range(op_hist, *prev_range), brands)
+    last7 = brand_summary(views["op_last7"], brands)
+    wow = pct_change(curr, prev)
+    cmp7 = pct_change(today, last7)
+    # 近7天没有该品牌的数据时旧版 summarize 返回空字典，全部记为 N/A
+    cmp7[~brands.isin(views["op_last7"]["推广门店"])] = "N/A"
+
+    parts = {"operator": store_map.drop_duplicates("brand_name").set_index("brand_name")["operator"].reindex(brands)}
+    for m in OP_FIELDS:
+        parts[f"当日_{m}"] = today[m]
+        parts[f"本期_{m}"] = curr[m]
+        parts[f"上期_{m}"] = prev[m]
+        parts[f"{m}_环比"] = wow[m]
+        parts[f"近7天_{m}"] = last7[m]
+        parts[f"{m}_较7天"] = cmp7[m]
+    for m in FIRST_ROW_FIELDS:
+        parts[f"首行_{m}"] = _first_per_brand(op_today, m).reindex(brands)
+
+    # —— 推广通花费：当日按品牌汇总，昨日取当月按品牌+日期汇总里的第一行 ——
+    cpc_today = views["cpc_today"]
+    cost_today = brand_summary(cpc_today, brands, ["cost"])["cost"].astype(float).round(2)
+    cpc_month = views["cpc_month"]
+    prev_day = report_date.date() - timedelta(days=1)
+    cost_prev = _first_per_brand(
+        cpc_month[pd.to_datetime(cpc_month["日期"]) == pd.Timestamp(prev_day)], "推广通花费", key="brand_name"
+    ).reindex(brands).fillna(0.0).astype(float)
+    change = (cost_today - cost_prev).abs()
+    parts["推广通花费"] = cost_today
+    parts["昨日推广通花费"] = cost_prev
+    parts["推广通异常"] = (cost_prev > 0) & (
+        (cost_today == 0) | ((change / cost_prev.where(cost_prev > 0, np.nan) >= CPC_ALERT_RATIO) & (change >= CPC_ALERT_AMOUNT))
+    )
+
+    ranks = op_today.dropna(subset=["rankings_detail"])
+    parts["rankings_detail"] = _first_per_brand(ranks, "rankings_detail").reindex(brands)
+    return pd.DataFrame(parts, index=brands)
@@ -0,0 +1,97 @@
+# ✅ 运营师月度 Excel：xlsxwriter 一次写完 标题行 / 灰底表头 / 冻结窗格 / 列宽 / 数字格式（列级格式），
+# 列宽直接按 DataFrame 计算；原来是 openpyxl 先写一遍、再读回来逐格量宽度和设格式、再存一遍
+import pandas as pd
+from xlsxwriter.utility import xl_col_to_name
+
+# 每个门店 sheet 的列（顺序即 Excel 列 A~O）
+MONTHLY_COLS = [
+    '日期', '星期', '消费金额', '推广通花费', '曝光人数', '访问人数', '购买人数',
+    '访问转化', '购买转化', '新增收藏人数', '打卡人数',
+    '新好评数', '新中差评数', '扫码人数', '点评星级'
+]
+WEEKDAY_NAMES = {0: '星期一', 1: '星期二', 2: '星期三', 3: '星期四', 4: '星期五', 5: '星期六', 6: '星期日'}
+
+# A 列（日期）固定宽度，其余列 = 最长内容 + 4，且不小于这里的最小宽度
+MIN_WIDTHS = {
+    'A': 13,  # 日期
+    'B': 8,  # 星期
+    'C': 10,  # 消费金额
+    'D': 10, 'E': 10, 'F': 10, 'G': 10,
+    'H': 10, 'I': 13, 'J': 10, 'K': 10, 'L': 11,
+    'M': 8,  # 扫码
+    'N': 8  # 星级
+}
+WIDTH_PADDING = 4
+
+FMT_AMT2 = '#,##0.00'  # 两位小数
+FMT_INT = '#,##0'  # 整数
+FMT_PCT = '0.0%'  # 百分比
+FMT_STAR = '0.0'  # 星级一位小数
+# C/D：消费金额、推广通花费；E~G：曝光/访问/购买；H/I：访问转化、购买转化；最后一列（点评星级）单独处理
+COLUMN_FORMATS = {'C': FMT_AMT2, 'D': FMT_AMT2, 'E': FMT_INT, 'F': FMT_INT, 'G': FMT_INT, 'H': FMT_PCT, 'I': FMT_PCT}
+
+TITLE_STYLE = {"bold": True, "font_size": 14, "align": "center", "valign": "vcenter"}
+HEADER_STYLE = {"bold": True, "bg_color": "#DDDDDD", "border": 1, "align": "center", "valign": "vcenter"}
+DATA_START_ROW = 3  # 第1行标题、第2行留白、第3行表头，数据从第4行开始
+
+
+def monthly_frame(views):
+    """
+    当月运营明细 + 按品牌/日期的推广通花费（缺失记 0，两位小数），
+    并衍生 星期 / 访问转化 / 购买转化；各运营师的月度 Excel 都从这里按 operator、brand_name 切
+    """
+    df_month = views["df_month"].merge(
+        views["cpc_month"][['brand_name', '日期', '推广通花费']],
+        on=['brand_name', '日期'], how='left'
+    ).fillna({'推广通花费': 0})
+    df_month['推广通花费'] = df_month['推广通花费'].round(2)
+    df_month['星期'] = pd.to_datetime(df_month['日期']).dt.weekday.map(WEEKDAY_NAMES)
+    df_month['访问转化'] = (df_month['访问人数'] / df_month['曝光人数']).round(3)
+    df_month['购买转化'] = (df_month['购买人数'] / df_month['访问人数']).round(3)
+    return df_month
+
+
+def column_widths(sheet):
+    """按 DataFrame 算每列宽度：表头与各值文本的最长长度 + 4，不小于 MIN_WIDTHS；A 列固定"""
+    widths = []
+    for idx, col in enumerate(sheet.columns):
+        letter = xl_col_to_name(idx)
+        if letter == 'A':
+            widths.append(MIN_WIDTHS['A'])
+            continue
+        values = sheet[col].dropna()
+        if values.dtype.kind == "f":
+            # Excel 里 12345.0 存成 12345，按整数的长度算
+            values = values.map(lambda v: int(v) if v.is_integer() else v)
+        max_len = max(len(str(col)), int(values.astype(str).str.len().max()) if len(values) else 0)
+        optimal = max_len + WIDTH_PADDING
+        widths.append(max(optimal, MIN_WIDTHS.get(letter, optimal)))
+    return widths
+
+
+def column_format(idx, n_cols):
+    if idx == n_cols - 1:
+        return FMT_STAR
+    return COLUMN_FORMATS.get(xl_col_to_name(idx))
+
+
+def write_operator_workbook(file, grp_op):
+    """一个运营师的当月数据 → 每个门店一个 sheet（名称截 31 字），样式随数据一次写完"""
+    n_cols = len(MONTHLY_COLS)
+    with pd.ExcelWriter(file, engine='xlsxwriter', date_format='YYYY-MM-DD') as writer:
+        book = writer.book
+        title_fmt = book.add_format(TITLE_STYLE)
+        header_fmt = book.add_format(HEADER_STYLE)
+        num_fmts = {f: book.add_format({"num_format": f}) for f in {FMT_AMT2, FMT_INT, FMT_PCT, FMT_STAR}}
+
+        for brand, grp in grp_op.groupby('brand_name'):
+            sheet = grp.sort_values('日期')[MONTHLY_COLS]
+            name = brand[:31]
+            sheet.to_excel(writer, sheet_name=name, index=False, header=False, startrow=DATA_START_ROW)
+            ws = writer.sheets[name]
+            ws.merge_range(0, 0, 0, n_cols - 1, name, title_fmt)
+            ws.write_row(DATA_START_ROW - 1, 0, MONTHLY_COLS, header_fmt)
+            ws.freeze_panes(DATA_START_ROW, 0)
+            for idx, width in enumerate(column_widths(sheet)):
+                fmt = column_format(idx, n_cols)
+                ws.set_column(idx, idx, width, num_fmts[fmt] if fmt else None)
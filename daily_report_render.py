@@ -0,0 +1,133 @@
+# ✅ 日报渲染：把 daily_report_engine.compute_brand_metrics 的品牌宽表渲染成运营师文字日报
+import json
+
+import pandas as pd
+
+THRESHOLD = 30   # 暴涨/暴跌判定阈值 %
+RANK_PLATFORMS = {
+    "dianping_hot": "点评热门榜",
+    "dianping_checkin": "点评打卡人气榜",
+    "dianping_rating": "点评好评榜"
+}
+RANK_TH_CITY = 10   # 全市榜前 10 才展示
+RANK_TH_SUB = 5     # 区县榜前 5 才展示
+RANK_LEVELS = {"city": "全市榜", "subdistrict": "区县榜", "business": "商圈榜"}
+
+
+def is_big_change(pct_str, threshold=THRESHOLD):
+    try:
+        return abs(float(pct_str.strip('%'))) >= threshold
+    except:
+        return False
+
+
+def fmt(val, pct_str):
+    if pct_str == "N/A":
+        return str(val)
+    pct = float(pct_str.strip('%'))
+    if pct > 0:
+        return f"{val}(+{pct}%)"
+    if pct < 0:
+        return f"{val}(-{abs(pct)}%)"
+    return f"{val}(持平)"
+
+
+def parse_rankings(raw_rank):
+    """rankings_detail（JSON 字符串 / bytes / dict，可能被二次序列化）→ dict；解析不了返回 {}"""
+    if isinstance(raw_rank, (bytes, bytearray)):
+        try: raw_rank = raw_rank.decode("utf-8")
+        except: raw_rank = None
+    if isinstance(raw_rank, str):
+        try: parsed = json.loads(raw_rank)
+        except: parsed = {}
+    elif isinstance(raw_rank, dict):
+        parsed = raw_rank
+    else:
+        parsed = {}
+    if isinstance(parsed, str):
+        try: tmp = json.loads(parsed)
+        except: tmp = {}
+        parsed = tmp if isinstance(tmp, dict) else {}
+    return parsed if isinstance(parsed, dict) else {}
+
+
+def rank_note(raw_rank):
+    """只看 RANK_PLATFORMS 三个榜：全市 / 区县达标就展示，都不达标时展示商圈榜"""
+    rank_dict = parse_rankings(raw_rank)
+    rank_lines = []
+    for pf, desc in RANK_PLATFORMS.items():
+        scope = rank_dict.get(pf, {})
+        if not isinstance(scope, dict):
+            continue
+        city_rank = scope.get("city")
+        sub_rank = scope.get("subdistrict")
+        bus_rank = scope.get("business")
+        city_ok = isinstance(city_rank, int) and city_rank <= RANK_TH_CITY
+        sub_ok = isinstance(sub_rank, int) and sub_rank <= RANK_TH_SUB
+        if city_ok:
+            rank_lines.append(f"{desc}{RANK_LEVELS['city']}第{city_rank}名")
+        if sub_ok:
+            rank_lines.append(f"{desc}{RANK_LEVELS['subdistrict']}第{sub_rank}名")
+        if not (city_ok or sub_ok) and isinstance(bus_rank, int):
+            rank_lines.append(f"{desc}{RANK_LEVELS['business']}第{bus_rank}名")
+    return "\n".join(rank_lines) if rank_lines else "无榜单变化"
+
+
+def render_brand(brand, row):
+    """
+    一个品牌的两段文字：(运营师日报正文, AI 汇总用的 section)。
+    row 为品牌宽表的一行（dict）；消费 / 打卡 / 好评取当日第一行门店，收藏 / 差评取当日汇总
+    """
+    card_str = fmt(int(row['首行_打卡人数']), row['打卡人数_环比'])
+    good_val = int(row['首行_新好评数'])
+    good_str = fmt(good_val, row['新好评数_环比'])
+    rev_str = fmt(round(row['首行_消费金额'], 0), row['消费金额_环比'])
+    col_str = fmt(int(row['当日_新增收藏人数']), row['新增收藏人数_环比'])
+    suggestion = ("发现差评，运营师已介入跟进。"
+                  if int(row['首行_新中差评数']) > 0
+                  else "数据正常，继续引导好评。")
+    bad_val = int(row['当日_新中差评数'])
+    bad_str = fmt(bad_val, row['新中差评数_环比'])
+    note = rank_note(row['rankings_detail'])
+
+    # —— 决定是否显示推广通花费 & 是否预警 ——
+    cost_today, cost_prev = row['推广通花费'], row['昨日推广通花费']
+    cpc_part = ""
+    if not (cost_today == 0 and cost_prev == 0):
+        cpc_part = f"；推广通花费 {cost_today:.2f}"
+        if row['推广通异常']:
+            cpc_part += " ⚠️ 推广通花费异常"
+
+    text = (
+        f"{brand}\n"
+        f"- 核心指标：消费 {rev_str}{cpc_part}；打卡 {card_str}；收藏 {col_str}；\n"
+        f"  好评 {good_str}；{'' if bad_val == 0 else '差评 ' + bad_str}\n"
+        f"- 排行榜：\n{note}\n"
+        f"- 建议：{suggestion}\n"
+    )
+    section = (
+        f"{brand}\n"
+        f"- 核心指标：消费 {rev_str}；打卡 {card_str}；收藏 {col_str}；\n"
+        f"  好评 {good_str}；{'' if bad_val == 0 else '差评 ' + bad_str}\n"
+        f"- 排行榜：\n{note}\n"
+        f"- 建议：{'👏 好评稳增，继续引导五星' if (good_val > 0 and bad_val == 0) else '差评已转运营师跟进' if bad_val > 0 else '数据正常'}\n"
+    )
+    return text, section
+
+
+def render_operator_texts(metrics):
+    """
+    品牌宽表 → ({运营师: [品牌正文, ...]}, [AI section, ...])，品牌按宽表顺序；
+    没有运营师的品牌打印提示后跳过（与旧版一致）
+    """
+    operator_sections, sections = {}, []
+    for brand, row in metrics.to_dict("index").items():
+        text, section = render_brand(brand, row)
+        op_val = row["operator"]
+        if pd.isna(op_val) or not op_val:
+            print(f"❗ 品牌 {brand} 找到了但运营师字段为空，跳过")
+            continue
+        print(f"✅ 品牌 {brand} 匹配运营师：{op_val}")
+        operator_sections.setdefault(op_val, []).append(text)
+        sections.append(section)
+    return operator_sections, sections
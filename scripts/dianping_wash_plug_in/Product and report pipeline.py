@@ -1,10 +1,8 @@
 import os
 import pandas as pd
 from sqlalchemy import create_engine, text
-import sqlalchemy.types as sqltypes
-from excel_header_finder import clean_and_load_excel
-from data_cleaning import clean_numeric_columns
-from database_importer import import_to_mysql
+from brand_parser import clean_product_file
+from database_importer import import_to_mysql, get_dtype_for_product
 import send2trash
 from config import DB_CONNECTION_STRING
 
@@ -39,11 +37,7 @@ def process_product_folder():
         if not fname.lower().endswith('.xlsx'):
             continue
         fp = os.path.join(PRODUCT_DAILY_FOLDER, fname)
-        df = clean_and_load_excel(fp)
-        df = clean_numeric_columns(df, key_col='商品ID')
-        df['日期'] = pd.to_datetime(df['日期'], errors='coerce').dt.date
-        df.drop_duplicates(subset=['日期', '商品ID'], keep='last', inplace=True)
-        dfs.append(df)
+        dfs.append(clean_product_file(fp))
         filepaths.append(fp)
 
     if not dfs:
@@ -55,17 +49,7 @@ def process_product_folder():
 
     delete_old_product(min_date, max_date)
 
-    # 定义数据库字段类型映射，可根据实际列补充
-    dtype_map = {
-        '日期': sqltypes.Date,
-        '商品ID': sqltypes.String(64),
-        '商品名称': sqltypes.String(255),
-        '商品访问人数': sqltypes.Integer,
-        '商品购买人数': sqltypes.Integer,
-        '商品成交金额(优惠后)': sqltypes.Float
-    }
-
-    import_to_mysql(df_all, 'product_daily', DB_CONNECTION_STRING, dtype=dtype_map)
+    import_to_mysql(df_all, 'product_daily', DB_CONNECTION_STRING, dtype=get_dtype_for_product(df_all))
     print(f"✅ 成功导入商品日明细，共 {len(df_all)} 行。")
 
     for fp in filepaths:
@@ -0,0 +1,200 @@
+# bench_legacy.py —— 各处被替换掉的旧实现，原样保留作对照：
+# tests/ 里逐一断言新实现的输出与它们完全一致，bench_suite.py --legacy 在同一批合成导出上对比耗时
+import json
+import re
+import time
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+from rapidfuzz import fuzz, process
+from sqlalchemy import create_engine, inspect, text
+
+from database_importer import get_dtype_for_cpc_hourly, get_engine, import_to_mysql
+from rankings import RANK_PATTERN, RANKING_COLUMNS
+from store_matcher import FUZZ_PART_TH, FUZZ_TOKEN_TH, FUZZ_TOP_K, normalize_name, stores_frame
+
+
+def legacy_clean_and_load_excel(file_path):
+    """旧实现：header=None 读一遍找表头，再按 header=i 整体重读一遍"""
+    df_raw = pd.read_excel(file_path, header=None, dtype=str)
+    header_row_index = None
+    for i in range(min(10, df_raw.shape[0])):
+        if df_raw.iloc[i].str.contains('日期').any():
+            header_row_index = i
+            break
+    if header_row_index is None:
+        raise ValueError(f"❌ 文件{file_path}未找到包含'日期'的表头行！")
+    df = pd.read_excel(file_path, header=header_row_index, dtype=str)
+    df.columns = df.columns.str.strip().str.replace('\n', '').str.replace('\xa0', '')
+    return df
+
+
+def legacy_clean_numeric_columns(df, key_col=None):
+    """旧实现：逐单元格 try float()"""
+    bad_set = set()
+    skip = {
+        '日期', '时段', '推广门店', '推广名称',
+        '门店名称', '门店ID', '美团门店ID', '平台', '城市', '门店所在城市'
+    }
+    for col in df.columns:
+        if df[col].dtype != 'object' or col in skip:
+            continue
+        s = df[col].astype(str).str.replace(',', '', regex=False).str.strip()
+        cleaned = []
+        for idx, raw in enumerate(s):
+            if raw == '/':
+                brand = df.at[idx, key_col] if key_col and key_col in df.columns else None
+                bad_set.add((brand, col))
+                num = np.nan
+            else:
+                try:
+                    num = float(raw)
+                except:
+                    num = raw
+            cleaned.append(num)
+        df[col] = pd.Series(cleaned, index=df.index).replace({np.nan: 0})
+    if bad_set:
+        print("⚠️ 以下品牌/列在某些行出现“/”，已设为 0，请人工核对：")
+        for brand, col in sorted(bad_set, key=lambda x: (str(x[0]), x[1])):
+            if brand:
+                print(f"  • 品牌 “{brand}” 的列 “{col}”")
+            else:
+                print(f"  • 列 “{col}”")
+    return df
+
+
+def legacy_process_cpc_dates(df, filename):
+    """旧实现：每个文件重新用 datetime 拼出映射，再 map + dropna"""
+    match = re.search(r'_(\d{8})_(\d{8})_', filename)
+    if not match:
+        raise ValueError(f"文件名 {filename} 中不包含有效的起止日期格式")
+    start_date = datetime.strptime(match.group(1), "%Y%m%d")
+    date_candidates = []
+    for ds in df['日期'].dropna().unique():
+        try:
+            m_str, d_str = ds.strip().split('-')
+            month = int(m_str)
+            day = int(d_str)
+        except Exception:
+            continue
+        try:
+            candidate = datetime(year=start_date.year, month=month, day=day)
+        except ValueError:
+            continue
+        if candidate < start_date:
+            candidate = candidate.replace(year=start_date.year + 1)
+        date_candidates.append((candidate, ds))
+    date_candidates.sort(key=lambda x: x[0])
+    completed_map = {ds: candidate.strftime("%Y-%m-%d") for candidate, ds in date_candidates}
+    df['日期'] = df['日期'].map(completed_map)
+    return df.dropna(subset=['日期'])
+
+
+def legacy_add_datetime_column(df):
+    """旧实现：每行拆时段 + 单独 pd.to_datetime"""
+    if "日期" not in df.columns or "时段" not in df.columns:
+        return df
+
+    def extract_start_time(row):
+        try:
+            date_part = row["日期"]
+            time_range = row["时段"]
+            start_time = time_range.split("~")[0].strip()
+            full = f"{date_part} {start_time}"
+            return pd.to_datetime(full, format="%Y-%m-%d %H:%M", errors="coerce")
+        except:
+            return pd.NaT
+
+    df["起始时间"] = df.apply(extract_start_time, axis=1)
+    return df
+
+
+def legacy_pack_extra_metrics(dynamic_df):
+    """旧实现：每行构造 dict、替换 NaN，再逐行 json.dumps"""
+    dicts = dynamic_df.to_dict(orient="records")
+    cleaned = [{k: (None if pd.isna(v) else v) for k, v in d.items()} for d in dicts]
+    return [json.dumps(d, ensure_ascii=False) for d in cleaned]
+
+
+def legacy_build_rankings_detail(row):
+    """
+    旧实现，逐行版本：
+    直接用当前行的 '城市' 列判定 city 级，
+    以 '区' 结尾判定 district 级，
+    其余当 subdistrict 级。
+    """
+    city = str(row.get("城市", "")).strip()
+    detail = {}
+    for src_col, key in RANKING_COLUMNS.items():
+        raw = row.get(src_col)
+        if not raw or pd.isna(raw):
+            continue
+        tmp = {}
+        for part in str(raw).split("|"):
+            m = re.search(RANK_PATTERN, part.strip())
+            if not m:
+                continue
+            scope = m.group(1).strip()
+            rank  = int(m.group(2))
+            # 判定层级
+            if city and city in scope:
+                tmp['city'] = rank
+            elif scope.endswith('区'):
+                tmp['district'] = rank
+            else:
+                tmp['subdistrict'] = rank
+        if tmp:
+            detail[key] = tmp
+    return json.dumps(detail, ensure_ascii=False)
+
+
+def fuzzy_match(name, candidats_df):
+    """旧实现：逐个门店名 token_sort_ratio 取前 3，再逐个看 partial_ratio"""
+    if not name:
+        return None
+    n_name = normalize_name(name)
+    top = process.extract(
+        n_name,
+        candidats_df["store_name_norm"],
+        scorer=fuzz.token_sort_ratio,
+        limit=FUZZ_TOP_K
+    )
+    for match_str, score, idx in top:
+        part = fuzz.partial_ratio(n_name, match_str)
+        if score >= FUZZ_TOKEN_TH or part >= FUZZ_PART_TH:
+            return candidats_df.iloc[idx]["store_id"]
+    return None
+
+
+def legacy_match(names, store_mapping):
+    """旧实现：每个文件归一化一遍映射，再对每一行调用 fuzzy_match"""
+    stores_df = stores_frame(store_mapping)
+    stores_df["store_name_norm"] = stores_df["store_name"].apply(normalize_name)
+    return names.apply(lambda x: fuzzy_match(x, stores_df))
+
+
+def legacy_import_to_mysql(df, table_name, db_connection_string, dtype=None, if_exists='append'):
+    """旧实现：每次调用新建 engine，一次性 to_sql"""
+    engine = create_engine(db_connection_string)
+    df.to_sql(name=table_name, con=engine, if_exists=if_exists, index=False, dtype=dtype)
+
+
+def legacy_reimport(df, db):
+    """旧实现：逐门店 DELETE ... DATE(date) BETWEEN 再追加；返回 (总耗时, 删除阶段耗时 ≈ 锁持有时间)"""
+    engine = get_engine(db)
+    t0 = time.perf_counter()
+    with engine.begin() as conn:
+        for sid in df["store_id"].unique():
+            conn.execute(
+                text("DELETE FROM cpc_hourly_data WHERE store_id = :sid AND DATE(date) BETWEEN :s AND :e"),
+                {"sid": sid, "s": df["date"].min(), "e": df["date"].max()},
+            )
+    t_delete = time.perf_counter() - t0
+    import_to_mysql(df, "cpc_hourly_data", db, dtype=get_dtype_for_cpc_hourly(df))
+    return time.perf_counter() - t0, t_delete
+
+
+def legacy_table_columns(engine, table_name):
+    """旧实现：每个品牌 / 文件对齐列时都反射一次表结构"""
+    return [c["name"] for c in inspect(engine).get_columns(table_name)]
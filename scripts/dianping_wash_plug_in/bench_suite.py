@@ -0,0 +1,356 @@
+# bench_suite.py
+# 导入链路基准：用 synthetic_exports 合成 N 个品牌 × M 天的导出，分别计时读表、data_cleaning 各清洗函数，
+# 以及对 SQLite 的端到端导入（识别 → 清洗 → 合并入库）；结果按 git 提交追加到 BENCH_HISTORY_PATH，
+# 与同规模的上一个提交对比，变慢超过阈值的项标出来（--check 时以退出码 1 结束，便于接到提交前检查里）；
+# --legacy 时在同一批导出上再对比 bench_legacy 里各旧实现与当前实现的耗时（只打印，不写入历史），
+# 新旧输出是否一致由 tests/ 断言
+import argparse
+import contextlib
+import io
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime
+
+import pandas as pd
+from sqlalchemy import text
+
+import ingest_daemon
+import parse_cache
+import schema_registry
+from bench_legacy import (
+    legacy_add_datetime_column,
+    legacy_build_rankings_detail,
+    legacy_clean_and_load_excel,
+    legacy_clean_numeric_columns,
+    legacy_import_to_mysql,
+    legacy_match,
+    legacy_pack_extra_metrics,
+    legacy_process_cpc_dates,
+    legacy_reimport,
+    legacy_table_columns,
+)
+from config import BENCH_HISTORY_PATH, BENCH_REGRESSION_THRESHOLD
+from data_cleaning import (
+    add_datetime_column,
+    clean_numeric_columns,
+    clean_operation_data,
+    drop_percentage_columns,
+    match_store_id_for_single_cpc,
+    process_cpc_dates,
+)
+from database_importer import (
+    get_dtype_for_cpc_hourly,
+    get_dtype_for_operation,
+    get_engine,
+    import_to_mysql,
+    upsert_via_staging,
+)
+from excel_header_finder import clean_and_load_excel
+from extra_metrics import pack_extra_metrics
+from rankings import build_rankings_detail_column
+from schema_registry import invalidate_schema, table_columns
+from store_matcher import match_store_names, stores_frame
+from synthetic_exports import generate_exports, load_templates, table_fields
+
+MIN_REGRESSION_SECONDS = 0.02  # 低于该绝对差值的变慢视为计时噪声
+
+
+def git_revision():
+    """(短提交号, 工作区是否有未提交改动)；不在 git 仓库里时为 ("unknown", False)"""
+    here = os.path.dirname(os.path.abspath(__file__))
+    try:
+        commit = subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=here,
+                                capture_output=True, text=True, check=True).stdout.strip()
+        dirty = subprocess.run(["git", "status", "--porcelain", "--untracked-files=no"], cwd=here,
+                               capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown", False
+    return commit, bool(dirty)
+
+
+def best_of(func, make_input, repeat):
+    """每次用 make_input() 准备新输入（不计时），返回 repeat 次里最快的耗时与最后一次的结果"""
+    best, out = float("inf"), None
+    for _ in range(repeat):
+        arg = make_input()
+        t0 = time.perf_counter()
+        out = func(arg)
+        best = min(best, time.perf_counter() - t0)
+    return best, out
+
+
+def load_exports(root):
+    """读入全部运营表 / 推广报表（计时），返回 ({阶段: 秒}, 运营原始表, [(文件名, 推广原始表), ...])"""
+    timings = {"read_excel_operation": 0.0, "read_excel_cpc": 0.0}
+    op_frames, cpc_frames = [], []
+    for brand in sorted(os.listdir(root)):
+        for fname in sorted(os.listdir(os.path.join(root, brand))):
+            fp = os.path.join(root, brand, fname)
+            kind = "cpc" if "推广报表" in fname else "operation" if "运营数据" in fname else None
+            if kind is None:
+                continue
+            t0 = time.perf_counter()
+            df = clean_and_load_excel(fp)
+            timings[f"read_excel_{kind}"] += time.perf_counter() - t0
+            if kind == "cpc":
+                cpc_frames.append((fname, df))
+            else:
+                op_frames.append(df)
+    return timings, pd.concat(op_frames, ignore_index=True), cpc_frames
+
+
+def time_cleaning(op_raw, cpc_frames, store_mapping, repeat):
+    """
+    data_cleaning 各函数单独计时：每个函数的输入是它在 clean_operation_file / clean_cpc_file 里的上一步输出，
+    推广报表按文件逐个处理（process_cpc_dates 依赖文件名里的起始日期）后合计
+    """
+    timings = {}
+    t, op = best_of(clean_operation_data, op_raw.copy, repeat)
+    timings["clean_operation_data"] = t
+    t, op = best_of(lambda df: drop_percentage_columns(df, use_cache=False), op.copy, repeat)
+    timings["drop_percentage_columns[operation]"] = t
+    t, _ = best_of(clean_numeric_columns, op.copy, repeat)
+    timings["clean_numeric_columns[operation]"] = t
+
+    steps = [
+        ("process_cpc_dates", None),
+        ("match_store_id_for_single_cpc", lambda df, fname: match_store_id_for_single_cpc(df, store_mapping)),
+        ("drop_percentage_columns[cpc]", lambda df, fname: drop_percentage_columns(df, use_cache=False)),
+        ("clean_numeric_columns[cpc]", lambda df, fname: clean_numeric_columns(df)),
+        ("add_datetime_column", lambda df, fname: add_datetime_column(df)),
+    ]
+    frames = cpc_frames
+    for name, step in steps:
+        timings[name] = 0.0
+        outputs = []
+        for fname, df in frames:
+            func = (lambda d, f=fname: process_cpc_dates(d, f)) if step is None else (lambda d, f=fname, s=step: s(d, f))
+            t, out = best_of(func, df.copy, repeat)
+            timings[name] += t
+            outputs.append((fname, out))
+        frames = outputs
+    return timings
+
+
+def prepare_db(db, store_mapping, templates):
+    """store_mapping 写入合成的映射；operation_data 按字段结构建全量列（导出里表没有的列才进 extra_metrics）"""
+    engine = get_engine(db)
+    store_mapping.to_sql("store_mapping", engine, index=False)
+    cols = [name for name, _ in table_fields(templates, "operation_data")]
+    empty = pd.DataFrame(columns=cols)
+    empty.to_sql("operation_data", engine, index=False, dtype=get_dtype_for_operation(empty))
+    return engine
+
+
+def run_end_to_end(root, db):
+    """按守护进程的单文件流程导入全部导出：识别 → 清洗 → 合并入库 → 记 manifest；返回 (秒, {表: 写入行数})"""
+    session = ingest_daemon.IngestSession(db)
+    session.refresh_store_mapping()
+    rows = {}
+    t0 = time.perf_counter()
+    for brand in sorted(os.listdir(root)):
+        for fname in sorted(os.listdir(os.path.join(root, brand))):
+            fp = os.path.join(root, brand, fname)
+            kind = ingest_daemon.classify_file(fp)
+            table = ingest_daemon.KIND_TABLES[kind]
+            rows[table] = rows.get(table, 0) + session.ingest(fp, kind)
+    return time.perf_counter() - t0, rows
+
+
+def export_files(root, prefix=None):
+    """合成导出的全部文件路径（按品牌、文件名排序），prefix 只取该前缀的文件"""
+    return [
+        os.path.join(root, brand, fname)
+        for brand in sorted(os.listdir(root))
+        for fname in sorted(os.listdir(os.path.join(root, brand)))
+        if prefix is None or fname.startswith(prefix)
+    ]
+
+
+def time_legacy(root, op_raw, cpc_frames, store_mapping, db, tmp, repeat):
+    """
+    bench_legacy 里的旧实现与当前实现在同一批合成导出上逐项计时，返回 DataFrame（legacy / current / speedup）；
+    每项的输入与 time_cleaning 一样取自上一步的输出，推广报表逐文件计时后合计
+    """
+    pairs = {}
+
+    def add(name, legacy, current, make_input):
+        t_old, _ = best_of(legacy, make_input, repeat)
+        t_new, _ = best_of(current, make_input, repeat)
+        old, new = pairs.get(name, (0.0, 0.0))
+        pairs[name] = (old + t_old, new + t_new)
+
+    for fp in export_files(root, "推广报表") + export_files(root, "运营数据"):
+        add("clean_and_load_excel", legacy_clean_and_load_excel, clean_and_load_excel, lambda fp=fp: fp)
+
+    op = drop_percentage_columns(clean_operation_data(op_raw.copy()), use_cache=False)
+    add("clean_numeric_columns[operation]", legacy_clean_numeric_columns, clean_numeric_columns, op.copy)
+    add("build_rankings_detail",
+        lambda df: df.apply(legacy_build_rankings_detail, axis=1), build_rankings_detail_column, lambda: op)
+    op = clean_numeric_columns(op)
+    dynamic = op.drop(columns=["日期", "美团门店ID", "门店名称", "城市"], errors="ignore")
+    add("pack_extra_metrics", legacy_pack_extra_metrics, pack_extra_metrics, lambda: dynamic)
+
+    for fname, df in cpc_frames:
+        add("process_cpc_dates",
+            lambda d, f=fname: legacy_process_cpc_dates(d, f), lambda d, f=fname: process_cpc_dates(d, f), df.copy)
+        dated = drop_percentage_columns(process_cpc_dates(df.copy(), fname), use_cache=False)
+        add("clean_numeric_columns[cpc]", legacy_clean_numeric_columns, clean_numeric_columns, dated.copy)
+        add("add_datetime_column", legacy_add_datetime_column, add_datetime_column, dated.copy)
+
+    names = pd.concat([pd.read_excel(fp, dtype=str)["门店"] for fp in export_files(root, "评价")], ignore_index=True)
+    stores_df = stores_frame(store_mapping)
+    add("match_store_names",
+        lambda n: legacy_match(n, store_mapping), lambda n: n.map(match_store_names(n, stores_df)), lambda: names)
+
+    # 写库：整表写入一张新表；CPC 重导（旧版逐门店 DELETE + 追加 / staging 合并）各用一个独立的库
+    engine = get_engine(db)
+    written = op.assign(日期=pd.to_datetime(op["日期"]).dt.date)
+    dtype = get_dtype_for_operation(written)
+    add("import_to_mysql",
+        lambda df: legacy_import_to_mysql(df, "bench_import", db, dtype=dtype, if_exists="replace"),
+        lambda df: import_to_mysql(df, "bench_import", db, dtype=dtype, if_exists="replace"),
+        lambda: written)
+
+    cpc = pd.read_sql("SELECT * FROM cpc_hourly_data", engine).drop(columns="id", errors="ignore")
+    cpc["date"] = pd.to_datetime(cpc["date"]).dt.date
+    cpc["start_time"] = pd.to_datetime(cpc["start_time"])
+    cpc_dtype = get_dtype_for_cpc_hourly(cpc)
+    legacy_db = f"sqlite:///{os.path.join(tmp, 'legacy.db')}"
+    import_to_mysql(cpc, "cpc_hourly_data", legacy_db, dtype=cpc_dtype)
+    with get_engine(legacy_db).begin() as conn:
+        conn.execute(text("CREATE INDEX ix_store_date ON cpc_hourly_data (store_id, date)"))
+    t_old = min(legacy_reimport(cpc, legacy_db)[0] for _ in range(repeat))
+    t_new, _ = best_of(lambda df: upsert_via_staging(df, "cpc_hourly_data", db, dtype=cpc_dtype), lambda: cpc, repeat)
+    pairs["reimport_cpc"] = (t_old, t_new)
+    get_engine(legacy_db).dispose()
+
+    # 表结构：每个导出文件对齐列时查一次 operation_data 的列名；当前实现每轮只反射一次，其余命中缓存
+    calls = len(export_files(root))
+    add("table_columns",
+        lambda e: [legacy_table_columns(e, "operation_data") for _ in range(calls)],
+        lambda e: [table_columns(e, "operation_data") for _ in range(calls)],
+        lambda: invalidate_schema(engine, "operation_data") or engine)
+
+    table = pd.DataFrame(pairs, index=["legacy", "current"]).T
+    table["speedup"] = table["legacy"] / table["current"]
+    return table
+
+
+def load_history(path):
+    if not os.path.exists(path):
+        return []
+    with open(path, encoding="utf-8") as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+
+def append_history(path, record):
+    with open(path, "a", encoding="utf-8") as f:
+        f.write(json.dumps(record, ensure_ascii=False) + "\n")
+
+
+def pick_baseline(history, scale, commit):
+    """同规模下最近一次其他提交的记录；没有时退而取同规模的最近一次记录"""
+    same = [r for r in history if r["scale"] == scale]
+    others = [r for r in same if r["commit"] != commit]
+    return (others or same or [None])[-1]
+
+
+def compare(results, baseline, threshold):
+    """逐项对比，返回 (对比表, 变慢项列表)"""
+    base = baseline["results"] if baseline else {}
+    table = pd.DataFrame({"seconds": pd.Series(results), "baseline": pd.Series(base, dtype=float)}).reindex(list(results))
+    table["change"] = table["seconds"] / table["baseline"] - 1
+    slower = (table["change"] > threshold) & (table["seconds"] - table["baseline"] > MIN_REGRESSION_SECONDS)
+    table["flag"] = ["⚠️" if s else "" for s in slower]
+    return table, list(table.index[slower])
+
+
+def main():
+    parser = argparse.ArgumentParser(description="导入链路基准测试（合成导出 + SQLite），按提交记录并检查回退")
+    parser.add_argument("--brands", type=int, default=4)
+    parser.add_argument("--days", type=int, default=30)
+    parser.add_argument("--stores", type=int, default=5, help="每个品牌的门店数")
+    parser.add_argument("--reviews", type=int, default=500, help="每个品牌的评价条数")
+    parser.add_argument("--repeat", type=int, default=3, help="清洗函数计时取 repeat 次里的最快值")
+    parser.add_argument("--history", default=BENCH_HISTORY_PATH, help="历史记录文件（JSON Lines）")
+    parser.add_argument("--threshold", type=float, default=BENCH_REGRESSION_THRESHOLD, help="变慢超过该比例视为回退")
+    parser.add_argument("--no-record", action="store_true", help="只对比，不写入历史")
+    parser.add_argument("--check", action="store_true", help="有回退时以退出码 1 结束")
+    parser.add_argument("--legacy", action="store_true", help="再对比 bench_legacy 里的旧实现（不写入历史）")
+    args = parser.parse_args()
+
+    scale = {"brands": args.brands, "days": args.days, "stores": args.stores, "reviews": args.reviews}
+    with tempfile.TemporaryDirectory() as tmp:
+        # 清洗结果缓存会让第二次起的读表直接命中，表结构缓存不能落到真实的 .schema_cache.json
+        parse_cache.PARSE_CACHE_ENABLED = False
+        schema_registry.SCHEMA_CACHE_PATH = os.path.join(tmp, ".schema_cache.json")
+        root = os.path.join(tmp, "exports")
+        t0 = time.perf_counter()
+        store_mapping = generate_exports(root, args.brands, args.days, args.stores, args.reviews)
+        t_generate = time.perf_counter() - t0
+
+        with contextlib.redirect_stdout(io.StringIO()):
+            results, op_raw, cpc_frames = load_exports(root)
+            results.update(time_cleaning(op_raw, cpc_frames, store_mapping, args.repeat))
+            db = f"sqlite:///{os.path.join(tmp, 'bench.db')}"
+            engine = prepare_db(db, store_mapping, load_templates())
+            results["end_to_end_import"], rows = run_end_to_end(root, db)
+            legacy = time_legacy(root, op_raw, cpc_frames, store_mapping, db, tmp, args.repeat) if args.legacy else None
+        engine.dispose()
+
+    commit, dirty = git_revision()
+    history = load_history(args.history)
+    baseline = pick_baseline(history, scale, commit)
+    table, regressions = compare(results, baseline, args.threshold)
+
+    expected_op = args.brands * args.days * args.stores
+    assert rows["operation_data"] == expected_op, (rows, expected_op)
+    assert rows["cpc_hourly_data"] == sum(len(df) for _, df in cpc_frames), rows
+    assert rows["review_data"] == args.brands * args.reviews, rows
+
+    print(f"🧪 {args.brands} 个品牌 × {args.days} 天 × {args.stores} 店（合成导出 {t_generate:.1f}s），"
+          f"入库行数 {rows}")
+    against = f"{baseline['commit']}（{baseline['recorded_at']}）" if baseline else "无（首次记录）"
+    print(f"⏱️ 当前 {commit}{'（有未提交改动）' if dirty else ''}，对比基线：{against}")
+    print(table.to_string(na_rep="-", formatters={
+        "seconds": "{:.3f}s".format,
+        "baseline": "{:.3f}s".format,
+        "change": "{:+.0%}".format,
+    }))
+
+    if legacy is not None:
+        print("🐢 旧实现对比（bench_legacy，同一批导出，不写入历史）：")
+        print(legacy.to_string(formatters={
+            "legacy": "{:.3f}s".format,
+            "current": "{:.3f}s".format,
+            "speedup": "{:.1f}×".format,
+        }))
+
+    if not args.no_record:
+        append_history(args.history, {
+            "commit": commit,
+            "dirty": dirty,
+            "recorded_at": datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
+            "python": platform.python_version(),
+            "pandas": pd.__version__,
+            "scale": scale,
+            "results": results,
+            "rows": rows,
+        })
+        print(f"📝 已追加到 {args.history}")
+    if regressions:
+        print(f"⚠️ {len(regressions)} 项比基线慢 {args.threshold:.0%} 以上：{', '.join(regressions)}")
+        if args.check:
+            sys.exit(1)
+    else:
+        print("✅ 没有发现性能回退")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,301 @@
+# brand_parser.py —— 单个品牌目录的“解析 + 清洗”（纯 CPU，不碰数据库），供 main.process_files 在进程池里并行调用
+import logging
+import os
+
+import numpy as np
+import pandas as pd
+
+from column_mappings import COLUMN_MAPPING_CPC_HOURLY
+from excel_header_finder import clean_and_load_excel
+from data_cleaning import (
+    clean_operation_data,
+    clean_numeric_columns,
+    drop_percentage_columns,
+    match_store_id_for_single_cpc,
+    process_cpc_dates, add_datetime_column,
+)
+from date_completion import complete_export_dates
+from rankings import build_rankings_detail_column
+from extra_metrics import pack_extra_metrics
+from review_cleaner import clean_review_file
+from import_manifest import describe_file, file_sha256
+from parse_cache import cached_clean, frame_fingerprint, CACHE_STATS
+from database_importer import get_dtype_for_cpc_hourly, get_dtype_for_operation
+from dtype_planner import compact_frame, MEMORY_STATS
+from schema_registry import record_drift, DRIFT_STATS
+from stage_metrics import stage, run_stage, stage_scope, STAGE_STATS
+from config import COMPACT_DTYPES
+
+# 只处理包含这些关键字的文件，避免将其他 Excel 当作 CPC 导入
+CPC_FILE_KEYWORDS = ["推广报表", "账号报表", "门店报表"]
+# 多份推广报表合并补全日期时记录每行来源文件名的临时列
+SOURCE_FILE_COL = "__来源文件"
+
+
+def is_cpc_file(fname):
+    return fname.endswith(".xlsx") and any(k in fname for k in CPC_FILE_KEYWORDS)
+
+
+def is_operation_file(fname):
+    # 只处理运营表，跳过所有带“推广报表”或“评价”关键字的 .xlsx
+    return fname.endswith(".xlsx") and "推广报表" not in fname and "评价" not in fname
+
+
+def is_review_file(fname):
+    return fname.endswith(".xlsx") and "评价" in fname
+
+
+def is_product_file(fname):
+    return fname.endswith(".xlsx") and "商品" in fname
+
+
+def clean_cpc_dated(fp, df, store_mapping):
+    """日期已补全（非法行已去掉）的推广通报表：匹配门店 → 去百分比列 → 数值清洗"""
+    with stage_scope(file_name=fp):
+        df = run_stage("store_match", match_store_id_for_single_cpc, df, store_mapping)
+        df = run_stage("drop_percent", drop_percentage_columns, df)
+        df = run_stage("numeric_clean", clean_numeric_columns, df)
+    return df
+
+
+def clean_cpc_file(fp, store_mapping):
+    """单个推广通报表：读取 → 补全年份 → 匹配门店 → 去百分比列 → 数值清洗 → 起始时间"""
+    with stage_scope(file_name=fp):
+        df = clean_and_load_excel(fp)
+        df = run_stage("cpc_dates", process_cpc_dates, df, os.path.basename(fp))
+        df = clean_cpc_dated(fp, df, store_mapping)
+        df = run_stage("start_time", add_datetime_column, df)
+    return df
+
+
+def clean_cpc_batch(files, store_mapping):
+    """
+    多份推广报表一次清洗（一整年回补时的几十份周报），步骤与逐个 clean_cpc_file 相同、结果一致：
+    逐文件读取（按文件内容缓存原始表，与门店映射无关）→ 各文件的日期列合并后按各自文件名的起始日一次补全年份、去掉补不全的行（合计行等）
+    → 逐文件匹配门店 / 去百分比列 / 数值清洗 → 合并后一次构造起始时间。
+    files 为 [(文件路径, 内容哈希或 None), ...]；返回合并结果，SOURCE_FILE_COL 列为来源文件名
+    """
+    raws = []
+    for fp, content_hash in files:
+        with stage_scope(file_name=fp):
+            raws.append(cached_clean(fp, "cpc_raw", clean_and_load_excel, content_hash))
+    names = [os.path.basename(fp) for fp, _ in files]
+    sizes = [len(df) for df in raws]
+    dates = pd.DataFrame({
+        "日期": pd.concat([df["日期"] for df in raws], ignore_index=True),
+        SOURCE_FILE_COL: np.repeat(names, sizes),
+        "file": np.repeat(np.arange(len(raws)), sizes),
+        "row": np.concatenate([np.arange(n) for n in sizes]),
+    })
+    # 跨文件的阶段记到这批文件名下（单文件时即该文件），阶段统计里仍能按文件查
+    batch_label = names[0] if len(names) == 1 else f"{names[0]} 等 {len(names)} 个文件"
+    with stage_scope(file_name=batch_label):
+        dates = run_stage("cpc_dates", complete_export_dates, dates, SOURCE_FILE_COL)
+    kept = dict(tuple(dates.groupby("file", sort=False)))
+
+    frames = []
+    for i, ((fp, _), raw) in enumerate(zip(files, raws)):
+        day = kept.get(i, dates.iloc[:0])
+        df = raw.iloc[day["row"].to_numpy()].assign(日期=day["日期"].to_numpy())
+        frames.append(clean_cpc_dated(fp, df, store_mapping).assign(**{SOURCE_FILE_COL: names[i]}))
+    df = pd.concat(frames, ignore_index=True)
+    with stage_scope(file_name=batch_label):
+        return run_stage("start_time", add_datetime_column, df)
+
+
+def clean_operation_file(fp):
+    """单个运营表：读取 → 基础清洗 → 去百分比列 → 数值清洗"""
+    with stage_scope(file_name=fp):
+        df_op = run_stage("op_clean", clean_operation_data, clean_and_load_excel(fp))
+        df_op = run_stage("drop_percent", drop_percentage_columns, df_op)
+        df_op = run_stage("numeric_clean", clean_numeric_columns, df_op)
+    return df_op
+
+
+def _dedupe_products(df):
+    df['日期'] = pd.to_datetime(df['日期'], errors='coerce').dt.date
+    return df.drop_duplicates(subset=['日期', '商品ID'], keep='last')
+
+
+def clean_product_file(fp):
+    """单个商品日明细：读取 → 数值清洗 → 日期 → 按 (日期, 商品ID) 去重"""
+    with stage_scope(file_name=fp):
+        df = clean_and_load_excel(fp)
+        df = run_stage("numeric_clean", clean_numeric_columns, df, key_col='商品ID')
+        df = run_stage("dedupe", _dedupe_products, df)
+    return df
+
+
+def _mapping_key(store_mapping):
+    # CPC / 评价的清洗结果依赖门店映射，映射一变缓存就要失效
+    return frame_fingerprint(store_mapping)
+
+
+def _changed_files(brand_dir, fnames, table_name, known_hashes):
+    """按内容哈希筛掉已导入 table_name（manifest 里已有）的文件，返回 [(文件路径, 哈希), ...]"""
+    changed = []
+    for fname in fnames:
+        fp = os.path.join(brand_dir, fname)
+        content_hash = file_sha256(fp)
+        if (table_name, content_hash) in known_hashes:
+            print(f"⏭️ 文件未变化，跳过：{fp}")
+            continue
+        changed.append((fp, content_hash))
+    return changed
+
+
+def build_cpc_frame(frames, label=""):
+    """若干份清洗后的推广报表 → cpc_hourly_data 入库格式：合并、生成 plan_key、重命名、去重"""
+    with stage("dedupe", sum(len(f) for f in frames)) as rec:
+        df_cpc = pd.concat(frames, ignore_index=True)
+
+        # 生成唯一标识并重命名、去重
+        df_cpc['plan_key'] = (
+            df_cpc['门店ID'].astype(str).str.strip()
+            + "_"
+            + df_cpc['推广名称'].astype(str).str.strip()
+            + "_"
+            + df_cpc['平台'].astype(str).str.strip()
+        )
+        df_cpc.rename(columns=COLUMN_MAPPING_CPC_HOURLY, inplace=True)
+        df_cpc.drop_duplicates(subset=['plan_key', 'start_time'], inplace=True)
+        df_cpc['date'] = pd.to_datetime(df_cpc['date']).dt.date
+        rec["rows_out"] = len(df_cpc)
+    if COMPACT_DTYPES:
+        df_cpc = run_stage("compact", compact_frame, df_cpc, get_dtype_for_cpc_hourly(df_cpc), f"{label} CPC")
+    return df_cpc
+
+
+def build_operation_frame(frames, existing_cols, label=""):
+    """
+    若干份清洗后的运营表 → operation_data 入库格式：合并去重后拆成 flat 列
+    + extra_metrics/ros_score/rankings_detail；existing_cols 为 operation_data 表现有列。
+    """
+    # 合并去重、转 datetime
+    with stage("dedupe", sum(len(f) for f in frames)) as rec:
+        df_op_all = pd.concat(frames, ignore_index=True)
+        df_op_all.drop_duplicates(subset=["日期", "美团门店ID"], keep="last", inplace=True)
+        df_op_all["日期"] = pd.to_datetime(df_op_all["日期"]).dt.date
+        rec["rows_out"] = len(df_op_all)
+
+    # 取表里已存在的列作为 flat 列
+    if not existing_cols:
+        raise ValueError("❌ 未获取到 operation_data 表结构，无法确定 flat 列！")
+    flat_cols = [c for c in existing_cols if c in df_op_all.columns]
+    df_basic = df_op_all[flat_cols].copy()
+    # 表里没有的导出列都进 extra_metrics，记下来供运行结束时的漂移报告
+    record_drift("operation_data", df_op_all.columns, existing_cols, label)
+
+    # —— dynamic extra_metrics ——
+    dynamic_df = df_op_all.drop(columns=flat_cols, errors="ignore")
+    df_basic["extra_metrics"] = run_stage("extra_metrics", pack_extra_metrics, dynamic_df)
+
+    # —— ROS 分 ——
+    if "ROS分" in df_op_all.columns:
+        df_basic["ros_score"] = pd.to_numeric(
+            df_op_all["ROS分"], errors="coerce"
+        ).fillna(0).astype(int)
+
+    # —— 排行榜详情 JSON ——
+    df_basic["rankings_detail"] = run_stage("rankings", build_rankings_detail_column, df_op_all)
+
+    # JSON 列拼好之后再压缩，extra_metrics / rankings_detail 的文本不受 dtype 变化影响
+    if COMPACT_DTYPES:
+        df_basic = run_stage("compact", compact_frame, df_basic, get_dtype_for_operation(df_basic), f"{label} 运营")
+    return df_basic
+
+
+def parse_cpc_files(brand_dir, store_mapping, known_hashes=frozenset()):
+    """
+    读取品牌目录下所有（内容有变化的）推广通报表，经 clean_cpc_batch 合并后一次补全日期，再生成 plan_key 并去重。
+    返回 (df_cpc, manifest 记录列表)；没有需要导入的报表时 df_cpc 为 None。
+    """
+    cpc_files = _changed_files(
+        brand_dir, [f for f in os.listdir(brand_dir) if is_cpc_file(f)], "cpc_hourly_data", known_hashes
+    )
+    if not cpc_files:
+        return None, []
+    df = clean_cpc_batch(cpc_files, store_mapping)
+    by_file = dict(tuple(df.groupby(SOURCE_FILE_COL, sort=False)))
+    entries = [
+        describe_file(fp, content_hash, "cpc_hourly_data", by_file.get(os.path.basename(fp), df.iloc[:0]), "日期")
+        for fp, content_hash in cpc_files
+    ]
+    return build_cpc_frame([df.drop(columns=SOURCE_FILE_COL)], os.path.basename(brand_dir)), entries
+
+
+def parse_operation_files(brand_dir, existing_cols, known_hashes=frozenset()):
+    """
+    读取品牌目录下所有（内容有变化的）运营表，合并去重后拆成 operation_data 的 flat 列
+    + extra_metrics/ros_score/rankings_detail；existing_cols 为 operation_data 表现有列（由主进程反射一次后传入）。
+    返回 (df_basic, manifest 记录列表)；没有需要导入的运营表时 df_basic 为 None。
+    """
+    op_files = _changed_files(
+        brand_dir, [f for f in os.listdir(brand_dir) if is_operation_file(f)], "operation_data", known_hashes
+    )
+    if not op_files:
+        return None, []
+    op_dfs, entries = [], []
+    for fp, content_hash in op_files:
+        df_op = cached_clean(fp, "operation", clean_operation_file, content_hash)
+        op_dfs.append(df_op)
+        entries.append(describe_file(fp, content_hash, "operation_data", df_op, "日期"))
+    return build_operation_frame(op_dfs, existing_cols, os.path.basename(brand_dir)), entries
+
+
+def parse_review_files(brand_dir, store_mapping, known_hashes=frozenset(), match_cache=None):
+    """
+    返回 [(文件名, 清洗后的评价 DataFrame, manifest 记录), ...]，跳过内容未变化的文件。
+    match_cache 为已知的 {门店名: store_id}，新模糊匹配出的结果会写回其中。
+    """
+    parsed = []
+    review_files = _changed_files(
+        brand_dir, [f for f in os.listdir(brand_dir) if is_review_file(f)], "review_data", known_hashes
+    )
+    mapping_key = _mapping_key(store_mapping)
+    for fp, content_hash in review_files:
+        with stage_scope(file_name=fp), stage("review_clean") as rec:
+            df_rev = cached_clean(fp, "review", lambda p: clean_review_file(p, store_mapping, match_cache), content_hash, mapping_key)
+            rec["rows_out"] = len(df_rev)
+        parsed.append((os.path.basename(fp), df_rev, describe_file(fp, content_hash, "review_data", df_rev, "review_date")))
+    return parsed
+
+
+def parse_brand(brand, brand_dir, store_mapping, op_existing_cols, known_hashes=frozenset(), store_matches=None):
+    """
+    依次解析 CPC → 运营 → 评价。某一步出错时保留之前已解析的结果并记录 error，
+    由写库方按原顺序写入已解析部分后再把品牌记为失败（与串行版“先写 CPC、再处理运营”的结果一致）。
+    known_hashes 为 import_manifest 里已入库的 (表名, 文件哈希)，命中的文件直接跳过；
+    store_matches 为 review_store_match 里已知的 {门店名: store_id}，本品牌新匹配出的结果放在 parsed["store_matches"] 带回。
+    """
+    parsed = {
+        "brand": brand, "brand_dir": brand_dir,
+        "cpc": None, "cpc_files": [], "op": None, "op_files": [], "reviews": [],
+        "error": None, "cache": (0, 0), "memory": [], "store_matches": {}, "drift": [], "stages": [],
+    }
+    known_matches = store_matches or {}
+    match_cache = dict(known_matches)
+    hits, misses = CACHE_STATS["hit"], CACHE_STATS["miss"]
+    memory_start, drift_start, stage_start = len(MEMORY_STATS), len(DRIFT_STATS), len(STAGE_STATS)
+    try:
+        with stage_scope(brand=brand):
+            parsed["cpc"], parsed["cpc_files"] = parse_cpc_files(brand_dir, store_mapping, known_hashes)
+            if parsed["cpc"] is None:
+                logging.info(f"品牌 {brand} 下无新的 CPC 相关报表，跳过。")
+
+            parsed["op"], parsed["op_files"] = parse_operation_files(brand_dir, op_existing_cols, known_hashes)
+            if parsed["op"] is None:
+                logging.info(f"品牌 {brand} 下无新的运营数据，跳过。")
+
+            parsed["reviews"] = parse_review_files(brand_dir, store_mapping, known_hashes, match_cache)
+            if not parsed["reviews"]:
+                logging.info(f"品牌 {brand} 下无新的评价文件，跳过。")
+    except Exception as e:
+        parsed["error"] = str(e)
+    # 进程池模式下各子进程的计数互不相通，随结果带回主进程汇总
+    parsed["cache"] = (CACHE_STATS["hit"] - hits, CACHE_STATS["miss"] - misses)
+    parsed["memory"] = MEMORY_STATS[memory_start:]
+    parsed["drift"] = DRIFT_STATS[drift_start:]
+    parsed["stages"] = STAGE_STATS[stage_start:]
+    parsed["store_matches"] = {k: v for k, v in match_cache.items() if k not in known_matches}
+    return parsed
@@ -3,6 +3,8 @@ import pandas as pd
 import re
 import numpy as np
 
+from date_completion import complete_month_day, export_start_date
+
 def clean_operation_data(df):
     # 去除字符串型数据两端的空格
     for col in df.select_dtypes(include=['object']).columns:
@@ -13,53 +15,194 @@ def clean_operation_data(df):
 
     return df
 
-def drop_percentage_columns(df):
-    percent_columns = [col for col in df.columns if df[col].astype(str).str.contains('%').any()]
+# 表头签名 → 需要删除的百分比列；同一种导出格式只检测一次
+_PERCENT_COLUMNS_CACHE = {}
+PERCENT_SAMPLE_SIZE = 20
+
+
+def _has_percent(s: pd.Series) -> bool:
+    # 数值/日期列转成字符串也不可能出现 '%'，直接跳过
+    if pd.api.types.is_numeric_dtype(s.dtype) or pd.api.types.is_datetime64_any_dtype(s.dtype):
+        return False
+    values = s.to_numpy(dtype=object)
+    # 先看前几个值，百分比列通常第一行就能命中
+    if any('%' in str(v) for v in values[:PERCENT_SAMPLE_SIZE]):
+        return True
+    # 再把剩下的值（去掉 NaN）拼成一个字符串查找，避免逐单元格 str.contains
+    rest = values[PERCENT_SAMPLE_SIZE:]
+    rest = rest[rest == rest]
+    try:
+        return '%' in '\x00'.join(rest)
+    except TypeError:
+        return '%' in '\x00'.join(rest.astype(str))
+
+
+def drop_percentage_columns(df, use_cache=True):
+    """
+    删除含 '%' 的列（百分比指标不入库）。
+    use_cache=True 时按表头签名缓存检测结果，同一布局的后续文件直接删除同样的列
+    """
+    signature = tuple(df.columns)
+    percent_columns = _PERCENT_COLUMNS_CACHE.get(signature) if use_cache else None
+    if percent_columns is None:
+        percent_columns = [col for col in df.columns if _has_percent(df[col])]
+        if use_cache:
+            _PERCENT_COLUMNS_CACHE[signature] = percent_columns
     return df.drop(columns=percent_columns)
 
+
+def clear_percentage_cache():
+    _PERCENT_COLUMNS_CACHE.clear()
+
 import pandas as pd
 import numpy as np
 
-def clean_numeric_columns(df: pd.DataFrame, key_col: str = None) -> pd.DataFrame:
+NUMERIC_SKIP_COLUMNS = {
+    '日期', '时段', '推广门店', '推广名称',
+    '门店名称', '门店ID', '美团门店ID', '平台', '城市', '门店所在城市'
+}
+
+
+_SLASH = object()  # '/' 哨兵
+
+
+def _clean_cell(raw):
+    # 与逐单元格版本一致：去千分位逗号和两端空白，'/' 记哨兵，能转 float 就转，否则保留原字符串
+    raw = str(raw).replace(',', '').strip()
+    if raw == '/':
+        return _SLASH
+    try:
+        return float(raw)
+    except:
+        return raw
+
+
+# 宽表拼接后一起 factorize 的单元格上限：再大哈希表反而变慢，行数超过它的列单独处理
+_STACK_CELLS = 100_000
+
+
+def _clean_uniques(uniques):
+    """
+    对去重后的字符串取值做清洗，返回 (converted, is_slash, texts)：
+    converted 为 float64 数组（'/' 与文本位置为 NaN）；texts 为保留下来的文本（object 数组，非文本位置为 None），
+    没有文本时为 None。纯数字直接一次 numpy float 转换；去逗号/空白、'/' 判定批量做；
+    混有文本时先用 to_numeric 粗筛出数字，数字仍按 Python float() 转换（与逐单元格版本逐位一致），只有剩下的逐值处理
+    """
+    n = len(uniques)
+    is_slash = np.zeros(n, dtype=bool)
+    try:
+        return uniques.astype(np.float64), is_slash, None
+    except ValueError:
+        pass
+    # factorize 之后的取值都是 str（非字符串列已先 astype(str)），直接用 str 方法比 .str 访问器快
+    stripped = np.array([u.replace(',', '').strip() for u in uniques], dtype=object)
+    is_slash = stripped == '/'
+    rest = np.flatnonzero(~is_slash)
+    converted = np.full(n, np.nan)
+    try:
+        converted[rest] = stripped[rest].astype(np.float64)
+        return converted, is_slash, None
+    except ValueError:
+        pass
+    numeric = rest[pd.notna(pd.to_numeric(stripped[rest], errors='coerce'))]
+    try:
+        converted[numeric] = stripped[numeric].astype(np.float64)
+    except ValueError:
+        numeric = rest[:0]
+    texts = np.full(n, None, dtype=object)
+    for i in np.setdiff1d(rest, numeric):
+        cell = _clean_cell(stripped[i])
+        if isinstance(cell, str):
+            texts[i] = cell
+        else:
+            converted[i] = cell
+    return converted, is_slash, texts
+
+
+def _clean_block(values):
     """
-    只对真正的数值指标列做清洗：
+    清洗一段首尾相接的列值，返回 (cleaned, slash, text)：
+    cleaned 为 float64（'/'、空值与文本位置为 NaN），slash 标记 '/'，text 为保留的文本（没有文本时为 None）
+    """
+    codes, uniques = pd.factorize(values)
+    converted, is_slash, texts = _clean_uniques(uniques)
+    # 末尾补一个 NaN 槽位，缺失值的 code=-1 正好取到它（NaN 最终也会变成 0）
+    cleaned = np.append(converted, np.nan)[codes]
+    slash = np.append(is_slash, False)[codes]
+    text = None if texts is None else np.append(texts, None)[codes]
+
+    # None 等非 NaN 的空值按旧逻辑先转成字符串再处理（极少见）
+    missing = np.flatnonzero(codes == -1)
+    for i in missing[[not isinstance(v, float) for v in values[missing]]]:
+        cell = _clean_cell(values[i])
+        slash[i] = cell is _SLASH
+        if isinstance(cell, str):
+            if text is None:
+                text = np.full(len(values), None, dtype=object)
+            text[i] = cell
+        elif not slash[i]:
+            cleaned[i] = cell
+    return cleaned, slash, text
+
+
+def clean_numeric_columns(df: pd.DataFrame, key_col: str = None, report: dict = None) -> pd.DataFrame:
+    """
+    只对真正的数值指标列做清洗（向量化，只对去重后的取值做转换）：
       – 精确等于 '/' 的单元格记为异常，并设为 0
       – 其它能转成数字的字符串转为 float
       – 无法转成数字的非指标列保持原值
+    行数少的宽表（运营表几百列、每列几百行）按 _STACK_CELLS 把若干列首尾相接后一起 factorize，
+    省掉逐列的固定开销；行数多的列单独 factorize，哈希表更小、更快。
     key_col: 指定门店名称或门店ID列，用于打印出哪个品牌出问题
+    report:  传入 dict 时按列记录坏值个数 {列名: {'slash': '/' 个数, 'text': 保留的非数字个数}}
     """
     bad_set = set()
     # 跳过“非指标列”，按表头实际名称调整
-    skip = {
-        '日期', '时段', '推广门店', '推广名称',
-        '门店名称', '门店ID', '美团门店ID', '平台', '城市', '门店所在城市'
-    }
-
-    for col in df.columns:
-        # 仅处理 object 类型、且不在 skip 列表里的那些列
-        if df[col].dtype != 'object' or col in skip:
-            continue
-
-        # 去掉千分位逗号和两端空白
-        s = df[col].astype(str).str.replace(',', '', regex=False).str.strip()
-        cleaned = []
-
-        for idx, raw in enumerate(s):
-            if raw == '/':
-                # 碰到纯 "/"，记录品牌和列后设为 NaN
-                brand = df.at[idx, key_col] if key_col and key_col in df.columns else None
-                bad_set.add((brand, col))
-                num = np.nan
-            else:
-                # 其它先尝试转 float，失败则保留原字符串
-                try:
-                    num = float(raw)
-                except:
-                    num = raw
-            cleaned.append(num)
+    skip = NUMERIC_SKIP_COLUMNS
+    # 仅处理 object 类型、且不在 skip 列表里的那些列
+    cols = [] if df.empty else [col for col, dtype in df.dtypes.items() if dtype == 'object' and col not in skip]
+    if not cols:
+        return df
+
+    n = len(df)
+    keys = df[key_col].to_numpy(dtype=object) if key_col and key_col in df.columns else None
+    per_block = max(1, _STACK_CELLS // n)
+    for start in range(0, len(cols), per_block):
+        block_cols = cols[start:start + per_block]
+        blocks = []
+        for col in block_cols:
+            values = df[col].to_numpy(dtype=object)
+            if pd.api.types.infer_dtype(values) not in ('string', 'empty'):
+                # 混有数字/布尔等非字符串对象时按旧逻辑先整体转字符串，避免 1、1.0、True 被去重成同一个值
+                values = df[col].astype(str).to_numpy(dtype=object)
+            blocks.append(values)
+        cleaned, slash, text = _clean_block(blocks[0] if len(blocks) == 1 else np.concatenate(blocks))
+        # 把 NaN（即那些 "/" 与空值）替换成 0
+        zeroed = np.isnan(cleaned)
+        cleaned[zeroed] = 0
+
+        for j, col in enumerate(block_cols):
+            part = slice(j * n, (j + 1) * n)
+            col_slash = slash[part]
+            col_text = text[part] if text is not None else None
+            has_text = col_text != None if col_text is not None else None  # noqa: E711
+
+            if col_slash.any():
+                # 碰到纯 "/"，记录品牌和列（已设为 0）
+                brands = keys[col_slash] if keys is not None else [None]
+                bad_set.update((brand, col) for brand in brands)
+
+            if report is not None:
+                report[col] = {'slash': int(col_slash.sum()), 'text': 0 if has_text is None else int(has_text.sum())}
 
-        # 回写：把 NaN（即那些 "/"）逻辑替换成 0，其它字符串保留
-        df[col] = pd.Series(cleaned, index=df.index).replace({np.nan: 0})
+            # 回写：整列没有文本的落成 float64，否则 object 列里数字与保留的文本并存
+            col_cleaned = cleaned[part]
+            if has_text is not None and has_text.any():
+                col_cleaned = col_cleaned.astype(object)
+                col_cleaned[has_text] = col_text[has_text]
+                # object 列里补的 0 与旧版 replace({np.nan: 0}) 一样是 int
+                col_cleaned[zeroed[part] & ~has_text] = 0
+            df[col] = col_cleaned
 
     # 汇总打印：每个品牌+列 只报一次
     if bad_set:
@@ -89,78 +232,25 @@ def add_datetime_column(df):
     if "日期" not in df.columns or "时段" not in df.columns:
         return df
 
-    def extract_start_time(row):
-        try:
-            date_part = row["日期"]
-            time_range = row["时段"]
-            start_time = time_range.split("~")[0].strip()
-            full = f"{date_part} {start_time}"
-            return pd.to_datetime(full, format="%Y-%m-%d %H:%M", errors="coerce")
-        except:
-            return pd.NaT
-
-    df["起始时间"] = df.apply(extract_start_time, axis=1)
+    # 整列拆出时段起点；非字符串（空值等）得到 NaN，最终为 NaT
+    slot = df["时段"]
+    if slot.dtype == object:
+        start_time = slot.str.split("~").str[0].str.strip()
+    else:
+        start_time = pd.Series(np.nan, index=df.index, dtype=object)
+
+    # 与 f"{date_part}" 的写法保持一致：object 列逐值 str()，其他类型（如 datetime64）按元素转成字符串
+    date_part = df["日期"].astype(str) if df["日期"].dtype == object else df["日期"].map(str)
+
+    # 固定格式一次性解析（to_datetime 会对重复的“日期 时段”字符串自动缓存）
+    df["起始时间"] = pd.to_datetime(date_part + " " + start_time, format="%Y-%m-%d %H:%M", errors="coerce")
     return df
 
 
 def process_cpc_dates(df, filename):
-    import re
-    from datetime import datetime
-
-    # 1. 从文件名提取起止日期（YYYYMMDD），用于确定“本文件数据的起始年份”
-    match = re.search(r'_(\d{8})_(\d{8})_', filename)
-    if not match:
-        raise ValueError(f"文件名 {filename} 中不包含有效的起止日期格式")
-    start_date_str = match.group(1)  # 例如 "20241230"
-    # end_date_str = match.group(2)  # 实际上无需用到 end_date 进行跨年判断，只需要起始年份
-    start_date = datetime.strptime(start_date_str, "%Y%m%d")
-
-    # 2. 读取原始“月-日”字符串（类似 "12-30"、"01-05"），去重后生成列表
-    raw_dates = df['日期'].dropna().unique()
-
-    # 3. 针对每个 "MM-DD"，先尝试把它拼到“start_date.year”那一年：
-    #    - 若拼出的日期 candidate >= start_date，说明这些就是当年（year = start_year）；
-    #    - 否则说明它实际跨年到了下一年（year = start_year + 1）。
-    date_candidates = []
-    for ds in raw_dates:
-        try:
-            m_str, d_str = ds.strip().split('-')
-            month = int(m_str)
-            day = int(d_str)
-        except Exception:
-            # 如果无法拆分成 MM-DD，直接跳过
-            continue
-
-        # attempt 拼成年初候选日期
-        try:
-            candidate = datetime(year=start_date.year, month=month, day=day)
-        except ValueError:
-            # 如果拼不成合法日期（比如“02-30”），跳过
-            continue
-
-        # 如果 candidate 比 start_date 还小，说明它要跨年到下一年
-        if candidate < start_date:
-            candidate = candidate.replace(year=start_date.year + 1)
-
-        # 收集 (candidate_datetime, 原始字符串) 以便后面排序
-        date_candidates.append((candidate, ds))
-
-    # 4. 把上述 (candidate, ds) 按 candidate 从早到晚排序，这样得到的顺序即为 文件内部的真实时间线
-    date_candidates.sort(key=lambda x: x[0])
-
-    # 5. 生成一个从“原始字符串”到“带年份完整日期”的映射
-    completed_map = {
-        ds: candidate.strftime("%Y-%m-%d")
-        for candidate, ds in date_candidates
-    }
-
-    # （可选）调试用：打印一下本文件的映射关系，确认是不是符合预期
-    # print(f"[DEBUG] process_cpc_dates 映射 for {filename}:")
-    # for cand, ds in date_candidates:
-    #     print(f"    {ds} → {cand.strftime('%Y-%m-%d')}")
-
-    # 6. 最后替换 DataFrame 中的 df['日期']
-    df['日期'] = df['日期'].map(completed_map)
-
-    # 7. 彻底去除掉仍然是 NaN 的行（如果有非法“月-日”格式，就会在映射后变成 NaN，被 drop）
+    """
+    按文件名里的起始日期（_YYYYMMDD_YYYYMMDD_）把 '日期' 列的 "MM-DD" 补全为 'YYYY-MM-DD'：
+    早于起始日的月-日视为跨年到下一年；非法“月-日”格式补全后为 NaN，整行去掉。
+    """
+    df['日期'] = complete_month_day(df['日期'], export_start_date(filename))
     return df.dropna(subset=['日期'])
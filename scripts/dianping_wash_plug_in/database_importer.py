@@ -1,23 +1,309 @@
-from sqlalchemy import create_engine
+import os
+import tempfile
+import time
+import uuid
+from collections import defaultdict
+
+import pandas as pd
+from sqlalchemy import create_engine, inspect, text
 import sqlalchemy.types as sqltypes
 from sqlalchemy.types import Integer, Float, String, Date
 from sqlalchemy import JSON, Integer
 
+from config import WRITE_CHUNKSIZE, USE_LOAD_DATA_INFILE
+from schema_registry import table_columns, invalidate_schema
+
+# 连接池：同一连接串（+ 是否开启 local_infile）在进程内只建一次 engine
+_ENGINES = {}
+
+# 本进程里已确认建好唯一索引的 (连接串, 表名, 键列)，之后的合并不再反射索引
+_MERGE_KEYS_READY = set()
+
+# 各表累计写入量：{table_name: [rows, seconds]}，供 print_write_summary() 汇总
+WRITE_STATS = defaultdict(lambda: [0, 0.0])
+
+
+def get_engine(db_connection_string, local_infile=False):
+    """返回进程内复用的 engine；MySQL 连接开启 pre_ping/recycle，避免长批次里拿到失效连接"""
+    key = (db_connection_string, local_infile)
+    if key not in _ENGINES:
+        kwargs = {}
+        if db_connection_string.startswith("mysql"):
+            kwargs.update(pool_pre_ping=True, pool_recycle=3600)
+            if local_infile:
+                kwargs["connect_args"] = {"local_infile": True}
+        _ENGINES[key] = create_engine(db_connection_string, **kwargs)
+    return _ENGINES[key]
+
+
+def _bind_columns(columns, col_types, dialect):
+    """
+    按列跑 SQLAlchemy 的 bind_processor（JSON 序列化、SQLite 的日期时间格式化等），
+    与 to_sql 默认路径写进库里的值一致；没有处理器的列原样返回
+    """
+    out = []
+    for values, col_type in zip(columns, col_types):
+        process = None
+        if col_type is not None:
+            # 方言实现（如 SQLite 的 DATETIME）才带格式化处理器，通用类型上取不到
+            process = sqltypes.to_instance(col_type).dialect_impl(dialect).bind_processor(dialect)
+        out.append([process(v) for v in values] if process else values)
+    return out
+
+
+def _insert_executemany(pd_table, conn, keys, data_iter):
+    """
+    to_sql 的 method：绕过 SQLAlchemy 逐块编译 INSERT，直接走 DBAPI executemany。
+    pymysql 会把同一条 INSERT ... VALUES 的 executemany 改写成多行 INSERT（按 max_stmt_length 分批），
+    SQLite 则原生批量执行。各列先过一遍类型的 bind_processor，与原来的 to_sql 写入结果一致。
+    """
+    prep = conn.dialect.identifier_preparer
+    mark = "?" if conn.dialect.paramstyle == "qmark" else "%s"
+    sql = (
+        f"INSERT INTO {prep.quote(pd_table.name)} ({', '.join(prep.quote(k) for k in keys)}) "
+        f"VALUES ({', '.join([mark] * len(keys))})"
+    )
+    rows = list(data_iter)
+    if rows:
+        columns = _bind_columns(list(zip(*rows)), [pd_table.table.c[k].type for k in keys], conn.dialect)
+        rows = list(zip(*columns))
+    cursor = conn.connection.cursor()
+    try:
+        cursor.executemany(sql, rows)
+        return cursor.rowcount
+    finally:
+        cursor.close()
+
+
+def _escape_load_data(s: pd.Series) -> pd.Series:
+    """按 LOAD DATA 默认格式（tab 分隔、反斜杠转义）输出文本，空值写成 \\N"""
+    na = s.isna()
+    if s.dtype.kind == "M":
+        out = s.dt.strftime("%Y-%m-%d %H:%M:%S")
+    elif s.dtype.kind == "b":
+        out = s.astype(int).astype(str)
+    elif s.dtype.kind in "iuf":
+        out = s.astype(str)
+    else:
+        out = (
+            s.astype(str)
+            .str.replace("\\", "\\\\", regex=False)
+            .str.replace("\t", "\\t", regex=False)
+            .str.replace("\n", "\\n", regex=False)
+            .str.replace("\r", "\\r", regex=False)
+            .str.replace("\0", "\\0", regex=False)
+        )
+    return out.mask(na, "\\N")
+
+
+def _load_data_infile(df, table_name, engine, dtype=None):
+    """
+    先把 df 写成临时 TSV，再一次性 LOAD DATA LOCAL INFILE（仅 MySQL/MariaDB，需服务端 local_infile=ON）；
+    dtype 里带 bind_processor 的列（如 JSON）先按类型处理，与 INSERT 路径写入的值一致
+    """
+    prep = engine.dialect.identifier_preparer
+    columns = ", ".join(prep.quote(c) for c in df.columns)
+    dtype = dtype or {}
+    bound = [c for c in df.columns if c in dtype]
+    if bound:
+        values = [df[c].astype(object).where(df[c].notna(), None).tolist() for c in bound]
+        df = df.assign(**dict(zip(bound, (
+            pd.Series(v, index=df.index, dtype=object)
+            for v in _bind_columns(values, [dtype[c] for c in bound], engine.dialect)
+        ))))
+    fields = [_escape_load_data(df[c]).tolist() for c in df.columns]
+    fd, path = tempfile.mkstemp(suffix=".tsv")
+    try:
+        with os.fdopen(fd, "w", encoding="utf-8", newline="") as f:
+            f.writelines("\t".join(row) + "\n" for row in zip(*fields))
+        with engine.begin() as conn:
+            res = conn.execute(text(
+                f"LOAD DATA LOCAL INFILE :path INTO TABLE {prep.quote(table_name)} "
+                f"CHARACTER SET utf8mb4 FIELDS TERMINATED BY '\\t' ESCAPED BY '\\\\' "
+                f"LINES TERMINATED BY '\\n' ({columns})"
+            ), {"path": path.replace("\\", "/")})
+            return res.rowcount
+    finally:
+        os.remove(path)
+
+
 # ✅ 通用函数（传入 if_exists 控制 replace/append）
-def import_to_mysql(df, table_name, db_connection_string, dtype=None, if_exists='append'):
-    engine = create_engine(db_connection_string)
+def import_to_mysql(df, table_name, db_connection_string, dtype=None, if_exists='append',
+                    chunksize=WRITE_CHUNKSIZE, load_data=USE_LOAD_DATA_INFILE):
+    """
+    批量写入：复用连接池 engine，按 chunksize 分块 executemany（MySQL 上即多行 INSERT）；
+    load_data=True 且目标是 MySQL 时改走 LOAD DATA LOCAL INFILE。
+    返回写入行数，并累计到 WRITE_STATS 里按表统计行/秒。
+    """
+    use_load_data = load_data and db_connection_string.startswith("mysql")
+    engine = get_engine(db_connection_string, local_infile=use_load_data)
+    t0 = time.perf_counter()
+    try:
+        if use_load_data:
+            # 先用 to_sql 建表 / 处理 replace，再把数据整体 LOAD 进去
+            df.head(0).to_sql(name=table_name, con=engine, if_exists=if_exists, index=False, dtype=dtype)
+            _load_data_infile(df, table_name, engine, dtype)
+        else:
+            df.to_sql(
+                name=table_name,
+                con=engine,
+                if_exists=if_exists,
+                index=False,
+                dtype=dtype,
+                chunksize=chunksize,
+                method=_insert_executemany,
+            )
+    except Exception as e:
+        print(f"❌ 数据导入表 {table_name} 失败: {e}")
+        raise
+    elapsed = time.perf_counter() - t0
+    WRITE_STATS[table_name][0] += len(df)
+    WRITE_STATS[table_name][1] += elapsed
+    rate = len(df) / elapsed if elapsed > 0 else float("inf")
+    print(f"✅ 数据成功导入表：{table_name}，模式：{if_exists}，{len(df)} 行，{rate:,.0f} 行/s")
+    return len(df)
+
+
+# 合并入库用的唯一键（staging → 目标表按此 upsert，重复导入幂等）
+MERGE_KEYS = {
+    "cpc_hourly_data": ("plan_key", "start_time"),
+    "operation_data": ("日期", "美团门店ID"),
+    "review_data": ("review_key",),
+    "product_daily": ("日期", "商品ID"),
+}
+
+
+def ensure_merge_key(engine, table_name, key_cols):
+    """目标表上没有覆盖 key_cols 的唯一索引时补建一个；MySQL 的 TEXT 列只能建前缀索引"""
+    inspector = inspect(engine)
+    wanted = set(key_cols)
+    existing = inspector.get_unique_constraints(table_name) + [
+        ix for ix in inspector.get_indexes(table_name) if ix.get("unique")
+    ]
+    if any(set(ix["column_names"]) == wanted for ix in existing):
+        return
+
+    prep = engine.dialect.identifier_preparer
+    col_types = {c["name"]: c["type"] for c in inspector.get_columns(table_name)}
+    parts = []
+    for col in key_cols:
+        part = prep.quote(col)
+        if engine.dialect.name == "mysql" and isinstance(col_types.get(col), sqltypes.Text):
+            part += "(191)"
+        parts.append(part)
+    index_name = prep.quote(f"uq_{table_name}_merge")
+    try:
+        with engine.begin() as conn:
+            conn.execute(text(f"CREATE UNIQUE INDEX {index_name} ON {prep.quote(table_name)} ({', '.join(parts)})"))
+    except Exception as e:
+        print(f"❌ 表 {table_name} 无法按 {key_cols} 建唯一索引（已有重复数据？请先去重）: {e}")
+        raise
+    print(f"✅ 已为表 {table_name} 建唯一索引：{key_cols}")
+
+
+def _merge_sql(dialect_name, target, staging, columns, key_cols, prep, update_existing=True):
+    cols = ", ".join(prep.quote(c) for c in columns)
+    updates = [c for c in columns if c not in key_cols] if update_existing else []
+    if dialect_name == "mysql":
+        if updates:
+            assignments = ", ".join(f"{prep.quote(c)} = VALUES({prep.quote(c)})" for c in updates)
+            return (
+                f"INSERT INTO {prep.quote(target)} ({cols}) SELECT {cols} FROM {prep.quote(staging)} "
+                f"ON DUPLICATE KEY UPDATE {assignments}"
+            )
+        # 只插新行：先按键排除已存在的行，rowcount 才是真正新插入的行数
+        # （连接开了 CLIENT_FOUND_ROWS，ON DUPLICATE KEY 命中的行也会计 1）
+        first = f"{prep.quote(target)}.{prep.quote(key_cols[0])}"  # 带表名，避免与 SELECT 里的 s.列 歧义
+        src_cols = ", ".join(f"s.{prep.quote(c)}" for c in columns)
+        matched = " AND ".join(f"t.{prep.quote(c)} <=> s.{prep.quote(c)}" for c in key_cols)
+        return (
+            f"INSERT INTO {prep.quote(target)} ({cols}) SELECT {src_cols} FROM {prep.quote(staging)} s "
+            f"WHERE NOT EXISTS (SELECT 1 FROM {prep.quote(target)} t WHERE {matched}) "
+            f"ON DUPLICATE KEY UPDATE {first} = {first}"
+        )
+    # SQLite / PostgreSQL：ON CONFLICT ... DO UPDATE（SQLite 需要 WHERE true 消除语法歧义）
+    keys = ", ".join(prep.quote(c) for c in key_cols)
+    if updates:
+        action = "DO UPDATE SET " + ", ".join(f"{prep.quote(c)} = excluded.{prep.quote(c)}" for c in updates)
+    else:
+        action = "DO NOTHING"
+    return (
+        f"INSERT INTO {prep.quote(target)} ({cols}) SELECT {cols} FROM {prep.quote(staging)} WHERE true "
+        f"ON CONFLICT ({keys}) {action}"
+    )
+
+
+def upsert_via_staging(df, table_name, db_connection_string, key_cols=None, dtype=None,
+                       chunksize=WRITE_CHUNKSIZE, update_existing=True):
+    """
+    先把 df 批量写进本次调用独占的 staging 表（{table_name}__staging_<pid>_<随机串>，
+    守护进程与手工 main.py 同时写同一张表也互不覆盖 / 误删），再在一个事务里按唯一键合并进目标表：
+    不再逐门店 DELETE ... DATE(date) BETWEEN，也不会让报表读到“删了一半、还没写完”的数据。
+    update_existing=False 时键已存在的行保持原样（只插入新行）。
+    目标表不存在时按 dtype 建表；返回写入行数，update_existing=False 时为实际新插入的行数。
+    """
+    key_cols = tuple(key_cols or MERGE_KEYS[table_name])
+    engine = get_engine(db_connection_string)
+    prep = engine.dialect.identifier_preparer
+    staging = f"{table_name}__staging_{os.getpid()}_{uuid.uuid4().hex[:8]}"
+    ready_key = (db_connection_string, table_name, key_cols)
+    t0 = time.perf_counter()
     try:
+        if not table_columns(engine, table_name):
+            df.head(0).to_sql(name=table_name, con=engine, index=False, dtype=dtype)
+            invalidate_schema(engine, table_name)
+            _MERGE_KEYS_READY.discard(ready_key)
+        if ready_key not in _MERGE_KEYS_READY:
+            ensure_merge_key(engine, table_name, key_cols)
+            _MERGE_KEYS_READY.add(ready_key)
+
+        # staging 写入在事务外完成，合并事务里只剩一条 INSERT ... SELECT，锁持有时间最短
         df.to_sql(
-            name=table_name,
+            name=staging,
             con=engine,
-            if_exists=if_exists,
+            if_exists="replace",
             index=False,
-            dtype=dtype
+            dtype=dtype,
+            chunksize=chunksize,
+            method=_insert_executemany,
         )
-        print(f"✅ 数据成功导入表：{table_name}，模式：{if_exists}")
+        with engine.begin() as conn:
+            merged = conn.execute(text(_merge_sql(
+                engine.dialect.name, table_name, staging, list(df.columns), key_cols, prep, update_existing
+            ))).rowcount
     except Exception as e:
-        print(f"❌ 数据导入表 {table_name} 失败: {e}")
+        # 表结构可能被改过（缓存过期 / 手工 ALTER），下次重新反射
+        invalidate_schema(engine, table_name)
+        _MERGE_KEYS_READY.discard(ready_key)
+        print(f"❌ 数据合并入表 {table_name} 失败: {e}")
         raise
+    finally:
+        # 清理失败只提示，不能盖掉上面合并时的原始异常
+        try:
+            with engine.begin() as conn:
+                conn.execute(text(f"DROP TABLE IF EXISTS {prep.quote(staging)}"))
+        except Exception as e:
+            print(f"⚠️ 清理 staging 表 {staging} 失败（可手动删除）: {e}")
+
+    elapsed = time.perf_counter() - t0
+    WRITE_STATS[table_name][0] += len(df)
+    WRITE_STATS[table_name][1] += elapsed
+    rate = len(df) / elapsed if elapsed > 0 else float("inf")
+    if update_existing:
+        print(f"✅ 数据成功合并入表：{table_name}，键：{key_cols}，{len(df)} 行，{rate:,.0f} 行/s")
+        return len(df)
+    print(f"✅ 数据成功合并入表：{table_name}，键：{key_cols}，{len(df)} 行中新增 {merged} 行，{rate:,.0f} 行/s")
+    return merged
+
+
+def print_write_summary():
+    """打印本次运行各表的累计写入行数与吞吐"""
+    if not WRITE_STATS:
+        return
+    print("📊 写库吞吐汇总：")
+    for table_name, (rows, seconds) in WRITE_STATS.items():
+        rate = rows / seconds if seconds > 0 else float("inf")
+        print(f"  • {table_name}: {rows} 行，{seconds:.2f}s，{rate:,.0f} 行/s")
 
 def get_dtype_for_cpc_hourly(df):
     dtype_mapping = {
@@ -45,6 +331,19 @@ def get_dtype_for_cpc_hourly(df):
         'group_orders': sqltypes.Integer,
         'flash_orders': sqltypes.Integer,
         'store_city': sqltypes.String(100),
+        'plan_key': sqltypes.String(255),  # 合并唯一键之一，VARCHAR 才能完整建索引
+    }
+    return {col: dtype_mapping[col] for col in df.columns if col in dtype_mapping}
+
+def get_dtype_for_product(df):
+    # 商品日明细，可根据实际列补充
+    dtype_mapping = {
+        '日期': Date,
+        '商品ID': String(64),
+        '商品名称': String(255),
+        '商品访问人数': Integer,
+        '商品购买人数': Integer,
+        '商品成交金额(优惠后)': Float,
     }
     return {col: dtype_mapping[col] for col in df.columns if col in dtype_mapping}
 
@@ -0,0 +1,79 @@
+# date_completion.py —— 推广通报表 "MM-DD" 日期补全年份：按文件名起始日预生成日历查找表，整列按分类编码一次映射
+import re
+from datetime import date, datetime, timedelta
+from functools import lru_cache
+
+import numpy as np
+import pandas as pd
+
+# 推广报表文件名里的起止日期，例如 推广报表_20241230_20250105_xx.xlsx
+EXPORT_RANGE_PATTERN = re.compile(r'_(\d{8})_(\d{8})_')
+
+
+def export_start_date(filename):
+    """从文件名提取起始日期（只用它确定“本文件数据的起始年份”）"""
+    match = EXPORT_RANGE_PATTERN.search(filename)
+    if not match:
+        raise ValueError(f"文件名 {filename} 中不包含有效的起止日期格式")
+    return datetime.strptime(match.group(1), "%Y%m%d").date()
+
+
+@lru_cache(maxsize=None)
+def calendar_lookup(year):
+    """
+    year 年每个 (月, 日) → (当天, 'YYYY-MM-DD', 下一年同月日 'YYYY-MM-DD')，按年份缓存，一整年的回补只算一两次。
+    year 年不存在的日期（平年的 02-29）不在表里；闰年 02-29 在下一年不存在，第三项为 None。
+    """
+    table = {}
+    day = date(year, 1, 1)
+    while day.year == year:
+        next_year = None if (day.month, day.day) == (2, 29) else day.replace(year=year + 1).strftime("%Y-%m-%d")
+        table[(day.month, day.day)] = (day, day.strftime("%Y-%m-%d"), next_year)
+        day += timedelta(days=1)
+    return table
+
+
+def _complete_one(raw, start, table):
+    """
+    单个原始 "MM-DD" → 完整日期：拼到起始日所在年份，早于起始日的说明跨年到了下一年（12 月导出里的 01-xx）。
+    拆不成 MM-DD 或不是合法日期的返回 NaN（旧逻辑在闰年 02-29 跨年时会直接抛异常，这里同样视为非法）。
+    """
+    try:
+        m_str, d_str = raw.strip().split('-')
+        day, this_year, next_year = table[(int(m_str), int(d_str))]
+    except Exception:
+        return np.nan
+    if day >= start:
+        return this_year
+    return next_year if next_year is not None else np.nan
+
+
+def complete_month_day(values, start_dates):
+    """
+    把 "MM-DD" 列补全为 'YYYY-MM-DD'（object 列，无法补全的为 NaN）。
+    start_dates 可以是单个起始日，也可以是与 values 对齐的一列（多个文件合并后一次补全，各行按自己文件的起始日跨年）。
+    原始取值与起始日各自分类编码，只对 (起始日 × 不重复取值) 查表，再按编码整列取回。
+    """
+    values = pd.Series(values)
+    codes, uniques = pd.factorize(values)
+    if np.ndim(start_dates) == 0:
+        start_codes, starts = None, [start_dates]
+    else:
+        start_codes, starts = pd.factorize(np.asarray(start_dates, dtype=object))
+
+    # grid[i, j]：第 i 个起始日下第 j 个取值的补全结果；最后一列留给缺失值（编码 -1）
+    grid = np.full((len(starts), len(uniques) + 1), np.nan, dtype=object)
+    for i, start in enumerate(starts):
+        start = pd.Timestamp(start).date()
+        table = calendar_lookup(start.year)
+        grid[i, :-1] = [_complete_one(raw, start, table) for raw in uniques]
+    completed = grid[0, codes] if start_codes is None else grid[start_codes, codes]
+    return pd.Series(completed, index=values.index, dtype=object)
+
+
+def complete_export_dates(df, file_col, date_col='日期'):
+    """多个推广报表合并后按来源文件名（file_col）一次补全 date_col，并去掉补全失败的行"""
+    names = df[file_col].unique()
+    starts = df[file_col].map(dict(zip(names, map(export_start_date, names))))
+    df[date_col] = complete_month_day(df[date_col], starts)
+    return df.dropna(subset=[date_col])
@@ -0,0 +1,86 @@
+# dtype_planner.py —— 按入库字段类型（get_dtype_for_operation / get_dtype_for_cpc_hourly）压缩内存里的 DataFrame：
+# 计数列 → int32 / Int32，比率/金额列 → float32，高重复的文本列 → category
+import logging
+
+import numpy as np
+import sqlalchemy.types as sqltypes
+from pandas.api.types import infer_dtype, is_float_dtype, is_integer_dtype
+
+INT32_MIN, INT32_MAX = np.iinfo(np.int32).min, np.iinfo(np.int32).max
+
+# 不重复值占比不超过这个比例的纯文本列才转 category（门店名、城市、平台、plan_key 这类）
+CATEGORY_MAX_UNIQUE_RATIO = 0.5
+
+# 每次压缩前后的内存：[(label, before_bytes, after_bytes), ...]，供 print_memory_summary() 汇总
+MEMORY_STATS = []
+
+
+def _sql_type(sql_dtype):
+    # dtype 映射里有的写类（Integer），有的写实例（String(255)）
+    return sql_dtype if isinstance(sql_dtype, type) else type(sql_dtype)
+
+
+def _fits_int32(s):
+    """数值列是否全为整数且落在 int32 范围内（忽略空值）"""
+    v = s.to_numpy(dtype="float64", na_value=np.nan)
+    v = v[~np.isnan(v)]
+    if not len(v):
+        return True
+    return bool(np.all(v == np.trunc(v)) and v.min() >= INT32_MIN and v.max() <= INT32_MAX)
+
+
+def plan_compact_dtypes(df, sql_dtypes, category_ratio=CATEGORY_MAX_UNIQUE_RATIO):
+    """
+    根据入库字段类型给出每列的紧凑 dtype：{列名: pandas dtype}，不需要改的列不出现。
+    - SQL Integer 且数值全为整数：无空值 → int32，有空值 → Int32（可空整型，写库仍是 NULL）
+    - SQL Float：float64 → float32（MySQL 的 FLOAT 本身就是单精度）
+    - 纯文本 object 列（不论是否在映射里）且重复度高：category
+    clean_numeric_columns 留下的数值/文本混杂列保持 object 不动。
+    """
+    plan = {}
+    n = len(df)
+    for col in df.columns:
+        s = df[col]
+        sql_type = _sql_type(sql_dtypes[col]) if col in sql_dtypes else None
+
+        if sql_type is not None and issubclass(sql_type, sqltypes.Integer):
+            if (is_float_dtype(s) or is_integer_dtype(s)) and s.dtype.name not in ("int32", "Int32", "int16", "int8"):
+                if _fits_int32(s):
+                    plan[col] = "Int32" if s.isna().any() else "int32"
+        elif sql_type is not None and issubclass(sql_type, sqltypes.Float):
+            if s.dtype == np.float64:
+                plan[col] = "float32"
+        elif s.dtype == object and n:
+            if infer_dtype(s, skipna=True) == "string" and s.nunique(dropna=True) <= n * category_ratio:
+                plan[col] = "category"
+    return plan
+
+
+def compact_frame(df, sql_dtypes, label=""):
+    """按 plan_compact_dtypes 原地转换 df 的列，记录并打印前后内存；返回 df"""
+    plan = plan_compact_dtypes(df, sql_dtypes)
+    if not plan:
+        return df
+    before = df.memory_usage(deep=True).sum()
+    for col, dtype in plan.items():
+        df[col] = df[col].astype(dtype)
+    after = df.memory_usage(deep=True).sum()
+    MEMORY_STATS.append((label, before, after))
+    logging.info(
+        f"🗜️ {label} 压缩 {len(plan)} 列：{before / 1024 ** 2:.1f}MB → {after / 1024 ** 2:.1f}MB"
+        f"（-{1 - after / before:.0%}）"
+    )
+    return df
+
+
+def print_memory_summary(stats=None):
+    """打印本次运行各 DataFrame 压缩前后的内存合计"""
+    stats = MEMORY_STATS if stats is None else stats
+    if not stats:
+        return
+    before = sum(b for _, b, _ in stats)
+    after = sum(a for _, _, a in stats)
+    print(
+        f"🗜️ 内存压缩：{len(stats)} 个 DataFrame，{before / 1024 ** 2:.1f}MB → {after / 1024 ** 2:.1f}MB"
+        f"（节省 {(before - after) / 1024 ** 2:.1f}MB）"
+    )
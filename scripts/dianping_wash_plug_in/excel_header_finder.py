@@ -1,18 +1,86 @@
 # excel_header_finder.py
-import pandas as pd
+from openpyxl import load_workbook
+from pandas.io.parsers import TextParser
+
+from stage_metrics import stage
+
+HEADER_KEYWORD = '日期'
+HEADER_SCAN_ROWS = 10  # 表头只会出现在前 10 行里
+
+
+def _convert_cell(value):
+    # 与 pandas 自带 openpyxl 读取器的单元格转换保持一致：空值→""，整数值的浮点→int
+    if value is None:
+        return ""
+    if isinstance(value, float) and value.is_integer():
+        return int(value)
+    return value
+
+
+def read_sheet_rows(file_path):
+    """
+    以 read-only 模式流式读取第一个 sheet，只解析一遍：
+    边读边在前 HEADER_SCAN_ROWS 行里找含“日期”的表头，
+    返回 (rows, header_row_index)，header_row_index 可直接作为 pd.read_excel(header=...) 的行号。
+    """
+    wb = load_workbook(file_path, read_only=True, data_only=True, keep_links=False)
+    try:
+        ws = wb.worksheets[0]
+        rows = []
+        last_row_with_data = -1
+        header_row_index = None
+        for values in ws.iter_rows(values_only=True):
+            row = [_convert_cell(v) for v in values]
+            while row and row[-1] == "":
+                row.pop()
+            if row:
+                last_row_with_data = len(rows)
+            if header_row_index is None:
+                if any(HEADER_KEYWORD in str(v) for v in row if v != ""):
+                    header_row_index = len(rows)
+                elif len(rows) + 1 >= HEADER_SCAN_ROWS:
+                    # 前 10 行都没有表头，没必要继续解析剩余内容
+                    break
+            rows.append(row)
+    finally:
+        wb.close()
+
+    if header_row_index is None:
+        raise ValueError(f"❌ 文件{file_path}未找到包含'日期'的表头行！")
+
+    rows = rows[: last_row_with_data + 1]
+    width = max(len(r) for r in rows)
+    rows = [r + [""] * (width - len(r)) for r in rows]
+    return rows, header_row_index
+
 
 def find_header_row(file_path):
-    df_raw = pd.read_excel(file_path, header=None, dtype=str)
-    max_rows = df_raw.shape[0]  # 文件实际行数
-    for i in range(min(10, max_rows)):  # 避免超出实际行数
-        if df_raw.iloc[i].str.contains('日期').any():
-            print(f"✅ 表头行定位成功，行号为：{i}")
-            return i
-    raise ValueError(f"❌ 文件{file_path}未找到包含'日期'的表头行！")
+    _, header_row_index = read_sheet_rows(file_path)
+    print(f"✅ 表头行定位成功，行号为：{header_row_index}")
+    return header_row_index
 
 
 def clean_and_load_excel(file_path):
-    header_row_index = find_header_row(file_path)
-    df = pd.read_excel(file_path, header=header_row_index, dtype=str)
+    """只解析一次 Excel：定位表头后直接用同一份行数据构造 DataFrame（全部按字符串读入）"""
+    # 表头定位与读表是同一遍流式解析，计在 read_excel 一个阶段里
+    with stage("read_excel") as rec:
+        rows, header_row_index = read_sheet_rows(file_path)
+        rec["rows_out"] = len(rows)
+    print(f"✅ 表头行定位成功，行号为：{header_row_index}")
+    with stage("build_frame", len(rows)) as rec:
+        df = TextParser(rows, header=header_row_index, dtype=str).read()
+        rec["rows_out"] = len(df)
     df.columns = df.columns.str.strip().str.replace('\n', '').str.replace('\xa0', '')
     return df
+
+
+def read_header_cells(file_path, scan_rows=HEADER_SCAN_ROWS):
+    """只读前 scan_rows 行，返回其中所有非空单元格文本（去空白）的集合，用于按表头特征识别文件类型"""
+    wb = load_workbook(file_path, read_only=True, data_only=True, keep_links=False)
+    try:
+        cells = set()
+        for values in wb.worksheets[0].iter_rows(max_row=scan_rows, values_only=True):
+            cells.update(str(v).strip().replace('\n', '').replace('\xa0', '') for v in values if v not in (None, ""))
+        return cells
+    finally:
+        wb.close()
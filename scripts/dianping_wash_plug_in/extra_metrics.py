@@ -0,0 +1,84 @@
+# extra_metrics.py —— 把 flat 列之外的剩余指标列整体打包成 extra_metrics JSON（各运营导入脚本共用）
+import json
+
+import numpy as np
+import pandas as pd
+from pandas.api.types import infer_dtype
+
+# 这些类型的列里 factorize 不会把“值相等但 JSON 文本不同”的取值（如 0 与 0.0、1 与 True）合并
+_FACTORIZE_SAFE = {"string", "floating", "integer", "boolean", "empty"}
+
+
+def _dumps(value):
+    # 与 to_dict(orient="records") 一样先把 numpy 标量转回 Python 原生类型
+    if isinstance(value, np.generic):
+        value = value.item()
+    return json.dumps(value, ensure_ascii=False)
+
+
+def _encode_column(s: pd.Series, prefix: str, suffix: str = "") -> np.ndarray:
+    """
+    把一列编码成每行的 '"列名": 值' 片段，空值（NaN/None/NaT）→ null。
+    同一列的取值高度重复，只对去重后的取值调用一次 json.dumps，片段按下标共享同一个字符串对象。
+    """
+    null = prefix + "null" + suffix
+    kind = infer_dtype(s, skipna=True) if s.dtype == object else None
+
+    if kind is None or kind in _FACTORIZE_SAFE:
+        codes, uniques = pd.factorize(s)
+        table = np.array(
+            [prefix + _dumps(v) + suffix for v in uniques.tolist()]
+            + [null],
+            dtype=object,
+        )
+        frags = table[codes]  # code=-1 正好落到末尾的 null
+        if s.dtype.kind == "f" or kind == "floating":
+            # factorize 视 -0.0 == 0.0（谁先出现就用谁的写法），而 json.dumps 会区分，两种零分别回填
+            vals = s.to_numpy(dtype=float, na_value=np.nan)
+            zero = vals == 0
+            neg_zero = zero & np.signbit(vals)
+            if neg_zero.any():
+                frags[zero] = prefix + "0.0" + suffix
+                frags[neg_zero] = prefix + "-0.0" + suffix
+        return frags
+
+    # 混合类型（如 clean_numeric_columns 之后 float 与文本、0 与 0.0 并存）：按 (类型, 值) 记忆化
+    values = s.to_numpy(dtype=object)
+    na = pd.isna(values)
+    memo = {}
+    frags = np.empty(len(values), dtype=object)
+    for i, v in enumerate(values):
+        if na[i]:
+            frags[i] = null
+            continue
+        key = (type(v), v)
+        frag = memo.get(key)
+        if frag is None:
+            frag = memo[key] = prefix + _dumps(v) + suffix
+        frags[i] = frag
+    return frags
+
+
+def pack_extra_metrics(dynamic_df: pd.DataFrame) -> pd.Series:
+    """
+    按列批量生成 extra_metrics，输出与逐行
+        json.dumps({k: (None if pd.isna(v) else v) ...}, ensure_ascii=False)
+    逐字节一致（包括键顺序、', ' / ': ' 分隔符、浮点写法），但不再为每行构造 dict、也不逐行 json.dumps：
+    每列只编码去重后的取值，最后每行做一次 ', '.join。
+    """
+    n = len(dynamic_df)
+    if dynamic_df.shape[1] == 0:
+        return pd.Series(["{}"] * n, index=dynamic_df.index, dtype=object)
+
+    last = dynamic_df.shape[1] - 1
+    columns = []
+    for i, col in enumerate(dynamic_df.columns):
+        prefix = ("{" if i == 0 else "") + _dumps(col) + ": "
+        suffix = "}" if i == last else ""
+        columns.append(_encode_column(dynamic_df.iloc[:, i], prefix, suffix))
+
+    if len(columns) == 1:
+        packed = columns[0]
+    else:
+        packed = [", ".join(t) for t in zip(*columns)]
+    return pd.Series(packed, index=dynamic_df.index, dtype=object)
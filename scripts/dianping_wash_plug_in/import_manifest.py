@@ -0,0 +1,91 @@
+# import_manifest.py —— 按文件内容哈希记录已入库的导出文件（与 import_history 同库），重跑时跳过未变化的文件
+import hashlib
+import os
+from datetime import datetime
+
+import pandas as pd
+from sqlalchemy import (
+    BigInteger, Column, Date, DateTime, Integer, MetaData, String, Table, insert, select,
+)
+
+MANIFEST_TABLE = "import_manifest"
+HASH_CHUNK_SIZE = 1 << 20  # 1MB 分块读，避免大文件整块进内存
+
+_metadata = MetaData()
+import_manifest = Table(
+    MANIFEST_TABLE, _metadata,
+    Column("content_hash", String(64), primary_key=True),   # sha256(文件内容)
+    Column("table_name", String(255), primary_key=True),    # 同一文件可能被多个入库步骤读取，按表分别记录
+    Column("file_name", String(512)),
+    Column("file_size", BigInteger),
+    Column("row_count", Integer),
+    Column("date_min", Date),
+    Column("date_max", Date),
+    Column("imported_at", DateTime),
+)
+
+
+def init_manifest_table(engine):
+    """建表（已存在则跳过）；MySQL / SQLite 通用"""
+    _metadata.create_all(engine, tables=[import_manifest], checkfirst=True)
+
+
+def file_sha256(path):
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(HASH_CHUNK_SIZE), b""):
+            h.update(chunk)
+    return h.hexdigest()
+
+
+def load_manifest_hashes(engine):
+    """一次查询取回全部已入库的 (表名, 哈希)，之后每个文件的判断都是 O(1) 的集合查找"""
+    with engine.connect() as conn:
+        rows = conn.execute(select(import_manifest.c.table_name, import_manifest.c.content_hash))
+        return {(table_name, content_hash) for table_name, content_hash in rows}
+
+
+def describe_file(path, content_hash, table_name, df, date_col):
+    """生成一条 manifest 记录：文件哈希 + 清洗后的行数与 date_col 的日期区间"""
+    entry = {
+        "content_hash": content_hash,
+        "file_name": path,
+        "table_name": table_name,
+        "file_size": None,
+        "row_count": len(df),
+        "date_min": None,
+        "date_max": None,
+        "imported_at": None,
+    }
+    try:
+        entry["file_size"] = os.path.getsize(path)
+    except OSError:
+        pass
+    if date_col in df.columns and len(df):
+        dates = pd.to_datetime(df[date_col], errors="coerce").dropna()
+        if len(dates):
+            entry["date_min"] = dates.min().date()
+            entry["date_max"] = dates.max().date()
+    return entry
+
+
+def record_manifest(engine, entries, known_hashes=None):
+    """
+    批量写入 manifest；同一 (表名, 内容哈希) 只记一次（已在 known_hashes 或本批重复的跳过）。
+    写入成功后并入 known_hashes，方便同一次运行里后续判断。
+    """
+    known = known_hashes if known_hashes is not None else set()
+    rows, seen = [], set()
+    now = datetime.now()
+    for e in entries:
+        h = (e["table_name"], e["content_hash"])
+        if h in known or h in seen:
+            continue
+        seen.add(h)
+        rows.append({**e, "imported_at": e.get("imported_at") or now})
+    if not rows:
+        return 0
+    with engine.begin() as conn:
+        conn.execute(insert(import_manifest), rows)
+    known.update(seen)
+    return len(rows)
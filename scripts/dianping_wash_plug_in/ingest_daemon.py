@@ -0,0 +1,371 @@
+# ingest_daemon.py —— 常驻导入服务：轮询下载目录，文件写完（大小/修改时间稳定 + xlsx 结构完整）后
+# 按文件名 + 表头特征识别 CPC / 运营 / 评价 / 商品导出，用现有清洗函数逐个清洗并合并入库
+import argparse
+import logging
+import os
+import shutil
+import time
+import zipfile
+from datetime import datetime
+
+import pandas as pd
+from sqlalchemy import exc as sa_exc
+
+from config import (
+    DB_CONNECTION_STRING, INGEST_WATCH_DIRS, INGEST_POLL_SECONDS, INGEST_DEBOUNCE_SECONDS, INGEST_RETRY_SECONDS,
+    INGEST_MAX_RETRIES,
+)
+from excel_header_finder import read_header_cells
+from brand_parser import (
+    is_cpc_file, is_operation_file, is_review_file, is_product_file,
+    clean_cpc_file, clean_operation_file, clean_product_file,
+    build_cpc_frame, build_operation_frame,
+)
+from review_cleaner import clean_review_file
+from review_dedupe import upsert_reviews, ReviewKeyMissingError
+from database_importer import (
+    get_engine, upsert_via_staging,
+    get_dtype_for_cpc_hourly, get_dtype_for_operation, get_dtype_for_product,
+)
+from import_manifest import init_manifest_table, load_manifest_hashes, record_manifest, describe_file, file_sha256
+from parse_cache import cached_clean, frame_fingerprint
+from store_matcher import init_match_cache_table, load_match_cache, save_match_cache, mapping_version, stores_frame
+from schema_registry import table_columns, drift_report, print_drift_report, DRIFT_STATS
+from stage_metrics import STAGE_STATS
+from dtype_planner import MEMORY_STATS
+
+# 表头前几行里必须同时出现的列（按顺序判定，文件名判断与表头不一致时以表头为准）
+HEADER_SIGNATURES = {
+    "review":    {"评价", "评分", "门店"},
+    "product":   {"日期", "商品ID"},
+    "cpc":       {"日期", "时段", "推广名称"},
+    "operation": {"日期", "美团门店ID"},
+}
+KIND_TABLES = {
+    "cpc": "cpc_hourly_data",
+    "operation": "operation_data",
+    "review": "review_data",
+    "product": "product_daily",
+}
+
+# 浏览器 / Playwright 下载中的临时文件
+PARTIAL_SUFFIXES = (".crdownload", ".part", ".tmp", ".download")
+# 导入后的文件按结果移到监听目录下的这两个子目录（按日期分组），不再参与扫描
+PROCESSED_DIR, FAILED_DIR = "_processed", "_failed"
+# 稳定这么多倍 debounce 后仍不是完整 xlsx 的文件视为损坏
+BROKEN_FILE_FACTOR = 3
+# 暂时性错误：数据库断连 / 超时 / 锁等待、文件被占用、评价表还没做 review_key 迁移。
+# 这类文件留在原处，INGEST_RETRY_SECONDS 后重试（最多 INGEST_MAX_RETRIES 次）；其余错误直接移到 _failed。
+# 注意 OperationalError 也包括 “Unknown column” 之类的永久错误，只能按断连标记 / 驱动错误码区分
+TRANSIENT_DB_CODES = {
+    1040,  # Too many connections
+    1205,  # Lock wait timeout exceeded
+    1213,  # Deadlock found
+    2002, 2003,  # Can't connect to MySQL server
+    2006,  # MySQL server has gone away
+    2013,  # Lost connection to MySQL server during query
+    2055,  # Lost connection to MySQL server (system error)
+}
+TRANSIENT_SQLITE_MESSAGES = ("database is locked", "database is busy")
+
+
+def is_transient_error(e):
+    """断连 / 超时 / 锁等待 / 文件占用等重试可能成功的错误"""
+    if isinstance(e, (ReviewKeyMissingError, PermissionError, sa_exc.DisconnectionError, sa_exc.TimeoutError)):
+        return True
+    if isinstance(e, sa_exc.DBAPIError):
+        if e.connection_invalidated:
+            return True
+        args = getattr(e.orig, "args", ())
+        if args and args[0] in TRANSIENT_DB_CODES:
+            return True
+        return any(msg in str(e.orig) for msg in TRANSIENT_SQLITE_MESSAGES)
+    return False
+
+
+def name_kind(fname):
+    """按文件名猜类型（与 main.py 的筛选规则一致）；猜不出返回 None"""
+    if is_review_file(fname):
+        return "review"
+    if is_product_file(fname):
+        return "product"
+    if is_cpc_file(fname):
+        return "cpc"
+    if is_operation_file(fname):
+        return "operation"
+    return None
+
+
+def classify_file(fp):
+    """文件名 + 表头特征识别导出类型；表头对不上任何已知导出时返回 None"""
+    guess = name_kind(os.path.basename(fp))
+    cells = read_header_cells(fp)
+    matched = [kind for kind, signature in HEADER_SIGNATURES.items() if signature <= cells]
+    if guess in matched:
+        return guess
+    if matched:
+        logging.warning(f"文件名与表头不一致，按表头识别为 {matched[0]}：{fp}")
+        return matched[0]
+    return None
+
+
+class FolderWatcher:
+    """
+    轮询若干目录下的 .xlsx：记录每个文件的 (大小, 修改时间) 及其保持不变的起始时刻，
+    连续 debounce 秒不变、且能作为 zip 完整打开（xlsx 尾部目录已写入）才算下载完成。
+    """
+
+    def __init__(self, watch_dirs, debounce=INGEST_DEBOUNCE_SECONDS):
+        self.watch_dirs = list(watch_dirs)
+        self.debounce = debounce
+        self._state = {}  # path -> ((size, mtime), 首次看到该状态的时刻)
+        self._retry_at = {}  # path -> 暂时性错误后最早的重试时刻
+        self._retries = {}  # path -> 已因暂时性错误重试的次数
+        self._downloading = 0  # 上一轮看到的下载中临时文件数
+
+    def _candidates(self):
+        self._downloading = 0
+        for root_dir in self.watch_dirs:
+            if not os.path.isdir(root_dir):
+                continue
+            for root, dirs, files in os.walk(root_dir):
+                dirs[:] = [d for d in dirs if d not in (PROCESSED_DIR, FAILED_DIR)]
+                for fname in files:
+                    if fname.endswith(PARTIAL_SUFFIXES):
+                        self._downloading += 1
+                    elif fname.endswith(".xlsx") and not fname.startswith("~$"):
+                        yield root_dir, os.path.join(root, fname)
+
+    def poll(self, now=None):
+        """返回本轮已稳定的 [(监听根目录, 文件路径), ...]"""
+        now = time.time() if now is None else now
+        ready, alive = [], set()
+        for root_dir, fp in self._candidates():
+            try:
+                st = os.stat(fp)
+            except OSError:
+                continue  # 扫描与 stat 之间被移走/改名
+            alive.add(fp)
+            if self._retry_at.get(fp, 0) > now:
+                continue
+            sig = (st.st_size, st.st_mtime)
+            prev = self._state.get(fp)
+            if prev is None or prev[0] != sig:
+                self._state[fp] = (sig, now)
+                if self.debounce > 0:
+                    continue
+            stable_for = now - self._state[fp][1]
+            if stable_for < self.debounce:
+                continue
+            # 大小不变但 zip 目录还没写完：再多等几轮，长时间仍打不开就交给导入流程（会移到 _failed）
+            if (st.st_size and zipfile.is_zipfile(fp)) or stable_for >= BROKEN_FILE_FACTOR * self.debounce:
+                ready.append((root_dir, fp))
+        for fp in set(self._state) - alive:
+            del self._state[fp]
+        for fp in set(self._retry_at) - alive:
+            del self._retry_at[fp]
+        for fp in set(self._retries) - alive:
+            del self._retries[fp]
+        return ready
+
+    @property
+    def pending(self):
+        """还没稳定的 xlsx + 下载中的临时文件（等待重试的不算）"""
+        return len(self._state) + self._downloading
+
+    def forget(self, fp):
+        self._state.pop(fp, None)
+        self._retry_at.pop(fp, None)
+
+    def retries(self, fp):
+        return self._retries.get(fp, 0)
+
+    def retry_later(self, fp, delay=INGEST_RETRY_SECONDS, count=True):
+        """
+        文件留在原处，delay 秒后重新按 debounce 判定稳定再导入；
+        count=False（整批没开始、归档移动失败等与文件内容无关的情况）不计入该文件的重试次数
+        """
+        self._state.pop(fp, None)
+        self._retry_at[fp] = time.time() + delay
+        if count:
+            self._retries[fp] = self._retries.get(fp, 0) + 1
+
+
+def move_to(fp, root_dir, sub):
+    """把文件移到 root_dir/sub/YYYYMMDD/ 下，重名时加时间后缀"""
+    dst_dir = os.path.join(root_dir, sub, f"{datetime.now():%Y%m%d}")
+    os.makedirs(dst_dir, exist_ok=True)
+    dst = os.path.join(dst_dir, os.path.basename(fp))
+    if os.path.exists(dst):
+        stem, ext = os.path.splitext(dst)
+        dst = f"{stem}_{datetime.now():%H%M%S%f}{ext}"
+    shutil.move(fp, dst)
+    return dst
+
+
+class IngestSession:
+    """守护进程的数据库侧状态：manifest 哈希、门店映射与评价门店匹配缓存（映射变化时自动刷新）"""
+
+    def __init__(self, db_connection_string):
+        self.db = db_connection_string
+        self.engine = get_engine(db_connection_string)
+        init_manifest_table(self.engine)
+        init_match_cache_table(self.engine)
+        self.known_hashes = load_manifest_hashes(self.engine)
+        self.store_mapping = None
+        self.mapping_key = ""
+        self.match_version = None
+        self.store_matches = {}
+
+    def refresh_store_mapping(self):
+        store_mapping = pd.read_sql("SELECT * FROM store_mapping", con=self.engine)
+        store_mapping["推广门店"] = store_mapping["推广门店"].str.strip()
+        store_mapping["门店ID"] = store_mapping["门店ID"].astype(str).str.strip()
+        self.store_mapping = store_mapping
+        self.mapping_key = frame_fingerprint(store_mapping)
+        version = mapping_version(stores_frame(store_mapping))
+        if version != self.match_version:
+            self.match_version = version
+            self.store_matches = load_match_cache(self.engine, version)
+
+    def operation_columns(self):
+        # 常驻进程按 SCHEMA_CACHE_TTL_SECONDS 定期重新反射，不必每个文件查一次
+        return table_columns(self.engine, "operation_data")
+
+    def ingest(self, fp, kind):
+        """清洗并合并入库单个文件；内容已入库过的直接跳过。返回写入行数"""
+        table = KIND_TABLES[kind]
+        content_hash = file_sha256(fp)
+        if (table, content_hash) in self.known_hashes:
+            print(f"⏭️ 文件未变化，跳过：{fp}")
+            return 0
+        label = os.path.basename(fp)
+
+        if kind == "cpc":
+            df = cached_clean(fp, "cpc", lambda p: clean_cpc_file(p, self.store_mapping), content_hash, self.mapping_key)
+            entry = describe_file(fp, content_hash, table, df, "日期")
+            df_cpc = build_cpc_frame([df], label)
+            drift_report(self.engine, table, df_cpc.columns, label)
+            rows = upsert_via_staging(df_cpc, table, self.db, dtype=get_dtype_for_cpc_hourly(df_cpc))
+        elif kind == "operation":
+            df = cached_clean(fp, "operation", clean_operation_file, content_hash)
+            entry = describe_file(fp, content_hash, table, df, "日期")
+            df_basic = build_operation_frame([df], self.operation_columns(), label)
+            rows = upsert_via_staging(df_basic, table, self.db, dtype=get_dtype_for_operation(df_basic))
+        elif kind == "review":
+            known = set(self.store_matches)
+            df = cached_clean(
+                fp, "review", lambda p: clean_review_file(p, self.store_mapping, self.store_matches),
+                content_hash, self.mapping_key,
+            )
+            entry = describe_file(fp, content_hash, table, df, "review_date")
+            rows = upsert_reviews(df, self.db)
+            new_matches = {k: v for k, v in self.store_matches.items() if k not in known}
+            save_match_cache(self.engine, new_matches, self.match_version)
+        else:
+            df = cached_clean(fp, "product", clean_product_file, content_hash)
+            entry = describe_file(fp, content_hash, table, df, "日期")
+            rows = upsert_via_staging(df, table, self.db, dtype=get_dtype_for_product(df))
+
+        record_manifest(self.engine, [entry], self.known_hashes)
+        return rows
+
+
+def process_ready(session, watcher, ready, retry_delay=INGEST_RETRY_SECONDS, max_retries=INGEST_MAX_RETRIES):
+    """
+    导入本轮已稳定的文件：成功/跳过的移到 _processed，识别或解析失败的移到 _failed；
+    断连 / 超时 / 文件占用等暂时性错误（is_transient_error）的文件留在原处，retry_delay 秒后重试，
+    重试 max_retries 次仍失败也移到 _failed。
+    返回处理结果列表；本批的结构漂移报告打印后清空各统计列表，常驻进程不会越积越多
+    """
+    results = []
+    try:
+        session.refresh_store_mapping()
+    except Exception as e:
+        logging.error(f"读取门店映射失败，本批 {len(ready)} 个文件稍后重试（{e}）")
+        for _, fp in ready:
+            watcher.retry_later(fp, retry_delay, count=False)
+            results.append((fp, None, 0, str(e)))
+        print(f"⚠️ 数据库暂不可用，{len(ready)} 个文件留在原处，{retry_delay:.0f}s 后重试")
+        return results
+
+    for root_dir, fp in ready:
+        watcher.forget(fp)
+        try:
+            landed = os.path.getmtime(fp)
+            kind = classify_file(fp)
+            if kind is None:
+                raise ValueError("表头不符合任何已知导出（CPC / 运营 / 评价 / 商品）")
+            rows = session.ingest(fp, kind)
+        except Exception as e:
+            if not os.path.exists(fp):
+                logging.warning(f"文件在导入前被移走，跳过：{fp}")
+                continue
+            results.append((fp, None, 0, str(e)))
+            attempt = watcher.retries(fp) + 1
+            if is_transient_error(e) and attempt <= max_retries:
+                logging.error(f"导入失败（暂时性错误，第 {attempt}/{max_retries} 次重试）：{fp}（{e}）")
+                watcher.retry_later(fp, retry_delay)
+                print(f"⚠️ {os.path.basename(fp)} 暂时无法导入，留在原处，{retry_delay:.0f}s 后重试")
+                continue
+            logging.error(f"导入失败：{fp}（{e}）")
+            try:
+                dst = move_to(fp, root_dir, FAILED_DIR)
+            except OSError as move_err:
+                logging.error(f"移到 {FAILED_DIR} 失败，文件留在原处：{fp}（{move_err}）")
+                watcher.retry_later(fp, retry_delay, count=False)
+                continue
+            print(f"❌ {os.path.basename(fp)} 导入失败，已移到 {dst}")
+            continue
+        results.append((fp, kind, rows, None))
+        try:
+            move_to(fp, root_dir, PROCESSED_DIR)
+        except OSError as e:
+            # 已入库、manifest 已记录：下次扫到会按哈希跳过，再移一次
+            logging.error(f"移到 {PROCESSED_DIR} 失败，文件留在原处：{fp}（{e}）")
+            watcher.retry_later(fp, retry_delay, count=False)
+        print(f"✅ [{kind}] {os.path.basename(fp)} 入库 {rows} 行，落盘到入库 {time.time() - landed:.1f}s")
+    print_drift_report()
+    del DRIFT_STATS[:], STAGE_STATS[:], MEMORY_STATS[:]
+    return results
+
+
+def run(watch_dirs=INGEST_WATCH_DIRS, db_connection_string=DB_CONNECTION_STRING,
+        poll_seconds=INGEST_POLL_SECONDS, debounce=INGEST_DEBOUNCE_SECONDS, once=False):
+    """
+    持续轮询 watch_dirs；once=True 时处理完当前目录里的全部文件（等它们稳定）就返回，便于脚本/测试调用；
+    等待重试的文件留在原处，不阻塞 once 返回。
+    返回处理结果列表 [(文件, 类型, 行数, 错误), ...]。
+    """
+    session = IngestSession(db_connection_string)
+    watcher = FolderWatcher(watch_dirs, debounce)
+    results = []
+    print(f"👀 开始监听：{', '.join(watch_dirs)}（轮询 {poll_seconds}s，稳定 {debounce}s 视为下载完成）")
+    while True:
+        ready = watcher.poll()
+        if ready:
+            try:
+                results += process_ready(session, watcher, ready)
+            except Exception as e:
+                # 兜底：单批出任何意外都不让服务退出，文件留在原处稍后重试
+                logging.exception(f"本批导入异常，{len(ready)} 个文件稍后重试（{e}）")
+                for _, fp in ready:
+                    watcher.retry_later(fp, count=False)
+        elif once and not watcher.pending:
+            return results
+        time.sleep(poll_seconds)
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO, format='%(levelname)s: %(message)s')
+    parser = argparse.ArgumentParser(description="监听下载目录，文件下载完成后立即清洗入库")
+    parser.add_argument("--watch", nargs="+", default=INGEST_WATCH_DIRS, help="监听的目录（可多个）")
+    parser.add_argument("--db", default=DB_CONNECTION_STRING, help="数据库连接串（默认取 config.py）")
+    parser.add_argument("--poll", type=float, default=INGEST_POLL_SECONDS, help="轮询间隔（秒）")
+    parser.add_argument("--debounce", type=float, default=INGEST_DEBOUNCE_SECONDS, help="文件保持不变多久视为下载完成（秒）")
+    parser.add_argument("--once", action="store_true", help="处理完目录里现有文件后退出")
+    args = parser.parse_args()
+    try:
+        run(args.watch, args.db, args.poll, args.debounce, args.once)
+    except KeyboardInterrupt:
+        print("👋 已停止监听")
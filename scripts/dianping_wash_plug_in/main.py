@@ -1,19 +1,30 @@
 # main.py（自动读取固定路径 + 去重处理）
 import os
+import argparse
+from concurrent.futures import ProcessPoolExecutor, as_completed
 import pandas as pd
-import json, math, re
-from sqlalchemy import create_engine, text, inspect
+from sqlalchemy import create_engine, text, bindparam
 from column_mappings import COLUMN_MAPPING_CPC_HOURLY
 from excel_header_finder import clean_and_load_excel
 from data_cleaning import (
-    clean_operation_data,
     clean_numeric_columns,
     drop_percentage_columns,
     match_store_id_for_single_cpc,
     process_cpc_dates,add_datetime_column,
 )
-from database_importer import import_to_mysql, get_dtype_for_cpc_hourly
-from config import DB_CONNECTION_STRING
+from database_importer import (
+    import_to_mysql, upsert_via_staging,
+    get_dtype_for_cpc_hourly, get_dtype_for_operation, print_write_summary,
+)
+from brand_parser import parse_brand
+from import_manifest import init_manifest_table, load_manifest_hashes, record_manifest
+from parse_cache import evict_cache, print_cache_summary
+from dtype_planner import print_memory_summary
+from schema_registry import table_columns, drift_report, print_drift_report, DRIFT_STATS
+from stage_metrics import stage, stage_scope, init_stage_table, save_stage_metrics, print_stage_summary, new_run_id, STAGE_STATS
+from store_matcher import init_match_cache_table, load_match_cache, save_match_cache, mapping_version, stores_frame
+from schema_evolution import promote_frequent_metrics
+from config import DB_CONNECTION_STRING, IMPORT_MODE, EXTRA_METRICS_AUTO_PROMOTE
 import shutil
 from datetime import datetime
 import warnings
@@ -22,53 +33,12 @@ import logging
 logging.basicConfig(level=logging.INFO,
                     format='%(levelname)s: %(message)s')
 
-# 引入点评清洗函数 & MySQL 写入
-from review_cleaner import clean_review_file
-from sqlalchemy import types as sqltypes
+# 评价表 MySQL 字段类型
+from review_cleaner import dtype_review
+from review_dedupe import upsert_reviews
 
 engine = create_engine(DB_CONNECTION_STRING)
 
-def build_rankings_detail(row):
-    """
-    直接用当前行的 '城市' 列判定 city 级，
-    以 '区' 结尾判定 district 级，
-    其余当 subdistrict 级。
-    """
-    city = str(row.get("城市", "")).strip()
-    cols = {
-        "美团人气榜榜单排名":   "meituan_popularity",
-        "美团好评榜榜单排名":   "meituan_rating",
-        "点评热门榜榜单排名":   "dianping_hot",
-        "点评好评榜榜单排名":   "dianping_rating",
-        "点评口味榜榜单排名":   "dianping_taste",
-        "点评环境榜榜单排名":   "dianping_env",
-        "点评服务榜榜单排名":   "dianping_service",
-        "点评打卡人气榜榜单排名": "dianping_checkin",
-    }
-    detail = {}
-    for src_col, key in cols.items():
-        raw = row.get(src_col)
-        if not raw or pd.isna(raw):
-            continue
-        tmp = {}
-        for part in str(raw).split("|"):
-            m = re.search(r'(.+?)第(\d+)名', part.strip())
-            if not m:
-                continue
-            scope = m.group(1).strip()
-            rank  = int(m.group(2))
-            # 判定层级
-            if city and city in scope:
-                tmp['city'] = rank
-            elif scope.endswith('区'):
-                tmp['district'] = rank
-            else:
-                tmp['subdistrict'] = rank
-        if tmp:
-            detail[key] = tmp
-    return json.dumps(detail, ensure_ascii=False)
-# —— END 简化版 build_rankings_detail ——
-
 def bulk_import_excels_to_table(folder_path: str, table_name: str):
     """
     扫描 folder_path 下所有 .xlsx，把每个文件读成 DataFrame，
@@ -76,9 +46,9 @@ def bulk_import_excels_to_table(folder_path: str, table_name: str):
     然后 append 到该表中。
     """
     engine = create_engine(DB_CONNECTION_STRING)
-    inspector = inspect(engine)
-    # 1. 反射表结构，拿到表里所有列名
-    existing_cols = [c['name'] for c in inspector.get_columns(table_name)]
+    # 1. 表结构（schema_registry 缓存，整个目录只反射一次）
+    existing_cols = table_columns(engine, table_name)
+    drift_start = len(DRIFT_STATS)
 
     for fname in os.listdir(folder_path):
         if not fname.endswith(".xlsx"):
@@ -88,39 +58,44 @@ def bulk_import_excels_to_table(folder_path: str, table_name: str):
         df = pd.read_excel(full_path)
         # 3. 重命名映射（如需），否则注释掉下一行
         # df = df.rename(columns=COLUMN_MAPPING_OPERATION)
-        # 4. 只保留表里已有的列
+        # 4. 只保留表里已有的列（丢弃的列记入漂移报告）
+        drift_report(engine, table_name, df.columns, fname)
         df = df[[c for c in df.columns if c in existing_cols]]
         if df.empty:
             continue
         # 5. 写入 MySQL
         df.to_sql(table_name, engine, if_exists="append", index=False)
         print(f"✅ {fname} 导入表 {table_name} 完成，{len(df)} 行。")
+    print_drift_report(DRIFT_STATS[drift_start:])
 
 # ✅ 固定数据路径（自动读取）
 FIXED_FOLDER_PATH = r"D:\橡皮信息科技\橡皮客户运营\大众点评运营数据\raw_data"
 
 # 1) 定义清理函数，替代旧 delete_data_by_date.py
+# （仅 IMPORT_MODE = 'delete_insert' 时使用；默认走 upsert_via_staging 按唯一键合并）
 def delete_old_cpc_for_store(start_date, end_date, store_ids):
-    """只删除指定门店在日期范围内的推广通（cpc_hourly_data）旧数据"""
+    """只删除指定门店在日期范围内的推广通（cpc_hourly_data）旧数据：一条 IN 语句，日期列不套 DATE() 以便走索引"""
     engine = create_engine(DB_CONNECTION_STRING)
     with engine.begin() as conn:
-        for sid in store_ids:
-            res = conn.execute(
-                text("DELETE FROM cpc_hourly_data WHERE store_id = :sid AND DATE(date) BETWEEN :s AND :e"),
-                {"sid": sid, "s": start_date, "e": end_date}
-            )
-            print(f"✅ 删除 cpc_hourly_data 中 门店ID={sid} {start_date}~{end_date} 共 {res.rowcount} 条。")
+        res = conn.execute(
+            text("DELETE FROM cpc_hourly_data WHERE store_id IN :sids AND date BETWEEN :s AND :e")
+            .bindparams(bindparam("sids", expanding=True)),
+            {"sids": list(store_ids), "s": start_date, "e": end_date}
+        )
+        print(f"✅ 删除 cpc_hourly_data 中 {len(store_ids)} 家门店 {start_date}~{end_date} 共 {res.rowcount} 条。")
+        return res.rowcount
 
 def delete_old_op_for_store(start_date, end_date, store_ids):
-    """只删除指定门店在日期范围内的运营数据（operation_data）旧记录"""
+    """只删除指定门店在日期范围内的运营数据（operation_data）旧记录：一条 IN 语句，日期列不套 DATE() 以便走索引"""
     engine = create_engine(DB_CONNECTION_STRING)
     with engine.begin() as conn:
-        for sid in store_ids:
-            res = conn.execute(
-                text("DELETE FROM operation_data WHERE `美团门店ID` = :sid AND DATE(`日期`) BETWEEN :s AND :e"),
-                {"sid": sid, "s": start_date, "e": end_date}
-            )
-            print(f"✅ 删除 operation_data 中 门店ID={sid} {start_date}~{end_date} 共 {res.rowcount} 条。")
+        res = conn.execute(
+            text("DELETE FROM operation_data WHERE `美团门店ID` IN :sids AND `日期` BETWEEN :s AND :e")
+            .bindparams(bindparam("sids", expanding=True)),
+            {"sids": list(store_ids), "s": start_date, "e": end_date}
+        )
+        print(f"✅ 删除 operation_data 中 {len(store_ids)} 家门店 {start_date}~{end_date} 共 {res.rowcount} 条。")
+        return res.rowcount
 
 
 # 2) 定义已处理目录常量
@@ -159,178 +134,181 @@ def process_brand(brand_path, store_mapping):
     df_all.drop_duplicates(subset=['plan_key', 'start_time'], inplace=True)
     return df_all
 
-def process_files():
-    base = FIXED_FOLDER_PATH
-    print(f"📂 正在读取固定路径：{base}")
-
-    engine = create_engine(DB_CONNECTION_STRING)
-    store_mapping = pd.read_sql("SELECT * FROM store_mapping", con=engine)
-    store_mapping["推广门店"] = store_mapping["推广门店"].str.strip()
-    store_mapping["门店ID"] = store_mapping["门店ID"].astype(str).str.strip()
-
-    cpc_successes, op_successes, failures = [], [], []
+def write_brand(parsed, cpc_successes, op_successes, failures, engine=None, known_hashes=None):
+    """
+    单一写库方：按 CPC → 运营 → 评价 的顺序写入某品牌已解析好的数据，全部成功后搬目录。
+    解析阶段出错的品牌，已解析的部分照常写入，然后记为失败（不搬目录）。
+    每一步写库成功后把对应文件记入 import_manifest（传入 engine 时），崩溃后重跑只会重导没记上的文件。
+    """
+    brand = parsed["brand"]
 
-    for brand in os.listdir(base):
-        brand_dir = os.path.join(base, brand)
-        if not os.path.isdir(brand_dir):
-            continue
+    def _mark_done(entries):
+        if engine is not None:
+            record_manifest(engine, entries, known_hashes)
 
+    # 写库阶段的埋点都归到该品牌
+    with stage_scope(brand=brand):
         try:
-            # —— 1) 处理推广通 ——
-            # 只处理包含“推广报表”、“账号报表”或“门店报表”的文件，避免将其他 Excel 当作 CPC 导入
-            cpc_files = [
-                f for f in os.listdir(brand_dir)
-                if f.endswith(".xlsx") and any(k in f for k in ["推广报表", "账号报表", "门店报表"])
-            ]
-            if cpc_files:
-                hourly_list = []
-                for fname in cpc_files:
-                    fp = os.path.join(brand_dir, fname)
-                    df = clean_and_load_excel(fp)
-                    df = process_cpc_dates(df, fname)
-                    df = match_store_id_for_single_cpc(df, store_mapping)
-                    df = drop_percentage_columns(df)
-                    df = clean_numeric_columns(df)
-                    df = add_datetime_column(df)
-                    hourly_list.append(df)
-                df_cpc = pd.concat(hourly_list, ignore_index=True)
-
-                # 生成唯一标识并重命名、去重
-                df_cpc['plan_key'] = (
-                    df_cpc['门店ID'].astype(str).str.strip()
-                    + "_"
-                    + df_cpc['推广名称'].astype(str).str.strip()
-                    + "_"
-                    + df_cpc['平台'].astype(str).str.strip()
-                )
-                df_cpc.rename(columns=COLUMN_MAPPING_CPC_HOURLY, inplace=True)
-                df_cpc.drop_duplicates(subset=['plan_key', 'start_time'], inplace=True)
-
-                # 删除历史同店同日期数据
-                df_cpc['date'] = pd.to_datetime(df_cpc['date']).dt.date
-                min_date, max_date = df_cpc['date'].min(), df_cpc['date'].max()
-                store_ids_cpc = df_cpc['store_id'].astype(str).unique().tolist()
-                delete_old_cpc_for_store(min_date, max_date, store_ids_cpc)
-
-                # 写入新数据
+            # —— 1) 推广通 ——
+            df_cpc = parsed["cpc"]
+            if df_cpc is not None:
+                if engine is not None:
+                    drift_report(engine, "cpc_hourly_data", df_cpc.columns, brand)
                 dtype_cpc = get_dtype_for_cpc_hourly(df_cpc)
-                import_to_mysql(
-                    df_cpc,
-                    "cpc_hourly_data",
-                    DB_CONNECTION_STRING,
-                    dtype=dtype_cpc,
-                    if_exists="append"
-                )
+                if IMPORT_MODE == "upsert":
+                    # 写 staging 表后按 (plan_key, start_time) 一次性合并
+                    with stage("merge cpc_hourly_data", len(df_cpc)) as rec:
+                        rec["rows_out"] = upsert_via_staging(df_cpc, "cpc_hourly_data", DB_CONNECTION_STRING, dtype=dtype_cpc)
+                else:
+                    # 删除历史同店同日期数据，再写入新数据
+                    min_date, max_date = df_cpc['date'].min(), df_cpc['date'].max()
+                    store_ids_cpc = df_cpc['store_id'].astype(str).unique().tolist()
+                    with stage("delete cpc_hourly_data") as rec:
+                        rec["rows_out"] = delete_old_cpc_for_store(min_date, max_date, store_ids_cpc)
+                    with stage("insert cpc_hourly_data", len(df_cpc)) as rec:
+                        rec["rows_out"] = import_to_mysql(
+                            df_cpc,
+                            "cpc_hourly_data",
+                            DB_CONNECTION_STRING,
+                            dtype=dtype_cpc,
+                            if_exists="append"
+                        )
+                _mark_done(parsed["cpc_files"])
                 cpc_successes.append(brand)
-            else:
-                logging.info(f"品牌 {brand} 下无 CPC 相关报表，跳过。")
-
-            # —— 2) 处理运营数据 ——
-            op_dfs = []
-            for fname in os.listdir(brand_dir):
-                # 只处理运营表，跳过所有带“推广报表”或“评价”关键字的 .xlsx
-                if (not fname.endswith(".xlsx")
-                        or "推广报表" in fname
-                        or "评价" in fname
-                ):
-                    continue
-                fp = os.path.join(brand_dir, fname)
-                df_op = clean_operation_data(clean_and_load_excel(fp))
-                df_op = drop_percentage_columns(df_op)
-                df_op = clean_numeric_columns(df_op)
-                op_dfs.append(df_op)
-
-            if op_dfs:
-                # 合并去重
-                df_op_all = pd.concat(op_dfs, ignore_index=True)
-                df_op_all.drop_duplicates(subset=["日期", "美团门店ID"], keep="last", inplace=True)
-
-                # 转 datetime 并取区间
-                df_op_all["日期"] = pd.to_datetime(df_op_all["日期"]).dt.date
-                min_op, max_op = df_op_all["日期"].min(), df_op_all["日期"].max()
-                store_ids_op = df_op_all["美团门店ID"].astype(str).unique().tolist()
-
-                # 删除旧记录
-                delete_old_op_for_store(min_op, max_op, store_ids_op)
-
-                # 反射表结构，取已存在的列作为 flat 列
-                inspector     = inspect(engine)
-                existing_cols = [c["name"] for c in inspector.get_columns("operation_data")]
-                flat_cols     = [c for c in existing_cols if c in df_op_all.columns]
-                df_basic      = df_op_all[flat_cols].copy()
-
-                # —— dynamic extra_metrics ——
-                dynamic_df = df_op_all.drop(columns=flat_cols, errors="ignore")
-                dicts = dynamic_df.to_dict(orient="records")
-                if not dicts:
-                    dicts = [{} for _ in range(len(df_basic))]
-                cleaned = []
-                for d in dicts:
-                    cleaned.append({
-                        k: (None if isinstance(v, float) and math.isnan(v) else v)
-                        for k, v in d.items()
-                    })
-                df_basic["extra_metrics"] = [json.dumps(d, ensure_ascii=False) for d in cleaned]
-
-                # —— ROS 分 ——
-                if "ROS分" in df_op_all.columns:
-                    df_basic["ros_score"] = pd.to_numeric(
-                        df_op_all["ROS分"], errors="coerce"
-                    ).fillna(0).astype(int)
-
-                # —— 排行榜详情 JSON ——
-                df_basic["rankings_detail"] = df_op_all.apply(build_rankings_detail, axis=1)
-
-                # —— 唯一一次写入 operation_data ——
-                from database_importer import get_dtype_for_operation
+
+            # —— 2) 运营数据：唯一一次写入 operation_data ——
+            df_basic = parsed["op"]
+            if df_basic is not None:
                 dtype_op = get_dtype_for_operation(df_basic)
-                import_to_mysql(
-                    df_basic,
-                    "operation_data",
-                    DB_CONNECTION_STRING,
-                    dtype=dtype_op,
-                    if_exists="append"
-                )
+                if IMPORT_MODE == "upsert":
+                    # 写 staging 表后按 (日期, 美团门店ID) 一次性合并
+                    with stage("merge operation_data", len(df_basic)) as rec:
+                        rec["rows_out"] = upsert_via_staging(df_basic, "operation_data", DB_CONNECTION_STRING, dtype=dtype_op)
+                else:
+                    # 删除旧记录，再追加
+                    min_op, max_op = df_basic["日期"].min(), df_basic["日期"].max()
+                    store_ids_op = df_basic["美团门店ID"].astype(str).unique().tolist()
+                    with stage("delete operation_data") as rec:
+                        rec["rows_out"] = delete_old_op_for_store(min_op, max_op, store_ids_op)
+                    with stage("insert operation_data", len(df_basic)) as rec:
+                        rec["rows_out"] = import_to_mysql(
+                            df_basic,
+                            "operation_data",
+                            DB_CONNECTION_STRING,
+                            dtype=dtype_op,
+                            if_exists="append"
+                        )
+                _mark_done(parsed["op_files"])
                 op_successes.append(brand)
-            else:
-                logging.info(f"品牌 {brand} 下无运营数据，跳过。")
-
-            # —— 3) 处理评价数据 ——  <— 与上面 if/else 同级
-            review_files = [
-                f for f in os.listdir(brand_dir)
-                if f.endswith(".xlsx") and "评价" in f
-            ]
-            if review_files:
-                for fname in review_files:
-                    fp = os.path.join(brand_dir, fname)
-                    df_rev = clean_review_file(fp, store_mapping)
-                    dtype_review = {
-                        "store_id": sqltypes.String(50),
-                        "review_date": sqltypes.Date,
-                        "rating_raw": sqltypes.Numeric(3, 1),
-                        "rating_label": sqltypes.String(2),
-                        "review_text": sqltypes.Text,
-                        "senti_score": sqltypes.Float,
-                        "senti_label": sqltypes.String(2),
-                        "key_topics": sqltypes.JSON,
-                    }
-                    import_to_mysql(
-                        df_rev,
-                        "review_data",
-                        DB_CONNECTION_STRING,
-                        dtype=dtype_review,
-                        if_exists="append"
-                    )
-                    print(f"✅ {brand} 的评价文件 {fname} 已写入 review_data，共 {len(df_rev)} 行。")
-            else:
-                logging.info(f"品牌 {brand} 下无评价文件，跳过。")
+
+            # —— 3) 评价数据 ——
+            for fname, df_rev, entry in parsed["reviews"]:
+                mode = "merge" if IMPORT_MODE == "upsert" else "insert"
+                with stage_scope(file_name=fname), stage(f"{mode} review_data", len(df_rev)) as rec:
+                    if IMPORT_MODE == "upsert":
+                        # 按 review_key 合并：重叠导出里已入库的评价直接跳过
+                        n_rev = upsert_reviews(df_rev, DB_CONNECTION_STRING)
+                    else:
+                        n_rev = import_to_mysql(
+                            df_rev,
+                            "review_data",
+                            DB_CONNECTION_STRING,
+                            dtype=dtype_review,
+                            if_exists="append"
+                        )
+                    rec["rows_out"] = n_rev
+                _mark_done([entry])
+                print(f"✅ {brand} 的评价文件 {fname} 已写入 review_data，新增 {n_rev} 行。")
+
+            if parsed["error"]:
+                raise RuntimeError(parsed["error"])
+
             # —— 4) 全部成功后搬目录 ——
-            move_processed_files(brand_dir, PROCESSED_ROOT_PATH)
+            move_processed_files(parsed["brand_dir"], PROCESSED_ROOT_PATH)
 
         except Exception as e:
             logging.error(f"品牌 {brand} 处理失败：{e}")
             failures.append((brand, str(e)))
 
+
+def process_files(base=FIXED_FOLDER_PATH, workers=1):
+    """
+    workers=1 时逐个品牌“解析 → 写库”；workers>1 时用进程池并行解析各品牌目录（Excel 解析是 CPU 密集），
+    主进程作为唯一写库方，按解析完成的先后逐个写入。
+    """
+    print(f"📂 正在读取固定路径：{base}")
+    evict_cache()
+
+    engine = create_engine(DB_CONNECTION_STRING)
+    store_mapping = pd.read_sql("SELECT * FROM store_mapping", con=engine)
+    store_mapping["推广门店"] = store_mapping["推广门店"].str.strip()
+    store_mapping["门店ID"] = store_mapping["门店ID"].astype(str).str.strip()
+
+    # operation_data 表结构（schema_registry 缓存，TTL 内不再反射），已存在的列作为 flat 列
+    op_existing_cols = table_columns(engine, "operation_data")
+
+    # 已入库文件的内容哈希：未变化的文件在解析前就跳过
+    init_manifest_table(engine)
+    known_hashes = load_manifest_hashes(engine)
+
+    # 评价门店名 → store_id 的匹配缓存：只取当前门店映射版本下的结果
+    init_match_cache_table(engine)
+    match_version = mapping_version(stores_frame(store_mapping))
+    store_matches = load_match_cache(engine, match_version)
+
+    def remember_matches(parsed):
+        new_matches = parsed.get("store_matches")
+        if new_matches:
+            save_match_cache(engine, new_matches, match_version)
+            store_matches.update(new_matches)
+
+    cpc_successes, op_successes, failures = [], [], []
+    cache_hits = cache_misses = 0
+    memory_stats = []
+    # 漂移：串行解析与 write_brand 记在本进程的 DRIFT_STATS，子进程的随 parsed["drift"] 带回
+    drift_start, drift_stats = len(DRIFT_STATS), []
+    # 阶段埋点同理：本进程的在 STAGE_STATS，子进程的随 parsed["stages"] 带回
+    stage_start, stage_stats = len(STAGE_STATS), []
+
+    brands = [
+        (brand, os.path.join(base, brand))
+        for brand in os.listdir(base)
+        if os.path.isdir(os.path.join(base, brand))
+    ]
+
+    if workers > 1:
+        print(f"⚙️ 并行解析：{workers} 个进程，共 {len(brands)} 个品牌")
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            futures = {
+                pool.submit(
+                    parse_brand, brand, brand_dir, store_mapping, op_existing_cols, known_hashes, store_matches
+                ): (brand, brand_dir)
+                for brand, brand_dir in brands
+            }
+            for fut in as_completed(futures):
+                brand, brand_dir = futures[fut]
+                try:
+                    parsed = fut.result()
+                except Exception as e:
+                    # 子进程本身异常（如被杀、结果无法回传），只影响该品牌
+                    parsed = {"brand": brand, "brand_dir": brand_dir, "cpc": None, "cpc_files": [],
+                              "op": None, "op_files": [], "reviews": [], "error": str(e), "cache": (0, 0), "memory": [], "drift": [], "stages": []}
+                cache_hits += parsed["cache"][0]
+                cache_misses += parsed["cache"][1]
+                memory_stats += parsed["memory"]
+                drift_stats += parsed["drift"]
+                stage_stats += parsed["stages"]
+                remember_matches(parsed)
+                write_brand(parsed, cpc_successes, op_successes, failures, engine, known_hashes)
+    else:
+        for brand, brand_dir in brands:
+            parsed = parse_brand(brand, brand_dir, store_mapping, op_existing_cols, known_hashes, store_matches)
+            cache_hits += parsed["cache"][0]
+            cache_misses += parsed["cache"][1]
+            memory_stats += parsed["memory"]
+            remember_matches(parsed)
+            write_brand(parsed, cpc_successes, op_successes, failures, engine, known_hashes)
+
     # 最终结果
     print(f"✅ 推广通成功品牌：{cpc_successes}")
     print(f"✅ 运营数据成功品牌：{op_successes}")
@@ -338,6 +316,18 @@ def process_files():
         print("❌ 以下品牌处理失败，请人工介入：")
         for b, err in failures:
             print(f"  - {b}: {err}")
+    print_write_summary()
+    print_cache_summary(cache_hits, cache_misses)
+    print_memory_summary(memory_stats)
+    print_drift_report(DRIFT_STATS[drift_start:] + drift_stats)
+    stage_stats = STAGE_STATS[stage_start:] + stage_stats
+    print_stage_summary(stage_stats)
+    init_stage_table(engine)
+    save_stage_metrics(engine, stage_stats, new_run_id())
+    if EXTRA_METRICS_AUTO_PROMOTE and op_successes:
+        # 高频新指标从 extra_metrics 转为原生列；下次运行起 build_operation_frame 直接写这些列
+        promote_frequent_metrics(DB_CONNECTION_STRING)
+    return cpc_successes, op_successes, failures
 
 
 
@@ -359,4 +349,7 @@ def move_processed_files(src_root, dst_root):
             print(f"📦 已移动文件到：{dst_file_path}")
 
 if __name__ == "__main__":
-    process_files()
+    parser = argparse.ArgumentParser(description="大众点评数据清洗入库")
+    parser.add_argument("--workers", type=int, default=1, help="并行解析品牌目录的进程数（1 = 串行）")
+    args = parser.parse_args()
+    process_files(workers=args.workers)
@@ -1,48 +1,38 @@
 import os
 import pandas as pd
-from sqlalchemy import create_engine, text
-from config import DB_CONNECTION_STRING
-from data_cleaning import (
-    clean_numeric_columns, drop_percentage_columns, match_store_id_for_single_cpc,
-    process_cpc_dates, add_datetime_column
-)
+from sqlalchemy import create_engine, text, bindparam
+from config import DB_CONNECTION_STRING, IMPORT_MODE
 from column_mappings import COLUMN_MAPPING_CPC_HOURLY
-from excel_header_finder import clean_and_load_excel
-from database_importer import import_to_mysql, get_dtype_for_cpc_hourly
+from brand_parser import SOURCE_FILE_COL, clean_cpc_batch
+from parse_cache import evict_cache, print_cache_summary
+from database_importer import import_to_mysql, upsert_via_staging, get_dtype_for_cpc_hourly
 
 engine = create_engine(DB_CONNECTION_STRING)
 
 CPC_HOURLY_FOLDER = r"D:\dianping_downloads\cpc_hourly_data"
 
 def delete_old_cpc_for_store(start_date, end_date, store_ids):
+    # 仅 IMPORT_MODE = 'delete_insert' 时使用
     with engine.begin() as conn:
-        for sid in store_ids:
-            res = conn.execute(
-                text("DELETE FROM cpc_hourly_data WHERE store_id = :sid AND DATE(date) BETWEEN :s AND :e"),
-                {"sid": sid, "s": start_date, "e": end_date}
-            )
-            print(f"✅ 删除 cpc_hourly_data 中 门店ID={sid} {start_date}~{end_date} 共 {res.rowcount} 条。")
+        res = conn.execute(
+            text("DELETE FROM cpc_hourly_data WHERE store_id IN :sids AND date BETWEEN :s AND :e")
+            .bindparams(bindparam("sids", expanding=True)),
+            {"sids": list(store_ids), "s": start_date, "e": end_date}
+        )
+        print(f"✅ 删除 cpc_hourly_data 中 {len(store_ids)} 家门店 {start_date}~{end_date} 共 {res.rowcount} 条。")
 
 def process_cpc_folder():
+    evict_cache()
     store_mapping = pd.read_sql("SELECT * FROM store_mapping", con=engine)
-    dfs = []
-    for fname in os.listdir(CPC_HOURLY_FOLDER):
-        if not fname.endswith(".xlsx"):
-            continue
-        fp = os.path.join(CPC_HOURLY_FOLDER, fname)
-        df = clean_and_load_excel(fp)
-        df = process_cpc_dates(df, fname)
-        df = match_store_id_for_single_cpc(df, store_mapping)
-        df = drop_percentage_columns(df)
-        df = clean_numeric_columns(df)
-        df = add_datetime_column(df)
-        dfs.append(df)
-
-    if not dfs:
+    files = [(os.path.join(CPC_HOURLY_FOLDER, fname), None)
+             for fname in os.listdir(CPC_HOURLY_FOLDER) if fname.endswith(".xlsx")]
+    if not files:
         print("⚠️ 无有效文件导入")
         return
 
-    df_all = pd.concat(dfs, ignore_index=True)
+    # 一整年的回补：各文件的日期合并后按各自文件名起始日一次补全跨年日期，再逐文件清洗
+    df_all = clean_cpc_batch(files, store_mapping).drop(columns=SOURCE_FILE_COL)
+    print_cache_summary()
     df_all['plan_key'] = (
         df_all['门店ID'].astype(str).str.strip()
         + "_"
@@ -54,12 +44,14 @@ def process_cpc_folder():
     df_all.drop_duplicates(subset=['plan_key', 'start_time'], inplace=True)
 
     df_all['date'] = pd.to_datetime(df_all['date']).dt.date
-    min_date, max_date = df_all['date'].min(), df_all['date'].max()
-    store_ids = df_all['store_id'].astype(str).unique().tolist()
-    delete_old_cpc_for_store(min_date, max_date, store_ids)
-
     dtype_cpc = get_dtype_for_cpc_hourly(df_all)
-    import_to_mysql(df_all, "cpc_hourly_data", DB_CONNECTION_STRING, dtype=dtype_cpc)
+    if IMPORT_MODE == "upsert":
+        upsert_via_staging(df_all, "cpc_hourly_data", DB_CONNECTION_STRING, dtype=dtype_cpc)
+    else:
+        min_date, max_date = df_all['date'].min(), df_all['date'].max()
+        store_ids = df_all['store_id'].astype(str).unique().tolist()
+        delete_old_cpc_for_store(min_date, max_date, store_ids)
+        import_to_mysql(df_all, "cpc_hourly_data", DB_CONNECTION_STRING, dtype=dtype_cpc)
 
 if __name__ == "__main__":
     process_cpc_folder()
@@ -1,6 +1,5 @@
 import os
 import pandas as pd
-import json
 import shutil
 from sqlalchemy import create_engine, text, inspect
 from config import DB_CONNECTION_STRING
@@ -11,6 +10,8 @@ from data_cleaning import (
 from column_mappings import COLUMN_MAPPING_CPC_HOURLY
 from excel_header_finder import clean_and_load_excel
 from database_importer import import_to_mysql, get_dtype_for_operation, get_dtype_for_cpc_hourly
+from rankings import build_rankings_detail_column
+from extra_metrics import pack_extra_metrics
 import send2trash  # ✅ 添加回收站依赖
 
 engine = create_engine(DB_CONNECTION_STRING)
@@ -36,41 +37,6 @@ def delete_old_op_for_store(start_date, end_date, store_ids):
             )
             print(f"✅ 删除 operation_data 中 门店ID={sid} {start_date}~{end_date} 共 {res.rowcount} 条。")
 
-def build_rankings_detail(row):
-    city = str(row.get("城市", "")).strip()
-    cols = {
-        "美团人气榜榜单排名":   "meituan_popularity",
-        "美团好评榜榜单排名":   "meituan_rating",
-        "点评热门榜榜单排名":   "dianping_hot",
-        "点评好评榜榜单排名":   "dianping_rating",
-        "点评口味榜榜单排名":   "dianping_taste",
-        "点评环境榜榜单排名":   "dianping_env",
-        "点评服务榜榜单排名":   "dianping_service",
-        "点评打卡人气榜榜单排名": "dianping_checkin",
-    }
-    detail = {}
-    for src_col, key in cols.items():
-        raw = row.get(src_col)
-        if not raw or pd.isna(raw):
-            continue
-        tmp = {}
-        for part in str(raw).split("|"):
-            import re
-            m = re.search(r'(.+?)第(\d+)名', part.strip())
-            if not m:
-                continue
-            scope = m.group(1).strip()
-            rank  = int(m.group(2))
-            if city and city in scope:
-                tmp['city'] = rank
-            elif scope.endswith('区'):
-                tmp['district'] = rank
-            else:
-                tmp['subdistrict'] = rank
-        if tmp:
-            detail[key] = tmp
-    return json.dumps(detail, ensure_ascii=False)
-
 def process_operation_folder():
     print(f"📂 正在读取运营数据路径：{OPERATION_FOLDER}")
     dfs = []
@@ -105,14 +71,12 @@ def process_operation_folder():
     df_basic = df_all[flat_cols].copy()
 
     dynamic_df = df_all.drop(columns=flat_cols, errors="ignore")
-    dicts = dynamic_df.to_dict(orient="records")
-    cleaned = [{k: (None if pd.isna(v) else v) for k, v in d.items()} for d in dicts]
-    df_basic["extra_metrics"] = [json.dumps(d, ensure_ascii=False) for d in cleaned]
+    df_basic["extra_metrics"] = pack_extra_metrics(dynamic_df)
 
     if "ROS分" in df_all.columns:
         df_basic["ros_score"] = pd.to_numeric(df_all["ROS分"], errors="coerce").fillna(0).astype(int)
 
-    df_basic["rankings_detail"] = df_all.apply(build_rankings_detail, axis=1)
+    df_basic["rankings_detail"] = build_rankings_detail_column(df_all)
 
     dtype_op = get_dtype_for_operation(df_basic)
     import_to_mysql(df_basic, "operation_data", DB_CONNECTION_STRING, dtype=dtype_op)
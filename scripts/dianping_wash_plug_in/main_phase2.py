@@ -16,8 +16,11 @@ from data_cleaning import (
     clean_operation_data, clean_numeric_columns, drop_percentage_columns,
     process_cpc_dates, match_store_id_for_single_cpc, add_datetime_column
 )
-from database_importer import import_to_mysql, get_dtype_for_operation, get_dtype_for_cpc_hourly
+from database_importer import upsert_via_staging, get_dtype_for_operation, get_dtype_for_cpc_hourly
 from column_mappings import COLUMN_MAPPING_CPC_HOURLY
+from import_manifest import (
+    init_manifest_table, load_manifest_hashes, record_manifest, describe_file, file_sha256,
+)
 
 # 配置模型
 class Settings(BaseModel):
@@ -103,20 +106,16 @@ def save_processed(path: str, processed_set: set):
 
 # 主处理逻辑示例
 @retryable
-def process_operation_file(path, engine, logger, processed, settings):
+def process_operation_file(path, engine, logger, processed, settings, content_hash, known_hashes):
     logger.info(f"处理运营: {path}")
     df = clean_operation_data(clean_and_load_excel(path))
     df = drop_percentage_columns(df)
     df = clean_numeric_columns(df)
     df["日期"] = pd.to_datetime(df["日期"]).dt.date
-    store_ids = df["美团门店ID"].astype(str).unique().tolist()
-    with engine.begin() as conn:
-        for sid in store_ids:
-            conn.execute(text(
-                "DELETE FROM operation_data WHERE `美团门店ID`=:sid AND DATE(`日期`)=:d"
-            ), {"sid": sid, "d": df["日期"].min()})
-    cnt = import_to_mysql(df, "operation_data", settings.db_connection_string, dtype=get_dtype_for_operation(df))
+    # 写 staging 表后按 (日期, 美团门店ID) 合并，重复导入同一文件结果不变
+    cnt = upsert_via_staging(df, "operation_data", settings.db_connection_string, dtype=get_dtype_for_operation(df))
     record_import(engine, "brand", path, "operation_data", cnt, "success", "", datetime.now(), datetime.now())
+    record_manifest(engine, [describe_file(path, content_hash, "operation_data", df, "日期")], known_hashes)
     send2trash.send2trash(path)
     processed.add(path)
     save_processed(settings.processed_list, processed)
@@ -133,7 +132,9 @@ def main():
     engine = create_engine(settings.db_connection_string)
 
     init_import_history_table(engine)
+    init_manifest_table(engine)
     processed = load_processed(settings.processed_list)
+    known_hashes = load_manifest_hashes(engine)
 
     # 示例：处理运营数据，后续可补充 process_cpc_folder
     op_files = [
@@ -142,10 +143,13 @@ def main():
         if f.endswith('.xlsx')
     ]
     for fp in op_files:
-        if fp in processed:
+        # 按内容哈希判断：同名文件内容变了会重导，改名/挪位置但内容没变的会跳过
+        content_hash = file_sha256(fp)
+        if ("operation_data", content_hash) in known_hashes:
+            logger.info(f"⏭️ 内容未变化，跳过: {fp}")
             continue
         try:
-            process_operation_file(fp, engine, logger, processed, settings)
+            process_operation_file(fp, engine, logger, processed, settings, content_hash, known_hashes)
         except Exception as e:
             logger.error(f"失败: {fp} -> {e}", exc_info=True)
 
@@ -0,0 +1,167 @@
+# parse_cache.py —— 清洗后 DataFrame 的本地列式缓存：按 源文件内容哈希 + 清洗代码版本 命中，重跑/回补/调试不再重新解析 xlsx
+import hashlib
+import logging
+import os
+import pickle
+import time
+
+import numpy as np
+import pandas as pd
+from pandas.api.types import infer_dtype
+
+from config import PARSE_CACHE_DIR, PARSE_CACHE_ENABLED, PARSE_CACHE_MAX_AGE_DAYS, PARSE_CACHE_MAX_BYTES
+from import_manifest import file_sha256
+
+# 清洗结果取决于这些模块的代码：任何一个改动，缓存版本号就变，旧缓存自然失效
+CLEANING_MODULES = [
+    "excel_header_finder.py",
+    "data_cleaning.py",
+    "date_completion.py",
+    "column_mappings.py",
+    "review_cleaner.py",
+    "store_matcher.py",
+    "brand_parser.py",
+]
+
+# Parquet 只能无损保存这些 object 列；混有数值和文本的列（clean_numeric_columns 留下的）改存 pickle
+_PARQUET_SAFE_OBJECT = {"string", "empty", "date"}
+
+# 当前进程的命中统计
+CACHE_STATS = {"hit": 0, "miss": 0}
+
+_code_version = None
+
+
+def cleaning_code_version():
+    """清洗相关模块源码的哈希（进程内只算一次）"""
+    global _code_version
+    if _code_version is None:
+        h = hashlib.sha256()
+        here = os.path.dirname(os.path.abspath(__file__))
+        for name in CLEANING_MODULES:
+            with open(os.path.join(here, name), "rb") as f:
+                h.update(f.read())
+        _code_version = h.hexdigest()[:12]
+    return _code_version
+
+
+def frame_fingerprint(df):
+    """给参与清洗的辅助表（如 store_mapping）算一个稳定指纹，放进缓存键"""
+    if df is None:
+        return ""
+    return f"{int(pd.util.hash_pandas_object(df, index=False).sum()) & 0xFFFFFFFFFFFF:012x}"
+
+
+def _cache_key(stage, file_path, content_hash, extra_key):
+    raw = "|".join([stage, content_hash, os.path.basename(file_path), cleaning_code_version(), extra_key])
+    return f"{stage}_{hashlib.sha256(raw.encode('utf-8')).hexdigest()[:32]}"
+
+
+def _parquet_safe(df):
+    return all(
+        infer_dtype(df[c], skipna=True) in _PARQUET_SAFE_OBJECT
+        for c in df.columns if df[c].dtype == object
+    ) and df.columns.is_unique and all(isinstance(c, str) for c in df.columns)
+
+
+def _read(path):
+    if path.endswith(".parquet"):
+        df = pd.read_parquet(path)
+        # Parquet 把 object 列里的 NaN 读回成 None，还原成清洗时的 NaN
+        for c in df.columns:
+            if df[c].dtype == object:
+                df[c] = df[c].where(df[c].notna(), np.nan)
+        return df
+    with open(path, "rb") as f:
+        return pickle.load(f)
+
+
+def _write(df, base):
+    """写临时文件再 os.replace，多个进程同时写同一键也不会读到半个文件"""
+    if _parquet_safe(df):
+        path = base + ".parquet"
+        tmp = f"{path}.{os.getpid()}.tmp"
+        df.to_parquet(tmp, index=True)
+    else:
+        path = base + ".pkl"
+        tmp = f"{path}.{os.getpid()}.tmp"
+        with open(tmp, "wb") as f:
+            pickle.dump(df, f, protocol=pickle.HIGHEST_PROTOCOL)
+    os.replace(tmp, path)
+    return path
+
+
+def cached_clean(file_path, stage, clean_fn, content_hash=None, extra_key=""):
+    """
+    返回 clean_fn(file_path) 的结果，优先读缓存。
+    stage 区分不同清洗流程（cpc / operation / review），extra_key 放会影响结果的其他输入（如 store_mapping 指纹）。
+    """
+    if not PARSE_CACHE_ENABLED:
+        return clean_fn(file_path)
+
+    content_hash = content_hash or file_sha256(file_path)
+    base = os.path.join(PARSE_CACHE_DIR, _cache_key(stage, file_path, content_hash, extra_key))
+    for path in (base + ".parquet", base + ".pkl"):
+        if os.path.exists(path):
+            try:
+                df = _read(path)
+            except Exception as e:
+                logging.warning(f"缓存损坏，重新解析：{path} ({e})")
+                break
+            os.utime(path)  # 刷新时间，按最近使用淘汰
+            CACHE_STATS["hit"] += 1
+            logging.info(f"🗃️ 缓存命中 [{stage}] {os.path.basename(file_path)}")
+            return df
+
+    CACHE_STATS["miss"] += 1
+    logging.info(f"🗃️ 缓存未命中 [{stage}] {os.path.basename(file_path)}，解析 xlsx")
+    df = clean_fn(file_path)
+    try:
+        os.makedirs(PARSE_CACHE_DIR, exist_ok=True)
+        _write(df, base)
+    except Exception as e:
+        # 缓存只是加速，写失败不影响入库
+        logging.warning(f"写缓存失败：{file_path} ({e})")
+    return df
+
+
+def evict_cache(max_age_days=PARSE_CACHE_MAX_AGE_DAYS, max_bytes=PARSE_CACHE_MAX_BYTES):
+    """先删超过 max_age_days 未使用的缓存，再按最久未使用删到总大小不超过 max_bytes；返回删除个数"""
+    if not os.path.isdir(PARSE_CACHE_DIR):
+        return 0
+    now = time.time()
+    entries = []
+    for name in os.listdir(PARSE_CACHE_DIR):
+        path = os.path.join(PARSE_CACHE_DIR, name)
+        if os.path.isfile(path):
+            st = os.stat(path)
+            entries.append((st.st_mtime, st.st_size, path))
+
+    removed = 0
+    kept = []
+    for mtime, size, path in entries:
+        # .tmp 是进程被杀时残留的半成品
+        if path.endswith(".tmp") or now - mtime > max_age_days * 86400:
+            os.remove(path)
+            removed += 1
+        else:
+            kept.append((mtime, size, path))
+
+    total = sum(size for _, size, _ in kept)
+    for mtime, size, path in sorted(kept):
+        if total <= max_bytes:
+            break
+        os.remove(path)
+        total -= size
+        removed += 1
+
+    if removed:
+        print(f"🧹 已清理解析缓存 {removed} 个文件，剩余 {total / 1024 / 1024:.1f}MB")
+    return removed
+
+
+def print_cache_summary(hits=None, misses=None):
+    hits = CACHE_STATS["hit"] if hits is None else hits
+    misses = CACHE_STATS["miss"] if misses is None else misses
+    if hits or misses:
+        print(f"🗃️ 解析缓存：命中 {hits}，未命中 {misses}")
@@ -0,0 +1,101 @@
+# rankings.py —— 运营数据榜单排名解析（main.py / main_flat_structure*.py / main_operation.py 共用）
+import numpy as np
+import pandas as pd
+
+# 源列 → rankings_detail 里的 key（顺序即 JSON 输出顺序）
+RANKING_COLUMNS = {
+    "美团人气榜榜单排名":   "meituan_popularity",
+    "美团好评榜榜单排名":   "meituan_rating",
+    "点评热门榜榜单排名":   "dianping_hot",
+    "点评好评榜榜单排名":   "dianping_rating",
+    "点评口味榜榜单排名":   "dianping_taste",
+    "点评环境榜榜单排名":   "dianping_env",
+    "点评服务榜榜单排名":   "dianping_service",
+    "点评打卡人气榜榜单排名": "dianping_checkin",
+}
+RANK_PATTERN = r'(.+?)第(\d+)名'
+
+
+def _join_sorted(pieces, groups):
+    """pieces 已按 groups 排好序：同组片段用 ', ' 连接，返回 (每组首个下标, 连接结果)"""
+    first = np.r_[True, groups[1:] != groups[:-1]]
+    pieces = pieces.copy()
+    pieces[~first] = ", " + pieces[~first]
+    starts = np.flatnonzero(first)
+    return starts, np.add.reduceat(pieces, starts)
+
+
+def build_rankings_detail_column(df: pd.DataFrame) -> pd.Series:
+    """
+    按行生成 rankings_detail JSON：
+    直接用当前行的 '城市' 列判定 city 级，以 '区' 结尾判定 district 级，其余当 subdistrict 级。
+    一条 (榜单列, 单元格文本, 城市) 组合产出的 JSON 片段是确定的，而同一门店的榜单文本日复一日高度重复，
+    所以只对去重后的组合拆 '|' 片段、批量正则提取并拼 JSON，再按行把片段接起来。
+    """
+    present = [c for c in RANKING_COLUMNS if c in df.columns]
+    result = pd.Series("{}", index=df.index, dtype=object)
+    if not present or df.empty:
+        return result
+
+    n, k = len(df), len(present)
+    if "城市" in df.columns:
+        city = df["城市"].astype(str).str.strip().to_numpy(dtype=object)
+    else:
+        city = np.full(n, "", dtype=object)
+    city_codes, city_uniques = pd.factorize(city)
+
+    # 1) 展平成 (行, 榜单列) 一维，按 (榜单列, 文本, 城市) 去重；空值 code=-1 直接跳过
+    cell_codes, cell_uniques = pd.factorize(df[present].to_numpy(dtype=object).ravel())
+    valid = np.flatnonzero(cell_codes >= 0)
+    combo = (
+        (cell_codes[valid].astype(np.int64) * k + valid % k) * len(city_uniques)
+        + city_codes[valid // k]
+    )
+    combo_codes, combo_uniques = pd.factorize(combo)
+    u_city = city_uniques[combo_uniques % len(city_uniques)]
+    u_col = (combo_uniques // len(city_uniques)) % k
+    u_cell = cell_uniques[combo_uniques // len(city_uniques) // k]
+
+    # 2) 拆 '|' 片段并批量提取；非字符串取值 split 后为 NaN，自然被丢弃
+    parts = pd.Series(u_cell).str.split("|").explode().dropna()
+    found = parts.str.strip().str.extract(RANK_PATTERN).dropna()
+    if found.empty:
+        return result
+    u_idx = found.index.to_numpy()
+    scope = found[0].str.strip().to_numpy(dtype=object)
+    rank = found[1].to_numpy(dtype=object).astype(np.int64)
+
+    # 3) 判定层级：同城 > 以“区”结尾 > 其余
+    in_city = np.fromiter(
+        (bool(c) and c in s for c, s in zip(u_city[u_idx], scope)),
+        dtype=bool, count=len(scope),
+    )
+    ends_district = np.fromiter((s.endswith("区") for s in scope), dtype=bool, count=len(scope))
+    level = np.where(in_city, "city", np.where(ends_district, "district", "subdistrict"))
+
+    # 4) 同一组合内同一层级取最后一次出现的名次，key 顺序按首次出现
+    long = pd.DataFrame({"u": u_idx, "level": level, "rank": rank, "seq": np.arange(len(rank))})
+    agg = (
+        long.groupby(["u", "level"], sort=False)
+            .agg(seq=("seq", "min"), rank=("rank", "last"))
+            .reset_index()
+            .sort_values(["u", "seq"])
+    )
+
+    # 5) 批量拼 JSON 片段：key/层级都是固定 ASCII，名次是整数，无需转义
+    pairs = ('"' + agg["level"] + '": ' + agg["rank"].astype(str)).to_numpy(dtype=object)
+    u_sorted = agg["u"].to_numpy()
+    starts, joined = _join_sorted(pairs, u_sorted)
+    keys = np.array([RANKING_COLUMNS[c] for c in present], dtype=object)
+    frag_of_u = np.full(len(combo_uniques), None, dtype=object)
+    frag_of_u[u_sorted[starts]] = '"' + keys[u_col[u_sorted[starts]]] + '": {' + joined + "}"
+
+    # 6) 回填到每个 (行, 榜单列)，再按行（展平后天然有序）接成完整 JSON
+    frags = frag_of_u[combo_codes]
+    has = np.flatnonzero(frags != None)  # noqa: E711
+    if not len(has):
+        return result
+    rows = valid[has] // k
+    starts, per_row = _join_sorted(frags[has], rows)
+    result.iloc[rows[starts]] = "{" + per_row + "}"
+    return result
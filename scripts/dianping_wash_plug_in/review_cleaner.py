@@ -3,14 +3,15 @@
 # 1. 只做基础清洗 + 门店匹配
 # 2. 补齐 main.py 需要的 8 列，占位列用 None
 # ---------------------------------------------
-import os, re, unicodedata, json
+import os, json
 import pandas as pd
-from rapidfuzz import process, fuzz
 from sqlalchemy import types as sqltypes
 try:
     from .database_importer import import_to_mysql  # 包内相对导入，防止找不到
 except ImportError:
     from database_importer import import_to_mysql  # 兼容直接脚本运行
+# 门店名模糊匹配在 store_matcher 里
+from store_matcher import match_store_names, stores_frame
 
 # ---------- MySQL 字段类型（供外部脚本可选复用） ----------
 dtype_review = {
@@ -22,47 +23,20 @@ dtype_review = {
     "senti_score":  sqltypes.Float,
     "senti_label":  sqltypes.String(2),
     "key_topics":   sqltypes.JSON,
+    "review_key":   sqltypes.String(40),  # 去重键，见 review_dedupe.review_keys
 }
 
-# ---------- 正则 & 工具 ----------
-RE_PAREN = re.compile(r"[（(].*?[)）]")
-RE_DOT   = re.compile(r"[·•・\.]")
-RE_SPACE = re.compile(r"\s+")
-
-def normalize_name(name: str) -> str:
-    if pd.isna(name):
-        return ""
-    name = unicodedata.normalize("NFKC", name)
-    name = RE_PAREN.sub(" ", name)
-    name = RE_DOT.sub(" ", name)
-    name = name.replace("店", " ")
-    return RE_SPACE.sub(" ", name).strip().lower()
-
-FUZZ_TOKEN_TH, FUZZ_PART_TH = 90, 85
-def fuzzy_match(name, candidats_df):
-    if not name:
-        return None
-    n_name = normalize_name(name)
-    top = process.extract(
-        n_name,
-        candidats_df["store_name_norm"],
-        scorer=fuzz.token_sort_ratio,
-        limit=3
-    )
-    for match_str, score, idx in top:
-        part = fuzz.partial_ratio(n_name, match_str)
-        if score >= FUZZ_TOKEN_TH or part >= FUZZ_PART_TH:
-            return candidats_df.iloc[idx]["store_id"]
-    return None
-
 # ---------- 主函数 ----------
 KEEP_COLS = [
     "store_id", "review_date", "rating_raw", "rating_label",
     "review_text", "senti_score", "senti_label", "key_topics"
 ]
 
-def clean_review_file(xlsx_path: str, store_mapping: pd.DataFrame) -> pd.DataFrame:
-    """读取原始评价 Excel -> 清洗 -> 匹配门店 -> 返回 8 列 DataFrame，完全兼容 main.py"""
+def clean_review_file(xlsx_path: str, store_mapping: pd.DataFrame, match_cache=None) -> pd.DataFrame:
+    """
+    读取原始评价 Excel -> 清洗 -> 匹配门店 -> 返回 8 列 DataFrame，完全兼容 main.py
+    match_cache：已知的 {门店名: store_id}（store_matcher.load_match_cache），新模糊匹配的结果会写回其中
+    """
     df = (
         pd.read_excel(xlsx_path, header=0, dtype=str)
           .rename(columns={
@@ -79,20 +53,15 @@ def clean_review_file(xlsx_path: str, store_mapping: pd.DataFrame) -> pd.DataFra
     df.dropna(subset=["review_text", "store_name"], inplace=True)
 
     # —— 门店匹配 ——
-    stores_df = store_mapping.rename(columns={
-        "推广门店": "store_name",
-        "门店ID":   "store_id"
-    })
-    stores_df["store_name_norm"] = stores_df["store_name"].apply(normalize_name)
+    stores_df = stores_frame(store_mapping)
 
     df = df.merge(stores_df[["store_name", "store_id"]], how="left", on="store_name")
 
-    # 需要模糊匹配的再补
+    # 需要模糊匹配的再补：同名只算一次，已缓存的直接查字典
     mask = df["store_id"].isna()
     if mask.any():
-        df.loc[mask, "store_id"] = df.loc[mask, "store_name"].apply(
-            lambda x: fuzzy_match(x, stores_df)
-        )
+        matches = match_store_names(df.loc[mask, "store_name"], stores_df, match_cache)
+        df.loc[mask, "store_id"] = df.loc[mask, "store_name"].map(matches)
 
     # 未匹配日志
     unmatched = df["store_id"].isna().sum()
@@ -0,0 +1,182 @@
+# review_dedupe.py —— 评价表按自然键去重：hash(store_id, review_date, rating, 归一化正文) 作为 review_key，
+# 入库按 review_key 合并（已存在的评价保持原样），重复导入不再产生重复行；
+# 对历史数据的一次性批量去重（会删除重复评价及其 AI 标签）只由命令行单独执行，导入流程里不会触发
+import argparse
+import hashlib
+import time
+import unicodedata
+
+import pandas as pd
+from sqlalchemy import bindparam, inspect, text
+
+from config import DB_CONNECTION_STRING, WRITE_CHUNKSIZE
+from database_importer import ensure_merge_key, get_engine, upsert_via_staging, _insert_executemany
+from review_cleaner import dtype_review
+from schema_registry import invalidate_schema
+
+REVIEW_TABLE = "review_data"
+REVIEW_KEY_COL = "review_key"
+TAG_TABLE = "review_ai_tag"     # tag_batch 写入的 AI 标签，raw_id → review_data.id
+DELETE_BATCH = 5000
+
+
+def normalize_review_text(text_value):
+    """全半角统一（NFKC）+ 连续空白合并，避免同一条评价因导出格式不同算出不同的键"""
+    if pd.isna(text_value):
+        return ""
+    return " ".join(unicodedata.normalize("NFKC", str(text_value)).split())
+
+
+def review_keys(df):
+    """逐行计算 review_key（sha1 十六进制）；评价 Excel 与库里读回的数据得到相同的键"""
+    store = df["store_id"].where(df["store_id"].notna(), "").astype(str).str.strip()
+    day = pd.to_datetime(df["review_date"], errors="coerce").dt.strftime("%Y-%m-%d").fillna("")
+    rating = pd.to_numeric(df["rating_raw"], errors="coerce").round(1)
+    rating = rating.map("{:.1f}".format).where(rating.notna(), "")
+    body = df["review_text"].map(normalize_review_text)
+    return pd.Series(
+        [
+            hashlib.sha1("\x1f".join(parts).encode("utf-8")).hexdigest()
+            for parts in zip(store, day, rating, body)
+        ],
+        index=df.index,
+        dtype=object,
+    )
+
+
+def add_review_key(df):
+    """加上 review_key 列，并去掉同一批里重复的评价（保留第一条）"""
+    df = df.copy()
+    df[REVIEW_KEY_COL] = review_keys(df)
+    return df.drop_duplicates(subset=[REVIEW_KEY_COL])
+
+
+class ReviewKeyMissingError(RuntimeError):
+    """review_data 还是旧表结构（没有 review_key），需要先单独跑一次历史去重回填"""
+
+
+def ensure_review_key(engine):
+    """
+    review_data 已存在但还没有 review_key 列（旧表）时直接报错，不在导入流程里自动回填：
+    回填会删除历史重复评价及其 AI 标签，必须由人单独运行本模块的命令行确认执行
+    """
+    inspector = inspect(engine)
+    if not inspector.has_table(REVIEW_TABLE):
+        return
+    if REVIEW_KEY_COL not in {c["name"] for c in inspector.get_columns(REVIEW_TABLE)}:
+        raise ReviewKeyMissingError(
+            f"❌ {REVIEW_TABLE} 缺少 {REVIEW_KEY_COL} 列，请先运行 `python review_dedupe.py --db <连接串>` "
+            f"对历史评价去重并回填 {REVIEW_KEY_COL}，再导入评价"
+        )
+
+
+def upsert_reviews(df_rev, db_connection_string):
+    """
+    评价入库：按 review_key 合并，库里已有的评价（以及它已关联的 AI 标签）不动；返回实际新增的评价数。
+    旧表还没回填 review_key 时抛 ReviewKeyMissingError，不写入任何数据
+    """
+    ensure_review_key(get_engine(db_connection_string))
+    df_rev = add_review_key(df_rev)
+    return upsert_via_staging(
+        df_rev,
+        REVIEW_TABLE,
+        db_connection_string,
+        key_cols=(REVIEW_KEY_COL,),
+        dtype=dtype_review,
+        update_existing=False,
+    )
+
+
+def _delete_ids(conn, table, column, ids):
+    removed = 0
+    stmt = text(f"DELETE FROM {table} WHERE {column} IN :ids").bindparams(bindparam("ids", expanding=True))
+    for i in range(0, len(ids), DELETE_BATCH):
+        removed += conn.execute(stmt, {"ids": ids[i:i + DELETE_BATCH]}).rowcount
+    return removed
+
+
+def _write_keys(engine, keys):
+    """把 (id, review_key) 写进 staging 表，再用一条 UPDATE 回填到 review_data"""
+    staging = f"{REVIEW_TABLE}__keys"
+    prep = engine.dialect.identifier_preparer
+    keys.to_sql(staging, engine, if_exists="replace", index=False,
+                chunksize=WRITE_CHUNKSIZE, method=_insert_executemany)
+    target, stg, col = prep.quote(REVIEW_TABLE), prep.quote(staging), prep.quote(REVIEW_KEY_COL)
+    with engine.begin() as conn:
+        conn.execute(text(f"CREATE INDEX {prep.quote(f'ix_{staging}_id')} ON {stg} (id)"))
+    if engine.dialect.name == "mysql":
+        sql = f"UPDATE {target} t JOIN {stg} k ON t.id = k.id SET t.{col} = k.{col}"
+    else:
+        sql = (
+            f"UPDATE {target} SET {col} = (SELECT k.{col} FROM {stg} k WHERE k.id = {target}.id) "
+            f"WHERE id IN (SELECT id FROM {stg})"
+        )
+    try:
+        with engine.begin() as conn:
+            return conn.execute(text(sql)).rowcount
+    finally:
+        with engine.begin() as conn:
+            conn.execute(text(f"DROP TABLE IF EXISTS {stg}"))
+
+
+def backfill_review_keys(engine, chunksize=100_000):
+    """
+    历史评价批量去重：
+    1. 补 review_key 列；2. 按 id 分块读出全部评价算键；
+    3. 同键只留一条（优先留已有 AI 标签的，其次 id 最小的），删掉其余评价及其 AI 标签；
+    4. 回填 review_key 并建唯一索引。
+    返回 (删除的重复评价数, 回填的键数)。
+    """
+    t0 = time.perf_counter()
+    inspector = inspect(engine)
+    columns = {c["name"] for c in inspector.get_columns(REVIEW_TABLE)}
+    if "id" not in columns:
+        raise ValueError(f"❌ {REVIEW_TABLE} 缺少 id 主键列，无法按行去重")
+    if REVIEW_KEY_COL not in columns:
+        with engine.begin() as conn:
+            conn.execute(text(f"ALTER TABLE {REVIEW_TABLE} ADD COLUMN {REVIEW_KEY_COL} VARCHAR(40)"))
+        invalidate_schema(engine, REVIEW_TABLE)
+
+    tagged = set()
+    if inspector.has_table(TAG_TABLE):
+        tagged = set(pd.read_sql(f"SELECT DISTINCT raw_id FROM {TAG_TABLE}", engine)["raw_id"])
+
+    parts = []
+    sql = f"SELECT id, store_id, review_date, rating_raw, review_text, {REVIEW_KEY_COL} AS old_key FROM {REVIEW_TABLE} ORDER BY id"
+    for chunk in pd.read_sql(sql, engine, chunksize=chunksize):
+        chunk["new_key"] = review_keys(chunk)
+        chunk["untagged"] = ~chunk["id"].isin(tagged)
+        parts.append(chunk[["id", "old_key", "new_key", "untagged"]])
+    if not parts:
+        ensure_merge_key(engine, REVIEW_TABLE, (REVIEW_KEY_COL,))
+        return 0, 0
+    keys = pd.concat(parts, ignore_index=True).sort_values(["new_key", "untagged", "id"])
+
+    dup = keys.duplicated(subset=["new_key"])
+    dup_ids = keys.loc[dup, "id"].tolist()
+    keys = keys[~dup]
+    if dup_ids:
+        with engine.begin() as conn:
+            removed = _delete_ids(conn, REVIEW_TABLE, "id", dup_ids)
+            if inspector.has_table(TAG_TABLE):
+                _delete_ids(conn, TAG_TABLE, "raw_id", dup_ids)
+    else:
+        removed = 0
+
+    stale = keys[keys["old_key"] != keys["new_key"]]
+    filled = 0
+    if len(stale):
+        filled = _write_keys(engine, stale[["id", "new_key"]].rename(columns={"new_key": REVIEW_KEY_COL}))
+    ensure_merge_key(engine, REVIEW_TABLE, (REVIEW_KEY_COL,))
+    print(
+        f"✅ {REVIEW_TABLE} 去重完成：删除重复评价 {removed} 条，回填 {REVIEW_KEY_COL} {filled} 条，"
+        f"用时 {time.perf_counter() - t0:.1f}s"
+    )
+    return removed, filled
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="review_data 历史评价去重 + 回填 review_key")
+    parser.add_argument("--db", default=DB_CONNECTION_STRING, help="数据库连接串（默认取 config.py）")
+    args = parser.parse_args()
+    backfill_review_keys(get_engine(args.db))
@@ -0,0 +1,191 @@
+# schema_evolution.py —— extra_metrics 里高频出现的指标“转正”为 operation_data 的原生列：
+# 统计各键的填充率 → 按 get_dtype_for_operation 的规则推断类型 → ALTER TABLE 加列 → 按月批量从 JSON 回填并移出 JSON。
+# 之后的导入里这些指标自动落在 flat 列（build_operation_frame 以表现有列为准），下游查询不再逐行解析 JSON
+import argparse
+import json
+import time
+from collections import defaultdict
+
+import pandas as pd
+from sqlalchemy import text
+from sqlalchemy.types import BigInteger, Float, Integer, String, Text
+
+from config import DB_CONNECTION_STRING, EXTRA_METRICS_PROMOTE_MIN_RATIO, EXTRA_METRICS_SCAN_DAYS
+from database_importer import get_engine, get_dtype_for_operation
+from schema_registry import table_columns, invalidate_schema
+
+OPERATION_TABLE = "operation_data"
+JSON_COL = "extra_metrics"
+DATE_COL = "日期"
+MAX_IDENTIFIER_LEN = 64     # MySQL 列名上限
+INT32_MAX = 2 ** 31 - 1
+
+
+def scan_extra_metrics(engine, since=None, chunksize=50_000):
+    """
+    逐块读取 extra_metrics，统计每个键的非空行数与取值类型。
+    since 为起始日期（只看最近的数据，新指标的填充率才不会被历史行稀释）；返回 (总行数, 统计表)。
+    """
+    sql = f"SELECT {JSON_COL} FROM {OPERATION_TABLE}"
+    params = {}
+    if since is not None:
+        sql += f" WHERE {engine.dialect.identifier_preparer.quote(DATE_COL)} >= :since"
+        params["since"] = since
+    filled = defaultdict(int)
+    kinds = defaultdict(set)
+    max_abs = defaultdict(int)
+    total = 0
+    for chunk in pd.read_sql(text(sql), engine, params=params, chunksize=chunksize):
+        total += len(chunk)
+        for raw in chunk[JSON_COL]:
+            if raw is None:
+                continue
+            metrics = json.loads(raw) if isinstance(raw, str) else raw
+            for key, value in metrics.items():
+                if value is None:
+                    continue
+                filled[key] += 1
+                kinds[key].add(type(value).__name__)
+                if isinstance(value, int):
+                    max_abs[key] = max(max_abs[key], abs(value))
+    stats = pd.DataFrame({
+        "key": list(filled),
+        "filled": [filled[k] for k in filled],
+        "kinds": [",".join(sorted(kinds[k])) for k in filled],
+        "max_abs": [max_abs[k] for k in filled],
+    })
+    if total:
+        stats["ratio"] = stats["filled"] / total
+    return total, stats
+
+
+def infer_metric_type(key, kinds, max_abs=0):
+    """名字在 get_dtype_for_operation 里的沿用其类型；否则看取值：整数 → Integer / BigInteger，含小数 → Float，文本 → String"""
+    known = get_dtype_for_operation(pd.DataFrame(columns=[key]))
+    if key in known:
+        type_ = known[key]
+        return type_() if isinstance(type_, type) else type_
+    kinds = set(kinds.split(",")) if isinstance(kinds, str) else set(kinds)
+    if kinds & {"dict", "list"}:
+        return Text()
+    if "str" in kinds:
+        return String(255)
+    if "float" in kinds:
+        return Float()
+    return BigInteger() if max_abs > INT32_MAX else Integer()
+
+
+def plan_promotions(engine, min_ratio=EXTRA_METRICS_PROMOTE_MIN_RATIO, scan_days=EXTRA_METRICS_SCAN_DAYS):
+    """返回 {键: SQLAlchemy 类型}：最近 scan_days 天里填充率 ≥ min_ratio、表里还没有同名列的键"""
+    since = None
+    if scan_days:
+        latest = pd.read_sql(
+            text(f"SELECT MAX({engine.dialect.identifier_preparer.quote(DATE_COL)}) AS d FROM {OPERATION_TABLE}"), engine
+        )["d"][0]
+        if latest is not None:
+            since = (pd.Timestamp(latest) - pd.Timedelta(days=scan_days)).date()
+    total, stats = scan_extra_metrics(engine, since)
+    if not total or stats.empty:
+        return {}
+    existing = set(table_columns(engine, OPERATION_TABLE))
+    picked = stats[(stats["ratio"] >= min_ratio) & ~stats["key"].isin(existing)].sort_values("filled", ascending=False)
+    plan = {}
+    for row in picked.itertuples(index=False):
+        if len(row.key) > MAX_IDENTIFIER_LEN:
+            print(f"⚠️ 指标名超过 {MAX_IDENTIFIER_LEN} 个字符，保留在 {JSON_COL}：{row.key}")
+            continue
+        plan[row.key] = infer_metric_type(row.key, row.kinds, row.max_abs)
+    return plan
+
+
+def _json_path(key):
+    return '$."' + key.replace('\\', '\\\\').replace('"', '\\"') + '"'
+
+
+def add_metric_columns(engine, plan):
+    """ALTER TABLE 加列：MySQL 一条语句加完（只重建一次表），SQLite 只能逐列加"""
+    prep = engine.dialect.identifier_preparer
+    table = prep.quote(OPERATION_TABLE)
+    parts = [f"ADD COLUMN {prep.quote(key)} {type_.compile(dialect=engine.dialect)}" for key, type_ in plan.items()]
+    with engine.begin() as conn:
+        if engine.dialect.name == "mysql":
+            conn.execute(text(f"ALTER TABLE {table} " + ", ".join(parts)))
+        else:
+            for part in parts:
+                conn.execute(text(f"ALTER TABLE {table} {part}"))
+    invalidate_schema(engine, OPERATION_TABLE)
+
+
+def _month_ranges(start, end):
+    """[start, end] 按自然月切成若干 (月初, 月末)"""
+    month = pd.Timestamp(start).to_period("M")
+    last = pd.Timestamp(end).to_period("M")
+    while month <= last:
+        yield month.start_time.date(), month.end_time.date()
+        month += 1
+
+
+def backfill_metric_columns(engine, keys):
+    """
+    按月一条 UPDATE：把 keys 从 extra_metrics 取出写进同名列，并从 JSON 里移除（同一指标不再存两份）；返回更新行数。
+    全部在数据库里完成，不把 JSON 读回 Python。
+    """
+    prep = engine.dialect.identifier_preparer
+    table, json_col, date_col = prep.quote(OPERATION_TABLE), prep.quote(JSON_COL), prep.quote(DATE_COL)
+    paths = {key: _json_path(key) for key in keys}
+    params = {f"p{i}": path for i, path in enumerate(paths.values())}
+    names = dict(zip(paths, params))
+    if engine.dialect.name == "mysql":
+        # JSON_EXTRACT 取出的是 JSON 值：去引号，JSON null 转成 SQL NULL
+        extract = "NULLIF(JSON_UNQUOTE(JSON_EXTRACT({col}, :{p})), 'null')"
+        remove = "JSON_REMOVE"
+    else:
+        extract = "json_extract({col}, :{p})"
+        remove = "json_remove"
+    assignments = [f"{prep.quote(key)} = " + extract.format(col=json_col, p=names[key]) for key in keys]
+    assignments.append(f"{json_col} = {remove}({json_col}, " + ", ".join(f":{names[k]}" for k in keys) + ")")
+    sql = text(
+        f"UPDATE {table} SET {', '.join(assignments)} "
+        f"WHERE {date_col} BETWEEN :s AND :e AND {json_col} IS NOT NULL"
+    )
+
+    bounds = pd.read_sql(text(f"SELECT MIN({date_col}) AS lo, MAX({date_col}) AS hi FROM {table}"), engine)
+    lo, hi = bounds["lo"][0], bounds["hi"][0]
+    if lo is None:
+        return 0
+    updated = 0
+    for start, end in _month_ranges(lo, hi):
+        # 每个月一个事务：锁持有时间短，中途失败重跑也只会重做没提交的月份
+        with engine.begin() as conn:
+            updated += conn.execute(sql, {**params, "s": start, "e": end}).rowcount
+    return updated
+
+
+def promote_frequent_metrics(db_connection_string=DB_CONNECTION_STRING, min_ratio=EXTRA_METRICS_PROMOTE_MIN_RATIO,
+                             scan_days=EXTRA_METRICS_SCAN_DAYS, dry_run=False):
+    """检测 → 加列 → 回填；dry_run 时只打印计划。返回 {键: 类型}"""
+    t0 = time.perf_counter()
+    engine = get_engine(db_connection_string)
+    plan = plan_promotions(engine, min_ratio, scan_days)
+    if not plan:
+        print(f"✅ {JSON_COL} 中没有填充率 ≥ {min_ratio:.0%} 的新指标")
+        return {}
+    print(f"🧬 {len(plan)} 个指标转为 {OPERATION_TABLE} 原生列：")
+    for key, type_ in plan.items():
+        print(f"  - {key}: {type_.compile(dialect=engine.dialect)}")
+    if dry_run:
+        return plan
+    add_metric_columns(engine, plan)
+    updated = backfill_metric_columns(engine, list(plan))
+    print(f"✅ 已加列并回填 {updated} 行，用时 {time.perf_counter() - t0:.1f}s")
+    return plan
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="把 extra_metrics 里的高频指标转为 operation_data 原生列")
+    parser.add_argument("--db", default=DB_CONNECTION_STRING, help="数据库连接串（默认取 config.py）")
+    parser.add_argument("--min-ratio", type=float, default=EXTRA_METRICS_PROMOTE_MIN_RATIO, help="最低填充率")
+    parser.add_argument("--scan-days", type=int, default=EXTRA_METRICS_SCAN_DAYS, help="只统计最近多少天（0 = 全表）")
+    parser.add_argument("--dry-run", action="store_true", help="只打印要加的列，不改表")
+    args = parser.parse_args()
+    promote_frequent_metrics(args.db, args.min_ratio, args.scan_days, args.dry_run)
@@ -0,0 +1,144 @@
+# schema_registry.py —— 目标表结构缓存：每张表每次运行只反射一次（可选落盘，TTL 内连首次反射也省掉），
+# 对外提供列名 / 声明类型，并汇总“导出里有、表里没有”的列（漂移报告）
+import json
+import logging
+import os
+import time
+from collections import defaultdict
+
+from sqlalchemy import inspect
+
+from config import SCHEMA_CACHE_PATH, SCHEMA_CACHE_TTL_SECONDS
+
+# 进程内缓存：{(连接串, 表名): (反射时刻, {"columns": [...], "types": {列名: 类型}})}
+_SCHEMAS = {}
+
+# 本进程记录的漂移：[(表名, 来源标签, [表里没有的导出列]), ...]，供 print_drift_report() 汇总
+DRIFT_STATS = []
+
+
+def _engine_key(engine):
+    return engine.url.render_as_string(hide_password=True)
+
+
+def _load_disk():
+    if not SCHEMA_CACHE_PATH or not os.path.exists(SCHEMA_CACHE_PATH):
+        return {}
+    try:
+        with open(SCHEMA_CACHE_PATH, encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError) as e:
+        logging.warning(f"表结构缓存损坏，忽略：{SCHEMA_CACHE_PATH} ({e})")
+        return {}
+
+
+def _save_disk(entries):
+    tmp = SCHEMA_CACHE_PATH + ".tmp"
+    try:
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(entries, f, ensure_ascii=False)
+        os.replace(tmp, SCHEMA_CACHE_PATH)
+    except OSError as e:
+        # 缓存只是加速，写失败不影响导入
+        logging.warning(f"写表结构缓存失败：{SCHEMA_CACHE_PATH} ({e})")
+
+
+def _disk_id(key):
+    return f"{key[0]}|{key[1]}"
+
+
+def get_schema(engine, table_name, ttl=SCHEMA_CACHE_TTL_SECONDS):
+    """
+    返回 {"columns": [列名, ...], "types": {列名: 声明类型字符串}}；表不存在返回 None（不缓存）。
+    先查进程内缓存，再查磁盘缓存，都没有才反射数据库；两级缓存都在 ttl 秒后过期（常驻进程也能看到新列）。
+    ttl<=0 时不落盘，进程内缓存一直有效（每次运行只反射一次）。
+    """
+    key = (_engine_key(engine), table_name)
+    now = time.time()
+    cached = _SCHEMAS.get(key)
+    if cached and (ttl <= 0 or now - cached[0] < ttl):
+        return cached[1]
+
+    if ttl > 0 and SCHEMA_CACHE_PATH:
+        entry = _load_disk().get(_disk_id(key))
+        if entry and now - entry["reflected_at"] < ttl:
+            _SCHEMAS[key] = (entry["reflected_at"], entry["schema"])
+            return entry["schema"]
+
+    inspector = inspect(engine)
+    if not inspector.has_table(table_name):
+        return None
+    columns = inspector.get_columns(table_name)
+    schema = {
+        "columns": [c["name"] for c in columns],
+        "types": {c["name"]: str(c["type"]) for c in columns},
+    }
+    _SCHEMAS[key] = (now, schema)
+    logging.info(f"🔍 反射表结构 {table_name}：{len(columns)} 列")
+
+    if ttl > 0 and SCHEMA_CACHE_PATH:
+        # 顺手清掉过期条目，文件不会无限增长
+        entries = {k: v for k, v in _load_disk().items() if now - v["reflected_at"] < ttl}
+        entries[_disk_id(key)] = {"reflected_at": now, "schema": schema}
+        _save_disk(entries)
+    return schema
+
+
+def table_columns(engine, table_name):
+    """表的列名（保持表内顺序）；表不存在返回 []"""
+    schema = get_schema(engine, table_name)
+    return list(schema["columns"]) if schema else []
+
+
+def column_types(engine, table_name):
+    """{列名: 声明类型}，如 {"日期": "DATE", "门店名称": "VARCHAR(255)"}；表不存在返回 {}"""
+    schema = get_schema(engine, table_name)
+    return dict(schema["types"]) if schema else {}
+
+
+def invalidate_schema(engine, table_name=None):
+    """建表 / ALTER / 写入失败后调用，下次访问重新反射；table_name=None 时清掉该库的全部缓存"""
+    url = _engine_key(engine)
+    for key in [k for k in _SCHEMAS if k[0] == url and table_name in (None, k[1])]:
+        del _SCHEMAS[key]
+    entries = _load_disk()
+    stale = [k for k in entries if k == _disk_id((url, table_name)) or (table_name is None and k.startswith(url + "|"))]
+    if stale:
+        for k in stale:
+            del entries[k]
+        _save_disk(entries)
+
+
+# ---------- 漂移报告 ----------
+def record_drift(table_name, export_columns, existing_cols, label="", ignore=()):
+    """记录 export_columns 中表里没有的列（ignore 里的列不算）；返回这些列"""
+    existing = set(existing_cols) | set(ignore)
+    new_cols = [c for c in export_columns if c not in existing]
+    if new_cols:
+        DRIFT_STATS.append((table_name, label, new_cols))
+    return new_cols
+
+
+def drift_report(engine, table_name, export_columns, label="", ignore=()):
+    """对照（缓存的）表结构记录漂移；表还不存在时不记录"""
+    existing = table_columns(engine, table_name)
+    if not existing:
+        return []
+    return record_drift(table_name, export_columns, existing, label, ignore)
+
+
+def print_drift_report(stats=None):
+    """按表汇总本次运行中导出里出现、表里没有的列，以及出现在多少个来源（品牌 / 文件）里"""
+    stats = DRIFT_STATS if stats is None else stats
+    if not stats:
+        return
+    by_table = defaultdict(lambda: defaultdict(set))
+    for table_name, label, new_cols in stats:
+        for col in new_cols:
+            by_table[table_name][col].add(label)
+    print("🧭 表结构漂移：以下导出列不在目标表中")
+    for table_name, cols in by_table.items():
+        ranked = sorted(cols.items(), key=lambda kv: (-len(kv[1]), kv[0]))
+        print(f"  - {table_name}：{len(ranked)} 列")
+        for col, labels in ranked:
+            print(f"      {col}（{len(labels)} 个来源）")
@@ -0,0 +1,190 @@
+# stage_metrics.py —— 清洗入库各阶段的埋点：耗时、进出行数、进程内存高水位（可选 tracemalloc 逐阶段峰值），
+# 按品牌 / 文件记录，运行结束时打印汇总表并写入 import_stage_metrics（与 import_manifest 同库）
+import ctypes
+import os
+import sys
+import time
+import tracemalloc
+from contextlib import contextmanager
+from datetime import datetime
+
+import pandas as pd
+from sqlalchemy import Column, DateTime, Float, Integer, MetaData, String, Table, insert
+
+from config import STAGE_METRICS_ENABLED, STAGE_TRACE_MEMORY
+
+STAGE_TABLE = "import_stage_metrics"
+
+_metadata = MetaData()
+import_stage_metrics = Table(
+    STAGE_TABLE, _metadata,
+    Column("id", Integer, primary_key=True, autoincrement=True),
+    Column("run_id", String(32), index=True),      # 同一次运行的记录共用一个 run_id
+    Column("brand", String(255)),
+    Column("file_name", String(512)),
+    Column("stage", String(64)),
+    Column("rows_in", Integer),
+    Column("rows_out", Integer),
+    Column("seconds", Float),
+    Column("peak_mb", Float),                      # 该阶段内 Python/numpy 分配的峰值（tracemalloc）；未开启时为 NULL
+    Column("rss_peak_mb", Float),                  # 阶段结束时进程内存高水位，看哪个阶段把内存顶上去
+    Column("recorded_at", DateTime),
+)
+
+# 本进程的记录：[{brand, file_name, stage, rows_in, rows_out, seconds, peak_mb, rss_peak_mb, recorded_at}, ...]
+STAGE_STATS = []
+
+# 当前品牌 / 文件：由 stage_scope 设置，stage / run_stage 自动带上
+_SCOPE = {"brand": None, "file_name": None}
+
+
+def new_run_id():
+    return f"{datetime.now():%Y%m%d%H%M%S}_{os.getpid()}"
+
+
+@contextmanager
+def stage_scope(brand=None, file_name=None):
+    """在 with 块内记录的阶段都归到该品牌 / 文件（只传一个时另一个沿用外层）"""
+    saved = dict(_SCOPE)
+    if brand is not None:
+        _SCOPE["brand"] = brand
+    if file_name is not None:
+        _SCOPE["file_name"] = os.path.basename(file_name)
+    try:
+        yield
+    finally:
+        _SCOPE.update(saved)
+
+
+class _ProcessMemoryCounters(ctypes.Structure):
+    _fields_ = [
+        ("cb", ctypes.c_ulong), ("PageFaultCount", ctypes.c_ulong),
+        ("PeakWorkingSetSize", ctypes.c_size_t), ("WorkingSetSize", ctypes.c_size_t),
+        ("QuotaPeakPagedPoolUsage", ctypes.c_size_t), ("QuotaPagedPoolUsage", ctypes.c_size_t),
+        ("QuotaPeakNonPagedPoolUsage", ctypes.c_size_t), ("QuotaNonPagedPoolUsage", ctypes.c_size_t),
+        ("PagefileUsage", ctypes.c_size_t), ("PeakPagefileUsage", ctypes.c_size_t),
+    ]
+
+
+def rss_peak_mb():
+    """进程内存高水位（MB）：Unix 取 ru_maxrss，Windows 取 PeakWorkingSetSize；取不到返回 None"""
+    try:
+        import resource
+    except ImportError:
+        counters = _ProcessMemoryCounters()
+        counters.cb = ctypes.sizeof(counters)
+        try:
+            ok = ctypes.windll.psapi.GetProcessMemoryInfo(
+                ctypes.windll.kernel32.GetCurrentProcess(), ctypes.byref(counters), counters.cb
+            )
+        except (AttributeError, OSError):
+            return None
+        return counters.PeakWorkingSetSize / 1024 ** 2 if ok else None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak / 1024 ** 2 if sys.platform == "darwin" else peak / 1024  # macOS 单位是字节，Linux 是 KB
+
+
+def _rows(obj):
+    return len(obj) if isinstance(obj, (pd.DataFrame, pd.Series)) else None
+
+
+@contextmanager
+def stage(name, rows_in=None):
+    """
+    记录一个阶段；with 块内把产出行数写到 rec["rows_out"]。阶段不要嵌套（峰值内存按阶段重置）。
+        with stage("insert", len(df)) as rec:
+            rec["rows_out"] = upsert_via_staging(...)
+    """
+    rec = {**_SCOPE, "stage": name, "rows_in": rows_in, "rows_out": None, "peak_mb": None, "rss_peak_mb": None}
+    if not STAGE_METRICS_ENABLED:
+        yield rec
+        return
+    if STAGE_TRACE_MEMORY:
+        if not tracemalloc.is_tracing():
+            tracemalloc.start()
+        tracemalloc.reset_peak()
+        base = tracemalloc.get_traced_memory()[0]
+    t0 = time.perf_counter()
+    try:
+        yield rec
+    finally:
+        rec["seconds"] = time.perf_counter() - t0
+        if STAGE_TRACE_MEMORY:
+            rec["peak_mb"] = (tracemalloc.get_traced_memory()[1] - base) / 1024 ** 2
+        rec["rss_peak_mb"] = rss_peak_mb()
+        rec["recorded_at"] = datetime.now()
+        STAGE_STATS.append(rec)
+
+
+def run_stage(name, func, df, *args, **kwargs):
+    """df → df 的清洗步骤：计时并自动记录进出行数，返回 func 的结果"""
+    with stage(name, _rows(df)) as rec:
+        out = func(df, *args, **kwargs)
+        rec["rows_out"] = _rows(out)
+    return out
+
+
+def stage_summary(stats=None):
+    """按阶段汇总：次数、总耗时、占比、进出行数、最大峰值内存"""
+    stats = STAGE_STATS if stats is None else stats
+    if not stats:
+        return pd.DataFrame()
+    df = pd.DataFrame(stats)
+    summary = df.groupby("stage", sort=False).agg(
+        calls=("stage", "size"),
+        seconds=("seconds", "sum"),
+        rows_in=("rows_in", "sum"),
+        rows_out=("rows_out", "sum"),
+        peak_mb=("peak_mb", "max"),
+        rss_peak_mb=("rss_peak_mb", "max"),
+    )
+    summary["share"] = summary["seconds"] / summary["seconds"].sum()
+    # 没开 tracemalloc / 取不到进程内存时不显示对应列
+    summary = summary.dropna(axis=1, how="all")
+    return summary.sort_values("seconds", ascending=False)
+
+
+def print_stage_summary(stats=None):
+    summary = stage_summary(stats)
+    if summary.empty:
+        return
+    print(f"⏱️ 各阶段耗时（合计 {summary['seconds'].sum():.1f}s）：")
+    print(summary.to_string(formatters={
+        "seconds": "{:.2f}s".format,
+        "share": "{:.0%}".format,
+        "rows_in": "{:,.0f}".format,
+        "rows_out": "{:,.0f}".format,
+        "peak_mb": "{:.1f}MB".format,
+        "rss_peak_mb": "{:.0f}MB".format,
+    }))
+
+
+def init_stage_table(engine):
+    """建表（已存在则跳过）；MySQL / SQLite 通用"""
+    _metadata.create_all(engine, tables=[import_stage_metrics], checkfirst=True)
+
+
+def save_stage_metrics(engine, stats=None, run_id=None):
+    """一次批量写入本次运行的阶段记录；返回写入条数"""
+    stats = STAGE_STATS if stats is None else stats
+    if not stats:
+        return 0
+    run_id = run_id or new_run_id()
+    rows = [
+        {
+            "run_id": run_id,
+            "brand": rec["brand"],
+            "file_name": rec["file_name"],
+            "stage": rec["stage"],
+            "rows_in": rec["rows_in"],
+            "rows_out": rec["rows_out"],
+            "seconds": rec["seconds"],
+            "peak_mb": rec["peak_mb"],
+            "rss_peak_mb": rec["rss_peak_mb"],
+            "recorded_at": rec["recorded_at"],
+        }
+        for rec in stats
+    ]
+    with engine.begin() as conn:
+        conn.execute(insert(import_stage_metrics), rows)
+    return len(rows)
@@ -0,0 +1,134 @@
+# store_matcher.py —— 评价表门店名 → store_id：门店映射只归一化一次，去重后的门店名用 rapidfuzz.cdist 批量打分，
+# 结果按“门店映射版本”持久化到 review_store_match 表，之后的导入直接查字典
+import re
+import unicodedata
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+from rapidfuzz import process, fuzz
+from sqlalchemy import Column, DateTime, MetaData, String, Table, delete, insert, select
+
+from parse_cache import frame_fingerprint
+
+MATCH_CACHE_TABLE = "review_store_match"
+
+_metadata = MetaData()
+review_store_match = Table(
+    MATCH_CACHE_TABLE, _metadata,
+    Column("store_name", String(255), primary_key=True),   # 评价表里的原始门店名
+    Column("store_id", String(50)),                         # NULL = 该版本映射下模糊匹配也失败
+    Column("mapping_version", String(12)),                  # 门店映射指纹，映射一变旧结果作废
+    Column("matched_at", DateTime),
+)
+
+# ---------- 正则 & 工具 ----------
+RE_PAREN = re.compile(r"[（(].*?[)）]")
+RE_DOT   = re.compile(r"[·•・\.]")
+RE_SPACE = re.compile(r"\s+")
+
+def normalize_name(name: str) -> str:
+    if pd.isna(name):
+        return ""
+    name = unicodedata.normalize("NFKC", name)
+    name = RE_PAREN.sub(" ", name)
+    name = RE_DOT.sub(" ", name)
+    name = name.replace("店", " ")
+    return RE_SPACE.sub(" ", name).strip().lower()
+
+FUZZ_TOKEN_TH, FUZZ_PART_TH = 90, 85
+FUZZ_TOP_K = 3
+
+
+# ---------- 门店索引（每份映射只归一化一次） ----------
+_INDEXES = {}
+
+def stores_frame(store_mapping):
+    """store_mapping（推广门店 / 门店ID）→ 匹配用的 (store_name, store_id)"""
+    return store_mapping.rename(columns={
+        "推广门店": "store_name",
+        "门店ID":   "store_id"
+    })
+
+
+def mapping_version(stores_df):
+    """门店映射（store_name, store_id）的指纹，作为匹配缓存的版本号"""
+    return frame_fingerprint(stores_df[["store_name", "store_id"]].reset_index(drop=True))
+
+
+def build_store_index(stores_df):
+    """返回 (版本号, 归一化门店名列表, store_id 数组)；同一份映射在进程内只算一次"""
+    version = mapping_version(stores_df)
+    if version not in _INDEXES:
+        _INDEXES[version] = (
+            version,
+            [normalize_name(n) for n in stores_df["store_name"]],
+            stores_df["store_id"].to_numpy(dtype=object),
+        )
+    return _INDEXES[version]
+
+
+def match_store_names(names, stores_df, match_cache=None):
+    """
+    批量匹配：返回 {原始门店名: store_id 或 None}，结果与旧版逐个门店名 process.extract 取前 3 一致。
+    match_cache 为同一映射版本下已知的 {门店名: store_id}，命中的直接取；新算出的结果会写回 match_cache。
+    """
+    version, choices, store_ids = build_store_index(stores_df)
+    cache = match_cache if match_cache is not None else {}
+    result, pending = {}, []
+    for name in pd.unique(np.asarray(names, dtype=object)):
+        if name in cache:
+            result[name] = cache[name]
+        elif not name:
+            result[name] = None
+        else:
+            pending.append(name)
+
+    if pending and choices:
+        queries = [normalize_name(n) for n in pending]
+        scores = process.cdist(queries, choices, scorer=fuzz.token_sort_ratio, dtype=np.float64)
+        # 与 process.extract 相同的排序：分数从高到低，同分按映射里的先后
+        top = np.argsort(-scores, axis=1, kind="stable")[:, :FUZZ_TOP_K]
+        for i, (name, query) in enumerate(zip(pending, queries)):
+            result[name] = None
+            for j in top[i]:
+                if scores[i, j] >= FUZZ_TOKEN_TH or fuzz.partial_ratio(query, choices[j]) >= FUZZ_PART_TH:
+                    result[name] = store_ids[j]
+                    break
+    else:
+        result.update(dict.fromkeys(pending))
+
+    cache.update({n: result[n] for n in pending})
+    return result
+
+
+# ---------- 持久化 ----------
+def init_match_cache_table(engine):
+    """建表（已存在则跳过）；MySQL / SQLite 通用"""
+    _metadata.create_all(engine, tables=[review_store_match], checkfirst=True)
+
+
+def load_match_cache(engine, version):
+    """一次取回当前映射版本下的全部 {门店名: store_id}"""
+    with engine.connect() as conn:
+        rows = conn.execute(
+            select(review_store_match.c.store_name, review_store_match.c.store_id)
+            .where(review_store_match.c.mapping_version == version)
+        )
+        return {store_name: store_id for store_name, store_id in rows}
+
+
+def save_match_cache(engine, matches, version):
+    """按门店名覆盖写入（旧版本映射下的结果一并替换）；返回写入条数"""
+    if not matches:
+        return 0
+    now = datetime.now()
+    rows = [
+        {"store_name": name, "store_id": None if store_id is None else str(store_id),
+         "mapping_version": version, "matched_at": now}
+        for name, store_id in matches.items()
+    ]
+    with engine.begin() as conn:
+        conn.execute(delete(review_store_match).where(review_store_match.c.store_name.in_(list(matches))))
+        conn.execute(insert(review_store_match), rows)
+    return len(rows)
@@ -0,0 +1,245 @@
+# synthetic_exports.py —— 以仓库根目录的样本数据（运营 / 小时级推广 / 评价）和 字段结构_导出.csv 为模板，
+# 合成“美团后台导出”风格的 .xlsx：N 个品牌 × M 天，每个品牌一份运营表、一份推广报表、一份评价导出。
+# 运营 / 推广表带 find_header_row 要跳过的标题行，并混入 '/' 单元格、千分位数字和 '%' 百分比列，供基准测试与离线联调
+import argparse
+import os
+
+import numpy as np
+import pandas as pd
+from openpyxl import Workbook
+
+from column_mappings import COLUMN_MAPPING_CPC_HOURLY
+from rankings import RANKING_COLUMNS
+
+REPO_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), "..", ".."))
+FIELD_STRUCTURE_CSV = os.path.join(REPO_ROOT, "字段结构_导出.csv")
+OPERATION_SAMPLE = os.path.join(REPO_ROOT, "operation_data_样本数据.csv")
+CPC_HOURLY_SAMPLE = os.path.join(REPO_ROOT, "cpc_hourly_data_样本数据.csv")
+REVIEW_SAMPLE = os.path.join(REPO_ROOT, "review_data_样本数据.csv")
+
+# 运营表里不是指标的列；JSON 列由入库流程生成，导出里没有
+OPERATION_KEY_COLUMNS = ["日期", "美团门店ID", "门店名称", "城市"]
+OPERATION_JSON_COLUMNS = {"extra_metrics", "ros_score", "rankings_detail"}
+PERCENT_KEYWORDS = ("转化率", "占比")
+CITIES = ["上海", "杭州", "南京", "苏州"]
+DISTRICTS = ["长宁区", "闵行区", "徐汇区", "浦东新区", "静安区"]
+CPC_PLANS = ["低价引流", "品牌曝光"]
+CPC_PLATFORMS = ["美团", "点评"]
+CPC_HOUR_FILL = 0.6         # 每个计划每天约 60% 的时段有投放
+THOUSANDS_RATIO = 0.2       # ≥1000 的数值按千分位文本导出的比例
+NOT_APPLICABLE_SLASH = 0.3  # 样本里整列为空的渠道（如 -秒提）：导出时按该比例出现 '/'
+
+
+def load_templates():
+    """读字段结构与三份样本：{'fields': 字段结构 DataFrame, 'operation' / 'cpc' / 'review': 样本 DataFrame}"""
+    fields = pd.read_csv(FIELD_STRUCTURE_CSV, dtype=str, encoding="utf-8-sig").fillna("")
+    return {
+        "fields": fields,
+        "operation": pd.read_csv(OPERATION_SAMPLE, dtype=str, encoding="utf-8-sig"),
+        "cpc": pd.read_csv(CPC_HOURLY_SAMPLE, dtype=str, encoding="utf-8-sig"),
+        "review": pd.read_csv(REVIEW_SAMPLE, dtype=str, encoding="utf-8-sig"),
+    }
+
+
+def table_fields(templates, table):
+    """字段结构里某张表的 [(字段名, 类型), ...]，保持导出顺序"""
+    fields = templates["fields"]
+    fields = fields[fields["表名"] == table]
+    return list(zip(fields["字段名"], fields["类型"]))
+
+
+def _is_percent(name, type_):
+    return any(k in name for k in PERCENT_KEYWORDS) and (type_.startswith("float") or type_.startswith("varchar"))
+
+
+def _scale(sample, col, default):
+    """样本里该列数值的中位数作为量级（样本为空时用 default）"""
+    if col not in sample.columns:
+        return default
+    values = pd.to_numeric(sample[col].str.replace(",", "", regex=False), errors="coerce").dropna()
+    return float(values.median()) if len(values) and values.median() > 0 else default
+
+
+def _format_numbers(values, decimals, rng):
+    """数值 → 导出单元格：整数直接写数字，部分 ≥1000 的值写成千分位文本"""
+    out = np.round(values, decimals).astype(object) if decimals else values.astype(np.int64).astype(object)
+    big = np.flatnonzero((values >= 1000) & (rng.random(len(values)) < THOUSANDS_RATIO))
+    fmt = f"{{:,.{decimals}f}}"
+    for i in big:
+        out[i] = fmt.format(values[i])
+    return out
+
+
+def _with_slash(cells, ratio, rng):
+    cells = cells.copy()
+    cells[rng.random(len(cells)) < ratio] = "/"
+    return cells
+
+
+def build_store_mapping(brands, stores_per_brand, seed=0):
+    """store_mapping 表：每个品牌 stores_per_brand 家门店，门店 ID 按品牌错开；部分推广门店名与门店名称不同"""
+    rng = np.random.default_rng(seed)
+    rows = []
+    for b in range(brands):
+        for s in range(stores_per_brand):
+            store_id = str(10_000_000 + 1000 * b + s)
+            name = f"品牌{b:02d}·烧烤（{DISTRICTS[s % len(DISTRICTS)]}{s}号店）"
+            rows.append({
+                "门店ID": store_id,
+                "门店名称": name,
+                "推广门店": name if s % 3 else f"品牌{b:02d}（{s}号店）",
+                "门店所在城市": CITIES[rng.integers(len(CITIES))],
+                "美团门店ID": store_id,
+                "运营师": "bench",
+                "品牌": f"品牌{b:02d}",
+            })
+    return pd.DataFrame(rows)
+
+
+def synth_operation_export(stores, dates, templates, rng, slash_ratio=0.002):
+    """
+    运营表：字段结构里 operation_data 的全部导出列（日期为 YYYY-MM-DD）+ 榜单排名列 + ROS分。
+    整数 / 金额按样本量级随机，百分比列写成 '12.34%'，样本整列为空的渠道列大量出现 '/'，其余指标零星出现 '/'
+    """
+    sample = templates["operation"]
+    n = len(stores) * len(dates)
+    df = pd.DataFrame({
+        "日期": np.repeat(dates.strftime("%Y-%m-%d"), len(stores)),
+        "美团门店ID": np.tile(stores["美团门店ID"].to_numpy(), len(dates)),
+        "门店名称": np.tile(stores["门店名称"].to_numpy(), len(dates)),
+        "城市": np.tile(stores["门店所在城市"].to_numpy(), len(dates)),
+    })
+    store_factor = np.tile(rng.uniform(0.3, 2.0, len(stores)), len(dates))
+    metrics = {}
+    for name, type_ in table_fields(templates, "operation_data"):
+        if name in OPERATION_KEY_COLUMNS or name in OPERATION_JSON_COLUMNS:
+            continue
+        if _is_percent(name, type_):
+            metrics[name] = np.char.add(np.round(rng.uniform(0, 40, n), 2).astype(str), "%").astype(object)
+            continue
+        decimals = 0 if type_.startswith("int") else 2
+        scale = _scale(sample, name, 50.0)
+        values = rng.gamma(2.0, scale / 2.0, n) * store_factor
+        cells = _format_numbers(values, decimals, rng)
+        if name in sample.columns and sample[name].isna().all():
+            metrics[name] = _with_slash(cells, NOT_APPLICABLE_SLASH, rng)
+        else:
+            metrics[name] = _with_slash(cells, slash_ratio, rng)
+    for i, col in enumerate(RANKING_COLUMNS):
+        ranks = rng.integers(1, 200, (3, n))
+        cells = np.array([
+            f"{city}第{a}名|{district}第{b}名|{district[:2]}商圈第{c}名"
+            for city, district, a, b, c in zip(df["城市"], np.resize(DISTRICTS, n), *ranks)
+        ], dtype=object)
+        cells[rng.random(n) < 0.3 + 0.05 * i] = None  # 越靠后的榜单上榜门店越少
+        metrics[col] = cells
+    metrics["ROS分"] = rng.integers(40, 100, n)
+    return pd.concat([df, pd.DataFrame(metrics)], axis=1)
+
+
+def synth_cpc_export(stores, dates, templates, rng):
+    """
+    小时级推广报表：中文表头（COLUMN_MAPPING_CPC_HOURLY 的键，不含门店ID / 起始时间，由清洗流程按推广门店匹配、生成），
+    日期为 'MM-DD'，另有导出自带的 '点击率' 百分比列；无点击时点击均价为 '/'
+    """
+    sample = templates["cpc"]
+    rows = pd.MultiIndex.from_product(
+        [range(len(dates)), range(len(stores)), CPC_PLANS, CPC_PLATFORMS, range(24)],
+        names=["d", "s", "推广名称", "平台", "h"],
+    ).to_frame(index=False)
+    rows = rows[rng.random(len(rows)) < CPC_HOUR_FILL].reset_index(drop=True)
+    n = len(rows)
+    hour = rows["h"].to_numpy()
+    df = pd.DataFrame({
+        "日期": dates.strftime("%m-%d").to_numpy()[rows["d"]],
+        "时段": [f"{h:02d}:00~{h + 1:02d}:00" for h in hour],
+        "推广门店": stores["推广门店"].to_numpy()[rows["s"]],
+        "门店所在城市": stores["门店所在城市"].to_numpy()[rows["s"]],
+        "推广名称": rows["推广名称"].to_numpy(),
+        "平台": rows["平台"].to_numpy(),
+    })
+    impressions = rng.poisson(_scale(sample, "impressions", 200), n)
+    clicks = rng.binomial(impressions, 0.015)
+    cost = np.round(clicks * rng.uniform(0.8, 1.6, n), 2)
+    df["花费（元）"] = cost
+    df["现金花费（元）"] = cost
+    df["曝光（次）"] = impressions
+    df["点击（次）"] = clicks
+    avg_cpc = np.round(np.divide(cost, clicks, out=np.zeros(n), where=clicks > 0), 2).astype(object)
+    avg_cpc[clicks == 0] = "/"
+    df["点击均价（元）"] = avg_cpc
+    df["点击率"] = [f"{r:.2%}" for r in np.divide(clicks, impressions, out=np.zeros(n), where=impressions > 0)]
+    skip = {"date", "start_time", "time_slot", "cost", "cash_spent", "impressions", "clicks", "avg_cpc",
+            "store_name", "store_id", "store_city", "promotion_name", "platform"}
+    for cn, en in COLUMN_MAPPING_CPC_HOURLY.items():
+        if en not in skip:
+            df[cn] = rng.binomial(clicks, min(0.9, _scale(sample, en, 0.5) / 5 + 0.05))
+    return df
+
+
+def synth_review_export(stores, dates, rows, templates, rng):
+    """评价导出（第一行即表头）：评分 / 评价 / 门店 / 评价时间，部分门店名写法与映射表不同，触发模糊匹配"""
+    texts = templates["review"]["review_text"].dropna().to_numpy()
+    names = stores["门店名称"].to_numpy()
+    picked = names[rng.integers(len(names), size=rows)].astype(object)
+    variant = rng.random(rows) < 0.2
+    picked[variant] = [s.replace("（", "(").replace("）", ")") for s in picked[variant]]
+    return pd.DataFrame({
+        "评分": rng.choice(["1", "2", "3", "4", "4.5", "5"], rows, p=[0.05, 0.05, 0.1, 0.3, 0.2, 0.3]),
+        "评价": [f"{texts[i % len(texts)]} #{i}" for i in range(rows)],
+        "门店": picked,
+        "评价时间": dates.strftime("%Y-%m-%d").to_numpy()[rng.integers(len(dates), size=rows)],
+    })
+
+
+def write_xlsx(df, path, title_rows=()):
+    """write_only 模式写 xlsx：先写标题行，再写表头和数据；NaN / None 写成空单元格"""
+    wb = Workbook(write_only=True)
+    ws = wb.create_sheet()
+    for title in title_rows:
+        ws.append([title])
+    ws.append(list(df.columns))
+    for row in df.astype(object).where(df.notna(), None).itertuples(index=False, name=None):
+        ws.append(row)
+    wb.save(path)
+
+
+def generate_exports(root, brands, days, stores_per_brand=5, reviews_per_brand=500, start="2025-05-01", seed=0):
+    """
+    在 root 下生成 品牌XX/ 目录，每个目录一份运营表、一份推广报表（文件名带起止日期）、一份评价导出；
+    返回 store_mapping DataFrame（写入数据库后即可跑完整导入）
+    """
+    templates = load_templates()
+    store_mapping = build_store_mapping(brands, stores_per_brand, seed)
+    dates = pd.date_range(start, periods=days)
+    period = f"{dates[0]:%Y%m%d}_{dates[-1]:%Y%m%d}"
+    for b in range(brands):
+        rng = np.random.default_rng([seed, b])
+        brand = f"品牌{b:02d}"
+        stores = store_mapping[store_mapping["品牌"] == brand].reset_index(drop=True)
+        brand_dir = os.path.join(root, brand)
+        os.makedirs(brand_dir, exist_ok=True)
+        titles = (f"{brand} 数据导出", f"统计周期：{dates[0]:%Y-%m-%d} 至 {dates[-1]:%Y-%m-%d}")
+        write_xlsx(synth_operation_export(stores, dates, templates, rng),
+                   os.path.join(brand_dir, f"运营数据_{brand}.xlsx"), titles)
+        write_xlsx(synth_cpc_export(stores, dates, templates, rng),
+                   os.path.join(brand_dir, f"推广报表_{period}_{brand}.xlsx"), titles)
+        if reviews_per_brand:
+            write_xlsx(synth_review_export(stores, dates, reviews_per_brand, templates, rng),
+                       os.path.join(brand_dir, f"评价导出_{brand}.xlsx"))
+    return store_mapping.drop(columns=["品牌"])
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="按样本数据合成美团后台导出 .xlsx")
+    parser.add_argument("out", help="输出目录")
+    parser.add_argument("--brands", type=int, default=4)
+    parser.add_argument("--days", type=int, default=30)
+    parser.add_argument("--stores", type=int, default=5, help="每个品牌的门店数")
+    parser.add_argument("--reviews", type=int, default=500, help="每个品牌的评价条数（0 = 不生成评价导出）")
+    parser.add_argument("--start", default="2025-05-01")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+    mapping = generate_exports(args.out, args.brands, args.days, args.stores, args.reviews, args.start, args.seed)
+    mapping.to_csv(os.path.join(args.out, "store_mapping.csv"), index=False, encoding="utf-8-sig")
+    print(f"✅ 已生成 {args.brands} 个品牌 × {args.days} 天的导出，门店映射写入 {os.path.join(args.out, 'store_mapping.csv')}")
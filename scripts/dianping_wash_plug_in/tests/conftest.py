@@ -0,0 +1,139 @@
+# conftest.py —— 清洗插件测试的共用夹具：插件目录按脚本方式平铺导入，
+# 清洗缓存 / 表结构缓存落到每个用例自己的临时目录，合成数据的构造函数在这里统一提供
+import os
+import sys
+
+import numpy as np
+import pandas as pd
+import pytest
+
+PLUGIN_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+sys.path.insert(0, PLUGIN_DIR)
+
+import database_importer  # noqa: E402
+import parse_cache  # noqa: E402
+import schema_registry  # noqa: E402
+from column_mappings import COLUMN_MAPPING_CPC_HOURLY  # noqa: E402
+from data_cleaning import clear_percentage_cache  # noqa: E402
+from synthetic_exports import generate_exports  # noqa: E402
+
+REPO_ROOT = os.path.abspath(os.path.join(PLUGIN_DIR, "..", ".."))
+OPERATION_SAMPLE = os.path.join(REPO_ROOT, "operation_data_样本数据.csv")
+CPC_HOURLY_SAMPLE = os.path.join(REPO_ROOT, "cpc_hourly_data_样本数据.csv")
+STORE_MAPPING_SAMPLE = os.path.join(REPO_ROOT, "store_mapping_样本数据.csv")
+
+
+@pytest.fixture(autouse=True)
+def isolated_caches(tmp_path, monkeypatch):
+    """清洗缓存、表结构缓存不碰插件目录里的真实文件；用例结束后释放连接池，临时库文件才能删掉"""
+    monkeypatch.setattr(parse_cache, "PARSE_CACHE_DIR", str(tmp_path / ".parse_cache"))
+    monkeypatch.setattr(schema_registry, "SCHEMA_CACHE_PATH", str(tmp_path / ".schema_cache.json"))
+    monkeypatch.setattr(schema_registry, "_SCHEMAS", {})
+    clear_percentage_cache()
+    yield
+    for engine in database_importer._ENGINES.values():
+        engine.dispose()
+    database_importer._ENGINES.clear()
+
+
+@pytest.fixture(scope="session")
+def repo_root():
+    """仓库根目录（各 *_样本数据.csv 所在处）"""
+    return REPO_ROOT
+
+
+@pytest.fixture
+def db(tmp_path):
+    """临时 SQLite 库的连接串"""
+    return f"sqlite:///{tmp_path / 'test.db'}"
+
+
+@pytest.fixture(scope="session")
+def store_mapping():
+    """仓库根目录的样本门店映射（推广门店 / 门店ID / 美团门店ID …）"""
+    return pd.read_csv(STORE_MAPPING_SAMPLE, dtype=str, encoding="utf-8-sig")
+
+
+@pytest.fixture(scope="session")
+def operation_columns():
+    """样本运营表的全部列名（parse_brand 按它对齐 operation_data）"""
+    return pd.read_csv(OPERATION_SAMPLE, nrows=0, encoding="utf-8-sig").columns.tolist()
+
+
+def build_operation_frame(rows, n_cols, seed=0):
+    """按样本表头合成全字符串的运营数据：千分位、'/'、空值、少量文本混杂"""
+    rng = np.random.default_rng(seed)
+    header = pd.read_csv(OPERATION_SAMPLE, nrows=0).columns.tolist()
+    metrics = [c for c in header if c not in ('日期', '美团门店ID', '门店名称', '城市')][:n_cols]
+    stores = np.array([f"门店{i:03d}" for i in range(200)], dtype=object)
+    data = {
+        "日期": np.full(rows, "2025-05-01", dtype=object),
+        "美团门店ID": rng.choice(stores, rows),
+    }
+    for i, col in enumerate(metrics):
+        # 人数/次数类是小整数（大量 0），金额类保留两位小数、偶尔带千分位
+        counts = rng.poisson(rng.uniform(0.5, 300), rows)
+        if i % 3 == 0:
+            vals = np.char.mod("%.2f", counts * 1.5).astype(object)
+        else:
+            vals = counts.astype(str).astype(object)
+        big = rng.random(rows) < 0.01
+        vals[big] = [f"{int(v):,}" for v in rng.integers(1000, 10 ** 6, big.sum())]
+        vals[rng.random(rows) < 0.002] = "/"
+        vals[rng.random(rows) < 0.01] = np.nan
+        if i % 25 == 0:
+            vals[rng.random(rows) < 0.001] = "--"
+        data[col] = vals
+    return pd.DataFrame(data)
+
+
+@pytest.fixture
+def make_operation_frame():
+    return build_operation_frame
+
+
+def write_export(df, path):
+    """模拟美团后台导出：前两行标题，第三行表头"""
+    with pd.ExcelWriter(path, engine="openpyxl") as writer:
+        pd.DataFrame([["数据导出"], ["统计周期：样本"]]).to_excel(writer, index=False, header=False)
+        df.to_excel(writer, index=False, startrow=2)
+
+
+def build_brand_folders(root, brands, days):
+    """每个品牌 days 天的运营数据 + 小时级推广报表（样本数据按天复制），门店 ID 按品牌错开"""
+    op_sample = pd.read_csv(OPERATION_SAMPLE, dtype=str, encoding="utf-8-sig")
+    cpc_sample = pd.read_csv(CPC_HOURLY_SAMPLE, dtype=str, encoding="utf-8-sig")
+    cpc_sample = cpc_sample.rename(columns={v: k for k, v in COLUMN_MAPPING_CPC_HOURLY.items()})
+    cpc_sample = cpc_sample.drop(columns=["起始时间", "plan_key"], errors="ignore")
+    dates = pd.date_range("2025-05-01", periods=days)
+
+    jobs = []
+    for b in range(brands):
+        brand_dir = os.path.join(root, f"品牌{b:02d}")
+        os.makedirs(brand_dir)
+
+        op = pd.concat([op_sample.assign(日期=d.strftime("%Y-%m-%d")) for d in dates], ignore_index=True)
+        op["美团门店ID"] = (op.groupby("日期").cumcount() + 1000 * (b + 1)).astype(str)
+        write_export(op, os.path.join(brand_dir, f"运营数据_{b:02d}.xlsx"))
+
+        cpc = pd.concat([cpc_sample.assign(日期=d.strftime("%m-%d")) for d in dates], ignore_index=True)
+        cpc["门店ID"] = str(2000 * (b + 1))
+        write_export(cpc, os.path.join(
+            brand_dir, f"推广报表_{dates[0]:%Y%m%d}_{dates[-1]:%Y%m%d}_{b:02d}.xlsx"
+        ))
+        jobs.append((f"品牌{b:02d}", brand_dir))
+    return jobs
+
+
+@pytest.fixture
+def brand_folders(tmp_path):
+    """tmp_path/exports 下 2 个品牌 × 3 天的样本导出，返回 [(品牌, 目录), ...]"""
+    return build_brand_folders(str(tmp_path / "exports"), brands=2, days=3)
+
+
+@pytest.fixture(scope="session")
+def synthetic_exports(tmp_path_factory):
+    """synthetic_exports 合成的 2 个品牌 × 3 天 × 3 店导出（带标题行、'/'、千分位、百分比列），返回 (目录, 门店映射)"""
+    root = str(tmp_path_factory.mktemp("synthetic"))
+    store_mapping = generate_exports(root, brands=2, days=3, stores_per_brand=3, reviews_per_brand=100)
+    return root, store_mapping
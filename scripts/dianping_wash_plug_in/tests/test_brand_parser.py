@@ -0,0 +1,147 @@
+# 品牌目录解析：批量补全日期、进程池并行、清洗缓存命中、dtype 压缩、阶段埋点都不能改变清洗结果
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+import brand_parser
+import parse_cache
+import stage_metrics
+from brand_parser import SOURCE_FILE_COL, clean_cpc_batch, clean_cpc_file, clean_operation_file, is_cpc_file, parse_brand
+from data_cleaning import clear_percentage_cache
+from database_importer import get_dtype_for_cpc_hourly, get_dtype_for_operation, get_engine, import_to_mysql
+from parse_cache import cached_clean
+from stage_metrics import STAGE_STATS, init_stage_table, save_stage_metrics, stage, stage_scope
+from synthetic_exports import build_store_mapping, load_templates, synth_cpc_export, write_xlsx
+
+
+def write_cpc_exports(root, weeks, seed=0):
+    """
+    从 2024-12-16 起 weeks 份推广周报 xlsx（跨年），每份末尾带导出自带的合计行：
+    日期为 '合计'、时段为空、点击均价为 '—'、花费带 '%'（这些值只有在日期补全去掉合计行之后清洗，
+    去百分比列 / 数值清洗的结果才与逐文件一致），外加一行非法日期 '13-45'
+    """
+    rng = np.random.default_rng(seed)
+    templates = load_templates()
+    stores = build_store_mapping(1, 2, seed)
+    files = []
+    for start in pd.date_range("2024-12-16", periods=weeks, freq="7D"):
+        dates = pd.date_range(start, periods=7)
+        df = synth_cpc_export(stores, dates, templates, rng)
+        total = df.iloc[[0]].assign(日期="合计", 时段=None)
+        total["点击均价（元）"] = "—"
+        total["花费（元）"] = "100%"
+        bad = df.iloc[[1]].assign(日期="13-45")
+        fp = os.path.join(root, f"推广报表_{dates[0]:%Y%m%d}_{dates[-1]:%Y%m%d}_品牌00.xlsx")
+        write_xlsx(pd.concat([df, bad, total], ignore_index=True), fp, ("推广报表",))
+        files.append((fp, None))
+    return files, stores.drop(columns=["品牌"])
+
+
+def test_clean_cpc_batch_matches_per_file(tmp_path, capsys):
+    """合并后一次补全日期的 clean_cpc_batch 与逐个 clean_cpc_file 的列、类型、取值完全一致"""
+    files, store_mapping = write_cpc_exports(str(tmp_path), weeks=3)
+    per_file = pd.concat([clean_cpc_file(fp, store_mapping) for fp, _ in files], ignore_index=True)
+    clear_percentage_cache()
+    batch = clean_cpc_batch(files, store_mapping)
+    assert set(batch[SOURCE_FILE_COL]) == {os.path.basename(fp) for fp, _ in files}
+    pd.testing.assert_frame_equal(per_file, batch.drop(columns=SOURCE_FILE_COL))
+    assert not batch["日期"].isin(["合计", "13-45"]).any()
+
+
+def parse_all(jobs, store_mapping, op_cols):
+    return [parse_brand(brand, d, store_mapping, op_cols) for brand, d in jobs]
+
+
+def assert_same_parse(expected, actual):
+    for a, b in zip(expected, actual):
+        assert a["error"] is None and b["error"] is None, (a["error"], b["error"])
+        pd.testing.assert_frame_equal(a["cpc"], b["cpc"])
+        pd.testing.assert_frame_equal(a["op"], b["op"])
+
+
+def test_parallel_matches_serial(brand_folders, store_mapping, operation_columns, capsys):
+    serial = parse_all(brand_folders, store_mapping, operation_columns)
+    with ProcessPoolExecutor(max_workers=2) as pool:
+        futures = [pool.submit(parse_brand, brand, d, store_mapping, operation_columns) for brand, d in brand_folders]
+        pooled = [f.result() for f in futures]
+    assert_same_parse(serial, pooled)
+
+
+def test_parse_cache_hit_matches_fresh(brand_folders, store_mapping, capsys, monkeypatch):
+    monkeypatch.setattr(parse_cache, "CACHE_STATS", {"hit": 0, "miss": 0})
+    files = [os.path.join(d, f) for _, d in brand_folders for f in sorted(os.listdir(d))]
+
+    def clean(fp):
+        if is_cpc_file(os.path.basename(fp)):
+            return cached_clean(fp, "cpc", lambda p: clean_cpc_file(p, store_mapping))
+        return cached_clean(fp, "operation", clean_operation_file)
+
+    fresh = [clean(fp) for fp in files]
+    cached = [clean(fp) for fp in files]
+    for a, b in zip(fresh, cached):
+        pd.testing.assert_frame_equal(a, b)
+    assert parse_cache.CACHE_STATS == {"hit": len(files), "miss": len(files)}
+
+
+def assert_same_values(plain, compact):
+    """压缩前后逐列比较：整型/文本必须完全一致，float32 列按单精度相对误差比较"""
+    assert list(plain.columns) == list(compact.columns)
+    for col in plain.columns:
+        a, b = plain[col], compact[col]
+        if b.dtype == np.float32:
+            np.testing.assert_allclose(a.to_numpy(float), b.to_numpy(float), rtol=1e-6, equal_nan=True, err_msg=col)
+        else:
+            pd.testing.assert_series_equal(a, b.astype(a.dtype), check_names=False, obj=col)
+
+
+def test_compact_dtypes_keep_values(brand_folders, store_mapping, operation_columns, db, capsys, monkeypatch):
+    """压缩 dtype 前后取值一致，写进 SQLite 再读回也一致，且确实省了内存"""
+    monkeypatch.setattr(brand_parser, "COMPACT_DTYPES", False)
+    plain = parse_all(brand_folders, store_mapping, operation_columns)
+    monkeypatch.setattr(brand_parser, "COMPACT_DTYPES", True)
+    compact = parse_all(brand_folders, store_mapping, operation_columns)
+
+    for p, c in zip(plain, compact):
+        for key, dtype_fn, table in (("cpc", get_dtype_for_cpc_hourly, "cpc_hourly_data"),
+                                     ("op", get_dtype_for_operation, "operation_data")):
+            assert_same_values(p[key], c[key])
+            import_to_mysql(p[key], table, db, dtype=dtype_fn(p[key]), if_exists="replace")
+            back_plain = pd.read_sql(f'SELECT * FROM "{table}"', get_engine(db))
+            import_to_mysql(c[key], table, db, dtype=dtype_fn(c[key]), if_exists="replace")
+            back_compact = pd.read_sql(f'SELECT * FROM "{table}"', get_engine(db))
+            pd.testing.assert_frame_equal(back_plain, back_compact, rtol=1e-6)
+            assert c[key].memory_usage(deep=True).sum() < p[key].memory_usage(deep=True).sum()
+
+
+def test_stage_metrics_do_not_change_results(brand_folders, store_mapping, operation_columns, db, capsys, monkeypatch):
+    """关闭埋点 / 只计时 / 计时 + tracemalloc 三种模式结果一致；记录带品牌与文件名，能写入 import_stage_metrics"""
+    monkeypatch.setattr(parse_cache, "PARSE_CACHE_ENABLED", False)  # 三轮都真正解析 xlsx
+    runs = {}
+    for label, enabled, trace in (("off", False, False), ("timing", True, False), ("memory", True, True)):
+        monkeypatch.setattr(stage_metrics, "STAGE_METRICS_ENABLED", enabled)
+        monkeypatch.setattr(stage_metrics, "STAGE_TRACE_MEMORY", trace)
+        start = len(STAGE_STATS)
+        parsed = []
+        for brand, brand_dir in brand_folders:
+            with stage_scope(brand=brand):
+                parsed.append(parse_brand(brand, brand_dir, store_mapping, operation_columns))
+                with stage("merge", 0):
+                    pass
+        runs[label] = (parsed, STAGE_STATS[start:])
+    del STAGE_STATS[:]
+
+    for label in ("timing", "memory"):
+        assert_same_parse(runs["off"][0], runs[label][0])
+    stats, traced = runs["timing"][1], runs["memory"][1]
+    assert not runs["off"][1] and len(stats) == len(traced)
+    assert all(rec["peak_mb"] is not None for rec in traced)
+    assert all(rec["brand"] for rec in stats)
+    assert {rec["stage"] for rec in stats if rec["file_name"]} >= {"read_excel", "numeric_clean", "cpc_dates"}
+
+    engine = get_engine(db)
+    init_stage_table(engine)
+    assert save_stage_metrics(engine, stats) == len(stats)
+    saved = pd.read_sql("SELECT brand, COUNT(DISTINCT file_name) AS files FROM import_stage_metrics GROUP BY brand", engine)
+    assert saved["brand"].tolist() == [brand for brand, _ in brand_folders]
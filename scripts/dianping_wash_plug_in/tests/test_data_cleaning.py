@@ -0,0 +1,129 @@
+# 向量化清洗函数与旧版逐行 / 逐单元格实现的输出必须完全一致
+import os
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from bench_legacy import legacy_add_datetime_column, legacy_clean_numeric_columns, legacy_process_cpc_dates
+from data_cleaning import (
+    add_datetime_column, clean_numeric_columns, clean_operation_data, clear_percentage_cache, drop_percentage_columns,
+    process_cpc_dates,
+)
+from date_completion import complete_export_dates
+from excel_header_finder import clean_and_load_excel
+
+
+def run_both(df, capsys, **kw):
+    """新旧 clean_numeric_columns 各跑一份拷贝，返回 (旧输出, 旧告警, 新输出, 新告警)"""
+    old = legacy_clean_numeric_columns(df.copy(), **kw)
+    log_old = capsys.readouterr().out
+    new = clean_numeric_columns(df.copy(), **kw)
+    log_new = capsys.readouterr().out
+    return old, log_old, new, log_new
+
+
+def test_clean_numeric_matches_legacy(make_operation_frame, capsys):
+    df = make_operation_frame(3000, 30)
+    old, log_old, new, log_new = run_both(df, capsys, key_col="美团门店ID")
+    pd.testing.assert_frame_equal(old, new, check_exact=True)
+    assert log_old == log_new and "•" in log_new
+
+
+def test_clean_numeric_matches_legacy_on_exports(synthetic_exports, capsys):
+    """真实导出形状：运营表是宽表（几百列 × 少量行，按块拼接），推广报表是窄长表（逐列处理）"""
+    root, _ = synthetic_exports
+    brand_dir = os.path.join(root, "品牌00")
+    for name in sorted(os.listdir(brand_dir)):
+        if name.startswith("评价"):
+            continue
+        df = clean_and_load_excel(os.path.join(brand_dir, name))
+        if name.startswith("运营数据"):
+            df = clean_operation_data(df)
+        df = drop_percentage_columns(df, use_cache=False)
+        capsys.readouterr()
+        old, log_old, new, log_new = run_both(df, capsys)
+        pd.testing.assert_frame_equal(old, new, check_exact=True, obj=name)
+        assert log_old == log_new
+    clear_percentage_cache()
+
+
+def test_clean_numeric_odd_cells(capsys):
+    """None、数字 / 布尔对象、全空列、inf 与文本混杂时，取值和 Python 类型都与旧版一致；report 按列计数"""
+    df = pd.DataFrame({
+        "门店名称": ["a", "b", "c", "d", "e"],
+        "x": ["1,000", " 2 ", "/", None, np.nan],
+        "y": [1, "1.0", True, "abc", "/"],
+        "z": [np.nan] * 5,
+        "w": ["--", "n/a", "nan", "inf", "1e400"],
+        "v": ["1", "2", "3", "4", "5"],
+    })
+    old, log_old, new, log_new = run_both(df, capsys, key_col="门店名称")
+    pd.testing.assert_frame_equal(old, new, check_exact=True)
+    for col in df.columns:
+        assert [type(v) for v in old[col]] == [type(v) for v in new[col]], col
+    assert log_old == log_new
+
+    report = {}
+    clean_numeric_columns(df.copy(), report=report)
+    assert report["x"] == {"slash": 1, "text": 1}
+    assert report["y"] == {"slash": 1, "text": 2}
+    assert report["v"] == {"slash": 0, "text": 0}
+
+
+def build_hourly_frame(plans, days, seed=0):
+    """plans 个推广计划 × days 天 × 24 小时，日期已补全年份（process_cpc_dates 之后的形态），混入少量脏时段"""
+    rng = np.random.default_rng(seed)
+    dates = pd.date_range("2025-05-01", periods=days).strftime("%Y-%m-%d")
+    slots = [f"{h:02d}:00~{(h + 1) % 24:02d}:00" for h in range(24)]
+    idx = pd.MultiIndex.from_product([range(plans), dates, slots], names=["推广名称", "日期", "时段"])
+    df = idx.to_frame(index=False)
+    df["推广名称"] = "计划" + df["推广名称"].astype(str)
+    df["时段"] = df["时段"].astype(object)
+    n = len(df)
+    df.loc[rng.random(n) < 0.01, "时段"] = np.nan
+    df.loc[rng.random(n) < 0.01, "时段"] = "全天"
+    df.loc[rng.random(n) < 0.01, "时段"] = " 09:00 ~10:00"
+    df.loc[rng.random(n) < 0.01, "日期"] = np.nan
+    df["花费"] = rng.gamma(2.0, 2.0, n).round(2)
+    return df
+
+
+def test_add_datetime_matches_legacy():
+    df = build_hourly_frame(plans=5, days=7)
+    old = legacy_add_datetime_column(df.copy())
+    new = add_datetime_column(df.copy())
+    pd.testing.assert_frame_equal(old, new)
+    assert new["起始时间"].isna().any()
+
+
+def build_weekly_exports(weeks, rows_per_day, seed=0):
+    """从 2024-12-02 起 weeks 份周报，每份 7 天 × rows_per_day 行，日期为 "MM-DD"，混入少量非法取值"""
+    rng = np.random.default_rng(seed)
+    exports = []
+    for w, start in enumerate(pd.date_range("2024-12-02", periods=weeks, freq="7D")):
+        days = pd.date_range(start, periods=7)
+        fname = f"推广报表_{days[0]:%Y%m%d}_{days[-1]:%Y%m%d}_{w:02d}.xlsx"
+        col = np.repeat(days.strftime("%m-%d").to_numpy(dtype=object), rows_per_day)
+        col[rng.random(len(col)) < 0.01] = np.nan
+        col[rng.random(len(col)) < 0.01] = "合计"
+        col[rng.random(len(col)) < 0.01] = " 1-05"
+        exports.append((fname, pd.DataFrame({"日期": col, "花费": rng.gamma(2.0, 2.0, len(col)).round(2)})))
+    return exports
+
+
+def test_process_cpc_dates_matches_legacy():
+    """跨年周报（12-xx / 01-xx）：逐文件补全、合并后按来源文件一次补全，都与旧版一致"""
+    exports = build_weekly_exports(weeks=8, rows_per_day=50)
+    old = pd.concat([legacy_process_cpc_dates(df.copy(), f) for f, df in exports], ignore_index=True)
+    new = pd.concat([process_cpc_dates(df.copy(), f) for f, df in exports], ignore_index=True)
+    merged = pd.concat([df.assign(来源文件=f) for f, df in exports], ignore_index=True)
+    batch = complete_export_dates(merged, "来源文件").drop(columns="来源文件").reset_index(drop=True)
+    pd.testing.assert_frame_equal(old, new)
+    pd.testing.assert_frame_equal(old, batch)
+    assert {"2024-12-31", "2025-01-01"} <= set(new["日期"])
+
+
+def test_process_cpc_dates_rejects_undated_filename():
+    with pytest.raises(ValueError):
+        process_cpc_dates(pd.DataFrame({"日期": ["05-01"]}), "推广报表.xlsx")
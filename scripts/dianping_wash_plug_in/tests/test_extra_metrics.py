@@ -0,0 +1,24 @@
+# 按列打包 pack_extra_metrics 与逐行 to_dict + json.dumps 的输出逐字节一致
+import numpy as np
+import pandas as pd
+
+from bench_legacy import legacy_pack_extra_metrics
+from data_cleaning import clean_numeric_columns
+from extra_metrics import pack_extra_metrics
+
+
+def test_pack_matches_legacy(make_operation_frame, capsys):
+    df = clean_numeric_columns(make_operation_frame(2000, 40), key_col="美团门店ID")
+    dynamic_df = df.drop(columns=["日期", "美团门店ID"])
+    assert list(pack_extra_metrics(dynamic_df)) == legacy_pack_extra_metrics(dynamic_df)
+
+
+def test_pack_mixed_types_matches_legacy():
+    """整数 / 浮点 / 文本 / 空值 / 非 ASCII 列名混在一起时也与旧版一致"""
+    dynamic_df = pd.DataFrame({
+        "新客数": pd.array([1, None, 3], dtype="Int64"),
+        "转化率": [0.5, np.nan, 1e-7],
+        "备注": ["--", None, "引号\"与换行\n"],
+        "布尔": [True, False, True],
+    })
+    assert list(pack_extra_metrics(dynamic_df)) == legacy_pack_extra_metrics(dynamic_df)
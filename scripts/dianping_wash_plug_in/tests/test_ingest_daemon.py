@@ -0,0 +1,188 @@
+# 下载目录监听入库：边下载边落盘的导出逐个识别、入库并归档；重投按 manifest 跳过；
+# 断连时文件留在原处等恢复，缺列等永久错误、重试次数用完的进 _failed
+import os
+import threading
+import time
+
+import numpy as np
+import pandas as pd
+import pytest
+from sqlalchemy.exc import OperationalError
+
+import ingest_daemon
+from database_importer import get_dtype_for_operation, get_engine
+
+# 驱动层异常：pymysql 断连（错误码 2013，可重试）/ SQLite 缺列（永久错误）
+LOST_CONNECTION = OperationalError("INSERT ...", {}, Exception(2013, "Lost connection to MySQL server during query"))
+NO_SUCH_COLUMN = OperationalError("INSERT ...", {}, Exception("no such column: 商品名称"))
+DEBOUNCE = 0.4
+
+
+def write_review_export(path, repo_root, store_mapping, rows, seed=0):
+    """评价导出：第一行即表头（评分 / 评价 / 门店 / 评价时间）"""
+    rng = np.random.default_rng(seed)
+    sample = pd.read_csv(os.path.join(repo_root, "review_data_样本数据.csv"), dtype=str, encoding="utf-8-sig")
+    pd.DataFrame({
+        "评分": rng.choice(["1", "3", "4", "5"], rows),
+        "评价": [f"{sample['review_text'].iloc[i % len(sample)]} #{i}" for i in range(rows)],
+        "门店": rng.choice(store_mapping["推广门店"].to_numpy(), rows),
+        "评价时间": (pd.Timestamp("2025-05-01") + pd.to_timedelta(rng.integers(0, 30, rows), unit="D")).strftime("%Y-%m-%d"),
+    }).to_excel(path, index=False)
+
+
+def write_product_export(path, days, products, seed=0):
+    """商品日明细导出：前一行标题，第二行表头；返回数据行数"""
+    rng = np.random.default_rng(seed)
+    dates = pd.date_range("2025-05-01", periods=days).strftime("%Y-%m-%d")
+    df = pd.DataFrame({
+        "日期": np.repeat(dates, products),
+        "商品ID": np.tile([f"P{i:05d}" for i in range(products)], days),
+        "商品名称": np.tile([f"套餐{i}" for i in range(products)], days),
+        "商品访问人数": rng.integers(0, 500, days * products).astype(str),
+        "商品购买人数": rng.integers(0, 50, days * products).astype(str),
+        "商品成交金额(优惠后)": rng.uniform(0, 5000, days * products).round(2).astype(str),
+    })
+    with pd.ExcelWriter(path, engine="openpyxl") as writer:
+        pd.DataFrame([["商品日明细导出"]]).to_excel(writer, index=False, header=False)
+        df.to_excel(writer, index=False, startrow=1)
+    return len(df)
+
+
+@pytest.fixture
+def ingest_db(db, store_mapping, operation_columns):
+    """store_mapping 取样本数据；operation_data 按样本运营表的前 20 列建表（其余指标进 extra_metrics）"""
+    engine = get_engine(db)
+    store_mapping.to_sql("store_mapping", engine, index=False)
+    op_cols = pd.DataFrame(columns=operation_columns[:20] + ["extra_metrics", "ros_score", "rankings_detail"])
+    op_cols.to_sql("operation_data", engine, index=False, dtype=get_dtype_for_operation(op_cols))
+    return db
+
+
+@pytest.fixture
+def watch(tmp_path):
+    path = tmp_path / "downloads"
+    path.mkdir()
+    return str(path)
+
+
+def slow_copy(src, dst, pieces, pause):
+    """分 pieces 段写入 dst，模拟后台导出还没下载完"""
+    with open(src, "rb") as f:
+        data = f.read()
+    step = len(data) // pieces + 1
+    with open(dst, "wb") as f:
+        for i in range(0, len(data), step):
+            f.write(data[i:i + step])
+            f.flush()
+            time.sleep(pause)
+
+
+def browser_download(src, dst, pause):
+    """浏览器式下载：先写 .crdownload，写完再改名"""
+    slow_copy(src, dst + ".crdownload", 3, pause)
+    os.replace(dst + ".crdownload", dst)
+
+
+def drop_files(sources, watch, pause):
+    """把 sources 投进监听目录，一半分段写入、一半走 .crdownload 改名；返回后台线程列表"""
+    threads = []
+    for i, src in enumerate(sources):
+        dst = os.path.join(watch, os.path.basename(src))
+        if i % 2:
+            threads.append(threading.Thread(target=slow_copy, args=(src, dst, 4, pause)))
+        else:
+            threads.append(threading.Thread(target=browser_download, args=(src, dst, pause)))
+    for t in threads:
+        t.start()
+    return threads
+
+
+def count(engine, table):
+    return int(pd.read_sql(f"SELECT COUNT(*) AS n FROM {table}", engine)["n"][0])
+
+
+def run_once(watch, db, debounce=0):
+    return ingest_daemon.run([watch], db, poll_seconds=max(debounce / 5, 0.05), debounce=debounce, once=True)
+
+
+def test_ingest_downloads_twice(ingest_db, watch, brand_folders, repo_root, store_mapping, capsys):
+    sources = [os.path.join(d, f) for _, d in brand_folders for f in sorted(os.listdir(d))]
+    src_dir = os.path.dirname(brand_folders[0][1])
+    sources.append(os.path.join(src_dir, "评价导出_样本.xlsx"))
+    write_review_export(sources[-1], repo_root, store_mapping, 200)
+    sources.append(os.path.join(src_dir, "商品日明细_样本.xlsx"))
+    n_product = write_product_export(sources[-1], 7, 20)
+    # 文件名像运营表、内容却是无关表格：应被识别失败并移到 _failed
+    sources.append(os.path.join(src_dir, "门店清单.xlsx"))
+    store_mapping.to_excel(sources[-1], index=False)
+
+    engine = get_engine(ingest_db)
+    runs = []
+    for _ in range(2):  # 第二轮：同一批导出重新下载一遍
+        threads = drop_files(sources, watch, pause=DEBOUNCE / 4)
+        results = run_once(watch, ingest_db, DEBOUNCE)
+        for t in threads:
+            t.join()
+        runs.append((results, {table: count(engine, table) for table in ingest_daemon.KIND_TABLES.values()}))
+
+    (first, rows_first), (second, rows_second) = runs
+    assert len(first) == len(second) == len(sources)
+    assert [os.path.basename(fp) for fp, _, _, err in first if err is not None] == ["门店清单.xlsx"]
+    kinds = sorted(kind for _, kind, _, err in first if err is None)
+    assert kinds == sorted(["cpc", "operation"] * len(brand_folders) + ["review", "product"])
+    assert rows_first["product_daily"] == n_product
+    assert rows_first == rows_second
+    assert all(rows == 0 for _, _, rows, err in second if err is None)
+
+    archived = {
+        sub: sum(len(files) for _, _, files in os.walk(os.path.join(watch, sub)))
+        for sub in (ingest_daemon.PROCESSED_DIR, ingest_daemon.FAILED_DIR)
+    }
+    assert archived == {ingest_daemon.PROCESSED_DIR: 2 * (len(sources) - 1), ingest_daemon.FAILED_DIR: 2}
+    assert sorted(os.listdir(watch)) == sorted(archived)
+    # 每批报告后统计列表清空，常驻进程内存不随运行时长增长
+    assert not (ingest_daemon.DRIFT_STATS or ingest_daemon.STAGE_STATS or ingest_daemon.MEMORY_STATS)
+
+
+def failing_upsert(monkeypatch, error):
+    """让守护进程的 upsert_via_staging 一直抛 error"""
+    def fail(*a, **kw):
+        raise error
+    monkeypatch.setattr(ingest_daemon, "upsert_via_staging", fail)
+
+
+def test_lost_connection_keeps_file_until_recovery(ingest_db, watch, monkeypatch, capsys):
+    """断连（驱动错误码 2013）时文件留在监听目录，不进 _failed；恢复后再跑一次即入库"""
+    fp = os.path.join(watch, "商品日明细_重试.xlsx")
+    n_rows = write_product_export(fp, 7, 10, seed=1)
+    with monkeypatch.context() as m:
+        failing_upsert(m, LOST_CONNECTION)
+        outage = run_once(watch, ingest_db)
+    assert [err is not None for _, _, _, err in outage] == [True] and os.path.exists(fp)
+    recovered = run_once(watch, ingest_db)
+    assert [(kind, rows, err) for _, kind, rows, err in recovered] == [("product", n_rows, None)]
+    assert not os.path.exists(fp)
+
+
+def test_permanent_error_moves_to_failed(ingest_db, watch, monkeypatch, capsys):
+    """同为 OperationalError 的永久错误（缺列）不重试，直接移到 _failed"""
+    fp = os.path.join(watch, "商品日明细_缺列.xlsx")
+    write_product_export(fp, 7, 10, seed=2)
+    failing_upsert(monkeypatch, NO_SUCH_COLUMN)
+    assert len(run_once(watch, ingest_db)) == 1
+    assert not os.path.exists(fp)
+    assert os.listdir(os.path.join(watch, ingest_daemon.FAILED_DIR))
+
+
+def test_retries_are_bounded(ingest_db, watch, monkeypatch, capsys):
+    """一直断连：首次 + max_retries 次重试后移到 _failed，不会无限重试"""
+    fp = os.path.join(watch, "商品日明细_断连.xlsx")
+    write_product_export(fp, 7, 10, seed=3)
+    failing_upsert(monkeypatch, LOST_CONNECTION)
+    session, watcher = ingest_daemon.IngestSession(ingest_db), ingest_daemon.FolderWatcher([watch], debounce=0)
+    attempts = 0
+    while os.path.exists(fp) and attempts < 10:
+        ready = watcher.poll()
+        attempts += len(ingest_daemon.process_ready(session, watcher, ready, retry_delay=0, max_retries=2))
+    assert attempts == 3
+    assert not os.path.exists(fp)
@@ -0,0 +1,54 @@
+# 向量化 build_rankings_detail_column 与旧版逐行 build_rankings_detail 的 JSON 逐行一致
+import numpy as np
+import pandas as pd
+
+from bench_legacy import legacy_build_rankings_detail
+from rankings import RANKING_COLUMNS, build_rankings_detail_column
+
+CITIES = ["上海", "北京", "杭州", "成都"]
+SCOPES = ["{city}市火锅", "{city}徐汇区火锅", "{city}徐家汇商圈", "{city}静安区", "漕河泾", "{city}"]
+
+
+def build_ranking_frame(rows, days=30, variants=5, seed=0):
+    """
+    合成运营数据里的城市列 + 8 个榜单列：rows/days 家门店各 days 天，
+    每家门店每个榜单在 variants 种文本间变化（真实数据里名次按天缓慢变化），约四分之一单元格为空
+    """
+    rng = np.random.default_rng(seed)
+    n_stores = max(1, rows // days)
+    store_city = rng.choice(CITIES, n_stores)
+    store = rng.integers(0, n_stores, rows)
+    data = {"城市": store_city[store]}
+    for col in RANKING_COLUMNS:
+        pool = []
+        for c in store_city:
+            texts = [np.nan]
+            for n_parts in rng.integers(1, 4, variants):
+                parts = [
+                    f"{SCOPES[j].format(city=c)}热门榜第{r}名"
+                    for j, r in zip(rng.integers(0, len(SCOPES), n_parts), rng.integers(1, 100, n_parts))
+                ]
+                texts.append("|".join(parts))
+            pool.append(texts)
+        pick = rng.integers(0, variants + 1, rows)
+        pick[rng.random(rows) < 0.1] = 0
+        data[col] = [pool[s][p] for s, p in zip(store, pick)]
+    return pd.DataFrame(data)
+
+
+def test_vectorised_matches_legacy():
+    df = build_ranking_frame(3000)
+    old = df.apply(legacy_build_rankings_detail, axis=1)
+    assert build_rankings_detail_column(df).tolist() == old.tolist()
+
+
+def test_odd_cells_match_legacy():
+    """无城市列、非字符串取值、没有名次的文本、同层级重复出现时也与旧版一致"""
+    cols = list(RANKING_COLUMNS)
+    df = pd.DataFrame({
+        cols[0]: ["上海第3名|长宁区第1名|长宁区第2名", 5, "未上榜", None],
+        cols[1]: [np.nan, "虹桥商圈第9名", "", "徐汇区第4名 | 漕河泾第7名"],
+    })
+    old = df.apply(legacy_build_rankings_detail, axis=1)
+    assert build_rankings_detail_column(df).tolist() == old.tolist()
+    assert build_rankings_detail_column(df.iloc[:0]).tolist() == []
@@ -0,0 +1,82 @@
+# 评价去重：旧版按文件 append 的重叠导出 → 批量回填 review_key 去重 → 再按 review_key 重导，行数不再增长
+import os
+
+import numpy as np
+import pandas as pd
+import pytest
+from sqlalchemy import text
+
+from database_importer import get_engine, import_to_mysql
+from review_cleaner import KEEP_COLS, dtype_review
+from review_dedupe import ReviewKeyMissingError, backfill_review_keys, upsert_reviews
+
+
+def build_review_exports(repo_root, exports, reviews_per_export, overlap, seed=0):
+    """exports 份评价导出，相邻两份有 overlap 比例的重叠；重叠部分的正文混入全角/多余空白差异"""
+    rng = np.random.default_rng(seed)
+    sample = pd.read_csv(os.path.join(repo_root, "review_data_样本数据.csv"), dtype=str, encoding="utf-8-sig")
+    step = int(reviews_per_export * (1 - overlap))
+    total = step * (exports - 1) + reviews_per_export
+    base = pd.DataFrame({
+        "store_id": rng.choice([str(10_000_000 + i) for i in range(50)], total),
+        "review_date": pd.Timestamp("2025-05-01") + pd.to_timedelta(rng.integers(0, 60, total), unit="D"),
+        "rating_raw": rng.choice([1.0, 2.0, 3.0, 4.0, 4.5, 5.0], total),
+        "review_text": [f"{sample['review_text'].iloc[i % len(sample)]} #{i}" for i in range(total)],
+    })
+    base["review_date"] = base["review_date"].dt.date
+    base["rating_label"] = np.where(base["rating_raw"] >= 4, "好", np.where(base["rating_raw"] == 3, "中", "差"))
+    for col in ("senti_score", "senti_label", "key_topics"):
+        base[col] = None
+
+    out = []
+    for e in range(exports):
+        part = base.iloc[e * step:e * step + reviews_per_export].copy()
+        noisy = rng.random(len(part)) < 0.3
+        part.loc[noisy, "review_text"] = "  " + part.loc[noisy, "review_text"].str.replace("，", ",") + " \n"
+        out.append(part[KEEP_COLS].reset_index(drop=True))
+    return base, out
+
+
+def create_tables(engine):
+    with engine.begin() as conn:
+        conn.execute(text(
+            "CREATE TABLE review_data (id INTEGER PRIMARY KEY AUTOINCREMENT, store_id VARCHAR(50), review_date DATE, "
+            "rating_raw NUMERIC(3, 1), rating_label VARCHAR(2), review_text TEXT, senti_score FLOAT, "
+            "senti_label VARCHAR(2), key_topics JSON)"
+        ))
+        conn.execute(text("CREATE TABLE review_ai_tag (id INTEGER PRIMARY KEY AUTOINCREMENT, raw_id INTEGER, tag_json TEXT)"))
+
+
+def count(engine, sql):
+    return pd.read_sql(sql, engine)["n"][0]
+
+
+def test_backfill_then_reimport_is_idempotent(repo_root, db, capsys):
+    base, exports = build_review_exports(repo_root, exports=4, reviews_per_export=500, overlap=0.5)
+    engine = get_engine(db)
+    create_tables(engine)
+    for df in exports:
+        import_to_mysql(df, "review_data", db, dtype=dtype_review, if_exists="append")
+    n_legacy = count(engine, "SELECT COUNT(*) AS n FROM review_data")
+    # 部分评价已经被 tag_batch 打过标签（重复的那几条里不一定是 id 最小的）
+    with engine.begin() as conn:
+        conn.execute(text("INSERT INTO review_ai_tag (raw_id, tag_json) SELECT id, '{}' FROM review_data WHERE id % 7 = 0"))
+    n_tags = count(engine, "SELECT COUNT(*) AS n FROM review_ai_tag")
+
+    # 旧表没回填 review_key 前，导入必须直接报错，不能顺手删数据
+    with pytest.raises(ReviewKeyMissingError):
+        upsert_reviews(exports[0], db)
+    assert count(engine, "SELECT COUNT(*) AS n FROM review_data") == n_legacy
+    assert count(engine, "SELECT COUNT(*) AS n FROM review_ai_tag") == n_tags
+
+    backfill_review_keys(engine)
+    assert count(engine, "SELECT COUNT(*) AS n FROM review_data") == len(base) < n_legacy
+    assert count(engine, "SELECT COUNT(*) AS n FROM review_ai_tag WHERE raw_id NOT IN (SELECT id FROM review_data)") == 0
+
+    # 返回值是实际新增行数：全部已入库时为 0；一份里改出 100 条新评价就是 100
+    assert [upsert_reviews(df, db) for df in exports] == [0] * len(exports)
+    assert count(engine, "SELECT COUNT(*) AS n FROM review_data") == len(base)
+    fresh = exports[0].copy()
+    fresh.loc[fresh.index[:100], "review_text"] += " 追评"
+    assert upsert_reviews(fresh, db) == 100
+    assert count(engine, "SELECT COUNT(*) AS n FROM review_data") == len(base) + 100
@@ -0,0 +1,69 @@
+# extra_metrics 指标转正：计划覆盖常用指标、稀疏指标留在 JSON，回填值与原 JSON 取值一致，三种汇总方式结果相同
+import json
+
+import numpy as np
+import pandas as pd
+
+from data_cleaning import clean_numeric_columns
+from database_importer import get_dtype_for_operation, get_engine, upsert_via_staging
+from extra_metrics import pack_extra_metrics
+from schema_evolution import promote_frequent_metrics
+from schema_registry import table_columns
+
+FLAT_METRICS = 10
+
+
+def build_operation_table(db, df, days, seed=0):
+    """前 FLAT_METRICS 个指标是 flat 列，其余指标 + 一个 3% 填充的稀疏指标打包进 extra_metrics"""
+    rng = np.random.default_rng(seed + 1)  # 与合成运营数据的随机序列错开，否则日期与门店完全相关
+    df["日期"] = (pd.Timestamp("2025-03-01") + pd.to_timedelta(rng.integers(0, days, len(df)), unit="D")).date
+    df["美团门店ID"] = df["美团门店ID"].str[2:]
+    df = df.drop_duplicates(subset=["日期", "美团门店ID"])
+    df = clean_numeric_columns(df, key_col="美团门店ID")
+    df["稀疏指标"] = np.where(rng.random(len(df)) < 0.03, 1.0, np.nan)
+
+    flat_cols = list(df.columns[:2 + FLAT_METRICS])
+    df_basic = df[flat_cols].copy()
+    df_basic["extra_metrics"] = pack_extra_metrics(df.drop(columns=flat_cols))
+    upsert_via_staging(df_basic, "operation_data", db, dtype=get_dtype_for_operation(df_basic))
+    return df, flat_cols
+
+
+def sum_from_json(engine, key):
+    """转正前：读回 extra_metrics 在 pandas 里逐行解析"""
+    df = pd.read_sql("SELECT 美团门店ID, extra_metrics FROM operation_data", engine)
+    values = [json.loads(raw).get(key) for raw in df["extra_metrics"]]
+    df[key] = pd.to_numeric(pd.Series(values, index=df.index, dtype=object), errors="coerce")
+    return df.groupby("美团门店ID")[key].sum().astype(float)
+
+
+def sum_in_db(engine, expr):
+    sql = f"SELECT 美团门店ID, SUM({expr}) AS v FROM operation_data GROUP BY 美团门店ID"
+    return pd.read_sql(sql, engine).set_index("美团门店ID")["v"].astype(float)
+
+
+def test_promote_frequent_metrics(make_operation_frame, db, capsys):
+    engine = get_engine(db)
+    df, flat_cols = build_operation_table(db, make_operation_frame(3000, 20), days=30)
+    json_keys = [c for c in df.columns if c not in flat_cols]
+    key = json_keys[0]
+    by_pandas = sum_from_json(engine, key)
+    by_json = sum_in_db(engine, f"""json_extract(extra_metrics, '$."{key}"')""")
+
+    plan = promote_frequent_metrics(db, scan_days=0)
+    assert set(plan) == set(json_keys) - {"稀疏指标"}
+    assert set(plan) <= set(table_columns(engine, "operation_data"))
+
+    promoted = pd.read_sql("SELECT * FROM operation_data ORDER BY 日期, 美团门店ID", engine)
+    assert {k for raw in promoted["extra_metrics"] for k in json.loads(raw)} == {"稀疏指标"}
+    expected = df.assign(日期=df["日期"].astype(str)).sort_values(["日期", "美团门店ID"]).reset_index(drop=True)
+    for col in plan:
+        pd.testing.assert_series_equal(
+            pd.to_numeric(promoted[col], errors="coerce").astype(float),
+            pd.to_numeric(expected[col], errors="coerce").astype(float),
+            check_names=False, obj=col,
+        )
+
+    by_native = sum_in_db(engine, f'"{key}"')
+    pd.testing.assert_series_equal(by_pandas, by_native, check_names=False)
+    pd.testing.assert_series_equal(by_json, by_native, check_names=False)
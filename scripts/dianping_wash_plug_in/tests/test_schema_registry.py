@@ -0,0 +1,39 @@
+# 表结构缓存：与每次反射的列名一致（进程内 / 磁盘缓存），导出新增列进漂移报告
+import pandas as pd
+
+import schema_registry
+from bench_legacy import legacy_table_columns
+from database_importer import get_dtype_for_operation, get_engine
+from schema_registry import get_schema, print_drift_report, record_drift, table_columns
+
+
+def create_operation_table(engine, sample, n_cols):
+    """样本运营表的列 + 补足到 n_cols 列的指标列"""
+    json_cols = ["extra_metrics", "ros_score", "rankings_detail"]
+    flat = [c for c in sample if c not in json_cols]
+    cols = flat + [f"指标{i}" for i in range(max(0, n_cols - len(flat) - len(json_cols)))]
+    df = pd.DataFrame(columns=cols + json_cols)
+    df.to_sql("operation_data", engine, index=False, dtype=get_dtype_for_operation(df))
+    return flat
+
+
+def test_cached_columns_match_reflection(operation_columns, db, monkeypatch, capsys):
+    engine = get_engine(db)
+    flat = create_operation_table(engine, operation_columns, 250)
+    legacy = legacy_table_columns(engine, "operation_data")
+    cached = table_columns(engine, "operation_data")
+    assert table_columns(engine, "operation_data") == cached == legacy
+    assert get_schema(engine, "operation_data")["types"]["日期"].upper().startswith("DATE")
+
+    # 新一次运行：进程内缓存为空，直接读磁盘缓存
+    schema_registry._SCHEMAS.clear()
+    assert table_columns(engine, "operation_data") == legacy
+
+    # 导出新增了两列指标：对齐时落进 extra_metrics，并出现在漂移报告里
+    monkeypatch.setattr(schema_registry, "DRIFT_STATS", [])
+    export_cols = flat + ["到店核销率-团购", "新客占比-团购"]
+    assert record_drift("operation_data", export_cols, cached, "品牌00") == export_cols[-2:]
+    record_drift("operation_data", export_cols[:-1], cached, "品牌01")
+    print_drift_report()
+    report = capsys.readouterr().out
+    assert "到店核销率-团购" in report and "新客占比-团购" in report
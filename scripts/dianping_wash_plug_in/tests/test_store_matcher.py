@@ -0,0 +1,55 @@
+# 去重 + cdist 批量匹配、命中 review_store_match 持久化缓存，结果都与旧版逐行 fuzzy_match 一致
+import numpy as np
+import pandas as pd
+
+from bench_legacy import legacy_match
+from database_importer import get_engine
+from store_matcher import (
+    init_match_cache_table, load_match_cache, mapping_version, match_store_names, save_match_cache, stores_frame,
+)
+
+BRANCHES = ["虹桥", "徐汇", "静安", "浦东", "五角场", "陆家嘴", "中山公园", "七宝", "莘庄", "南京西路"]
+
+
+def build_store_mapping(sample, n_stores):
+    """以样本门店为品牌，按商圈扩出 n_stores 家分店"""
+    brands = sample["推广门店"].str.replace(r"[（(].*?[)）]", "", regex=True).str.strip().unique()
+    names = [f"{brands[i % len(brands)]}（{BRANCHES[i // len(brands) % len(BRANCHES)]}{i}店）" for i in range(n_stores)]
+    return pd.DataFrame({"推广门店": names, "门店ID": [str(10_000_000 + i) for i in range(n_stores)]})
+
+
+def build_review_names(store_mapping, rows, seed=0):
+    """评价表里的门店名：原名、全角/半角括号、去掉“店”字、间隔号、少量完全无关的名字"""
+    rng = np.random.default_rng(seed)
+    variants = []
+    for name in store_mapping["推广门店"]:
+        variants += [
+            name,
+            name.replace("（", "(").replace("）", ")"),
+            name.replace("店", ""),
+            name.replace("（", "·").replace("）", ""),
+        ]
+    variants += [f"无关餐厅{i}" for i in range(len(store_mapping) // 5)]
+    return pd.Series(rng.choice(np.array(variants, dtype=object), rows))
+
+
+def test_batch_and_cache_match_legacy(store_mapping, db):
+    mapping = build_store_mapping(store_mapping, 60)
+    names = build_review_names(mapping, 2000)
+    stores_df = stores_frame(mapping)
+    old = legacy_match(names, mapping)
+
+    match_cache = {}
+    new = names.map(match_store_names(names, stores_df, match_cache))
+    pd.testing.assert_series_equal(old, new)
+    assert old.isna().any() and old.notna().any()
+
+    engine = get_engine(db)
+    init_match_cache_table(engine)
+    version = mapping_version(stores_df)
+    save_match_cache(engine, match_cache, version)
+    persisted = load_match_cache(engine, version)
+    assert persisted == match_cache
+    pd.testing.assert_series_equal(old, names.map(match_store_names(names, stores_df, persisted)))
+    # 映射一变版本号就变，旧缓存不再命中
+    assert load_match_cache(engine, mapping_version(stores_frame(mapping.iloc[1:]))) == {}